@@ -0,0 +1,276 @@
+import bisect
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from benchmarks.synthetic import generate_order
+
+ORDERS_PATH = "/api/orders/v0/transferOrder/getFlatForExecutor"
+EMPLOYEES_PATH = "/api/users/userEmployees/get/list/v0"
+_ORDER_LINK = re.compile(r"/orders/([\w-]+)")
+
+
+@dataclass
+class FaultProfile:
+    """Задержка ответа и доли ответов 429 и зависших запросов"""
+
+    latency_min: float = 0.0
+    latency_max: float = 0.0
+    rate_limit_rate: float = 0.0
+    timeout_rate: float = 0.0
+    # Зависший запрос держится дольше таймаута клиента
+    timeout_delay: float = 5.0
+    retry_after: int = 1
+
+    def pick(self, rng: random.Random) -> str:
+        """Исход запроса: ok, rate_limit или timeout (после задержки)"""
+        if self.latency_max > 0:
+            time.sleep(rng.uniform(self.latency_min, self.latency_max))
+        roll = rng.random()
+        if roll < self.timeout_rate:
+            time.sleep(self.timeout_delay)
+            return "timeout"
+        if roll < self.timeout_rate + self.rate_limit_rate:
+            return "rate_limit"
+        return "ok"
+
+
+class FakeState:
+    """Общие данные подделок: заказы с моментом появления и доставки в Telegram"""
+
+    def __init__(self, seed: int = 0):
+        self.lock = threading.Lock()
+        self.rng = random.Random(seed)
+        self.orders: List[bytes] = []
+        self.updated: List[float] = []
+        self.injected_at: Dict[str, float] = {}
+        # ID заказа -> моменты доставки по чатам
+        self.deliveries: Dict[str, List[Tuple[str, float]]] = {}
+        self.counters: Dict[str, int] = {}
+        self.next_message_id = 1
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def inject(self, count: int) -> int:
+        """Новые активные заказы с updatedAt = сейчас"""
+        now = datetime.now(timezone.utc)
+        stamp = now.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+        with self.lock:
+            start = len(self.orders)
+            for index in range(start, start + count):
+                payload = generate_order(self.rng, index, now)
+                # Все заказы всплеска должны дойти до канала
+                payload["auction"] = {"timeLeft": "5 ч.", "currency": "RUB",
+                                      "endDate": {"time": (now + timedelta(hours=5)).isoformat()}}
+                payload["matcher"] = {"winnerExecutor": None, "matcherStatus": "active"}
+                payload["updatedAt"] = {"time": stamp}
+                self.orders.append(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+                self.updated.append(now.timestamp())
+                self.injected_at[payload["id"]] = time.time()
+        self.count("injected", count)
+        return count
+
+    def page(self, updated_from: Optional[str], offset: int, limit: int) -> bytes:
+        since = 0.0
+        if updated_from:
+            since = datetime.fromisoformat(updated_from.replace("Z", "+00:00")).replace(
+                tzinfo=timezone.utc).timestamp()
+        with self.lock:
+            first = bisect.bisect_left(self.updated, since)
+            total = len(self.orders) - first
+            chunk = self.orders[first + offset:first + offset + limit]
+        return (b'{"data":{"total":' + str(total).encode() + b',"orders":[' +
+                b",".join(chunk) + b"]}}")
+
+    def deliver(self, chat_id: str, body: str) -> int:
+        now = time.time()
+        with self.lock:
+            message_id = self.next_message_id
+            self.next_message_id += 1
+            for order_id in set(_ORDER_LINK.findall(body)):
+                self.deliveries.setdefault(order_id, []).append((chat_id, now))
+        return message_id
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            latencies = []
+            duplicates = 0
+            last_delivery = None
+            for order_id, deliveries in self.deliveries.items():
+                injected = self.injected_at.get(order_id)
+                first = min(moment for _, moment in deliveries)
+                if injected is not None:
+                    latencies.append(first - injected)
+                chats = [chat for chat, _ in deliveries]
+                duplicates += len(chats) - len(set(chats))
+                last_delivery = max(last_delivery or 0, max(moment for _, moment in deliveries))
+            return {
+                "counters": dict(self.counters),
+                "injected": len(self.injected_at),
+                "first_injected_at": min(self.injected_at.values(), default=None),
+                "delivered": len(latencies),
+                "duplicates": duplicates,
+                "last_delivery_at": last_delivery,
+                "latencies": sorted(latencies),
+            }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    state: FakeState
+    faults: FaultProfile
+    rng: random.Random
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def _reply(self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None) -> None:
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _json(self, status: int, data: Any) -> None:
+        self._reply(status, json.dumps(data).encode("utf-8"))
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _control(self) -> bool:
+        """Служебные запросы нагрузочного прогона: /_control/inject и /_control/stats"""
+        if self.path == "/_control/stats":
+            self._json(200, self.state.stats())
+            return True
+        if self.path == "/_control/inject":
+            count = json.loads(self._body() or b"{}").get("count", 0)
+            self._json(200, {"injected": self.state.inject(int(count))})
+            return True
+        return False
+
+
+class FakeMagistraliHandler(_Handler):
+    """Заглушка API Ямагистрали: список заказов с пагинацией и проверка токена"""
+
+    def do_GET(self) -> None:
+        if self._control():
+            return
+        if self.path.startswith(EMPLOYEES_PATH):
+            self.state.count("api_token_checks")
+            self._json(200, {"data": {"employees": []}})
+            return
+        self._json(404, {"error": "not found"})
+
+    def do_POST(self) -> None:
+        if self._control():
+            return
+        if not self.path.startswith(ORDERS_PATH):
+            self._json(404, {"error": "not found"})
+            return
+        request = json.loads(self._body() or b"{}").get("data", {})
+        self.state.count("api_requests")
+        outcome = self.faults.pick(self.rng)
+        if outcome == "timeout":
+            self.state.count("api_timeouts")
+            self._json(504, {"error": "timeout"})
+            return
+        if outcome == "rate_limit":
+            self.state.count("api_rate_limited")
+            self._reply(429, b'{"error":"too many requests"}', {"Retry-After": str(self.faults.retry_after)})
+            return
+        body = self.state.page(request.get("filter", {}).get("updatedFrom"),
+                               int(request.get("offset", 0)), int(request.get("limit", 200)))
+        self.state.count("api_bytes", len(body))
+        self._reply(200, body)
+
+
+class FakeTelegramHandler(_Handler):
+    """Заглушка Bot API: sendMessage и editMessageText с учетом доставленных заказов"""
+
+    def _params(self) -> Dict[str, Any]:
+        raw = self._body()
+        if "json" in (self.headers.get("Content-Type") or ""):
+            return json.loads(raw or b"{}")
+        return {key: values[0] for key, values in parse_qs(raw.decode("utf-8")).items()}
+
+    def do_GET(self) -> None:
+        if not self._control():
+            self._json(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+
+    def do_POST(self) -> None:
+        if self._control():
+            return
+        method = self.path.rsplit("/", 1)[-1]
+        params = self._params()
+        self.state.count("tg_requests")
+        outcome = self.faults.pick(self.rng)
+        if outcome == "timeout":
+            self.state.count("tg_timeouts")
+            self._json(504, {"ok": False, "error_code": 504, "description": "Gateway Timeout"})
+            return
+        if outcome == "rate_limit":
+            self.state.count("tg_rate_limited")
+            retry_after = self.faults.retry_after
+            self._json(429, {"ok": False, "error_code": 429,
+                             "description": f"Too Many Requests: retry after {retry_after}",
+                             "parameters": {"retry_after": retry_after}})
+            return
+
+        chat_id = str(params.get("chat_id"))
+        if method == "sendMessage":
+            self.state.count("tg_messages")
+            body = f"{params.get('text', '')} {params.get('reply_markup', '')}"
+            message_id = self.state.deliver(chat_id, body)
+        elif method == "editMessageText":
+            self.state.count("tg_edits")
+            message_id = int(params.get("message_id") or 0)
+        else:
+            self._json(200, {"ok": True, "result": True})
+            return
+        self._json(200, {"ok": True, "result": {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": -1001, "type": "channel", "title": chat_id},
+            "text": params.get("text", ""),
+        }})
+
+
+def _server(handler: type, state: FakeState, faults: FaultProfile, seed: int) -> ThreadingHTTPServer:
+    handler_class = type(handler.__name__, (handler,), {
+        "state": state, "faults": faults, "rng": random.Random(seed)})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler_class)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_fake_services(connection: Any, api_faults: Dict[str, Any], telegram_faults: Dict[str, Any],
+                      seed: int = 0) -> None:
+    """Точка входа дочернего процесса: запуск обеих заглушек, порты отдаются через connection"""
+    state = FakeState(seed)
+    api = _server(FakeMagistraliHandler, state, FaultProfile(**api_faults), seed + 1)
+    telegram = _server(FakeTelegramHandler, state, FaultProfile(**telegram_faults), seed + 2)
+    connection.send({"api_port": api.server_address[1], "telegram_port": telegram.server_address[1]})
+    # Процесс живет, пока родитель не попросит остановиться
+    connection.recv()
+    api.shutdown()
+    telegram.shutdown()
+
+
+def fault_profile(**kwargs: Any) -> Dict[str, Any]:
+    return asdict(FaultProfile(**kwargs))
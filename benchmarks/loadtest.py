@@ -0,0 +1,282 @@
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from benchmarks.fake_services import fault_profile, run_fake_services
+
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+
+def _rss_bytes() -> int:
+    """Текущий RSS процесса (Linux) или пиковый, если /proc недоступен"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if sys.platform == "darwin" else usage * 1024
+
+
+class MemorySampler(threading.Thread):
+    """Замер памяти процесса монитора с заданным шагом"""
+
+    def __init__(self, interval: float = 0.25):
+        super().__init__(name="memory-sampler", daemon=True)
+        self.interval = interval
+        self.samples: List[int] = []
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.is_set():
+            self.samples.append(_rss_bytes())
+            self._stop_event.wait(self.interval)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+
+def _percentile(values: List[float], share: float) -> Optional[float]:
+    if not values:
+        return None
+    index = min(len(values) - 1, max(0, round(share * (len(values) - 1))))
+    return round(values[index], 4)
+
+
+def _control(port: int, path: str, payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    request = urllib.request.Request(f"http://127.0.0.1:{port}{path}", data=data,
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.loads(response.read())
+
+
+class MonitorRunner:
+    """Монитор в фоновом потоке: цикл опроса или асинхронный конвейер"""
+
+    def __init__(self, monitor: Any, pipeline: bool):
+        self.monitor = monitor
+        self.pipeline = pipeline
+        self._stop_event = threading.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._thread = threading.Thread(target=self._run, name="monitor", daemon=True)
+
+    def _run(self) -> None:
+        monitor = self.monitor
+        if self.pipeline:
+            from src.core.pipeline import OrderPipeline
+
+            loop = monitor.telegram_service.loop
+            asyncio.set_event_loop(loop)
+            self._task = loop.create_task(OrderPipeline(monitor).run())
+            try:
+                loop.run_until_complete(self._task)
+            except asyncio.CancelledError:
+                pass
+            return
+
+        if monitor.outbox_worker is not None:
+            monitor.outbox_worker.start_thread(monitor.telegram_service.loop)
+        while not self._stop_event.is_set():
+            if monitor.process_orders():
+                delay = monitor.scheduler.next_delay()
+            else:
+                delay = monitor.scheduler.error_delay()
+            self._stop_event.wait(delay)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._task is not None:
+            self.monitor.telegram_service.loop.call_soon_threadsafe(self._task.cancel)
+        if self.monitor.outbox_worker is not None:
+            self.monitor.outbox_worker.stop()
+        self._thread.join(timeout=30)
+
+
+def build_config(args: argparse.Namespace, ports: Dict[str, int]) -> Dict[str, Any]:
+    """Конфигурация монитора для прогона: заглушки вместо внешних сервисов и переопределения --set"""
+    config = {
+        "API_BASE_URL": f"http://127.0.0.1:{ports['api_port']}",
+        "TELEGRAM_API_URL": f"http://127.0.0.1:{ports['telegram_port']}/bot",
+        "TELEGRAM_BOT_TOKEN": "123456:loadtest",
+        "TELEGRAM_CHANNEL_ID": "@loadtest",
+        "STATIC_TOKEN": "loadtest",
+        "POLLING_INTERVAL": args.poll_interval,
+        "POLLING_MIN_INTERVAL": args.poll_interval,
+        "POLLING_MAX_INTERVAL": args.poll_interval,
+        "POLLING_ERROR_BACKOFF": 1,
+        "API_REQUEST_TIMEOUT": 2,
+        "PIPELINE_MODE": args.pipeline,
+        "METRICS_ENABLED": False,
+    }
+    for override in args.set or []:
+        key, _, value = override.partition("=")
+        try:
+            config[key] = json.loads(value)
+        except json.JSONDecodeError:
+            config[key] = value
+    return config
+
+
+def run_load(args: argparse.Namespace) -> Dict[str, Any]:
+    parent, child = multiprocessing.Pipe()
+    api_faults = fault_profile(latency_min=args.api_latency[0], latency_max=args.api_latency[1],
+                               rate_limit_rate=args.api_429, timeout_rate=args.api_timeouts,
+                               timeout_delay=3.0)
+    telegram_faults = fault_profile(latency_min=args.tg_latency[0], latency_max=args.tg_latency[1],
+                                    rate_limit_rate=args.tg_429, timeout_rate=args.tg_timeouts,
+                                    timeout_delay=6.0)
+    # Заглушки в отдельном процессе, чтобы не делить с монитором GIL и память
+    fakes = multiprocessing.Process(target=run_fake_services,
+                                    args=(child, api_faults, telegram_faults, args.seed), daemon=True)
+    fakes.start()
+    ports = parent.recv()
+
+    cwd = os.getcwd()
+    workdir = tempfile.TemporaryDirectory()
+    os.chdir(workdir.name)
+    sampler = MemorySampler()
+    try:
+        config = build_config(args, ports)
+        Path("config.json").write_text(json.dumps(config, ensure_ascii=False), encoding="utf-8")
+
+        from src.core.monitor import MagistraliMonitor
+        from src.utils.metrics import POLL_DURATION
+
+        rss_start = _rss_bytes()
+        sampler.start()
+        monitor = MagistraliMonitor()
+        if not monitor.api_client.verify_token():
+            raise RuntimeError("Fake API rejected the token")
+        runner = MonitorRunner(monitor, args.pipeline)
+        runner.start()
+
+        for burst in range(args.bursts):
+            if burst:
+                time.sleep(args.burst_interval)
+            _control(ports["api_port"], "/_control/inject", {"count": args.orders})
+            print(f"Burst {burst + 1}/{args.bursts}: injected {args.orders} orders", flush=True)
+
+        expected = args.orders * args.bursts
+        deadline = time.time() + args.timeout
+        stats = _control(ports["api_port"], "/_control/stats")
+        while stats["delivered"] < expected and time.time() < deadline:
+            time.sleep(1)
+            delivered = stats["delivered"]
+            stats = _control(ports["api_port"], "/_control/stats")
+            if stats["delivered"] != delivered:
+                print(f"Delivered {stats['delivered']}/{expected}", flush=True)
+        # Еще немного времени, чтобы увидеть повторные отправки
+        time.sleep(args.settle)
+        stats = _control(ports["api_port"], "/_control/stats")
+
+        runner.stop()
+        sampler.stop()
+        # В режиме конвейера циклы опроса не замеряются
+        cycles = None if args.pipeline else POLL_DURATION.count()
+    finally:
+        os.chdir(cwd)
+        workdir.cleanup()
+        parent.send("stop")
+        fakes.join(timeout=10)
+
+    latencies = stats.pop("latencies")
+    started = stats.pop("first_injected_at")
+    finished = stats.pop("last_delivery_at")
+    elapsed = (finished - started) if started and finished else None
+    peak = max(sampler.samples, default=rss_start)
+    return {
+        "scenario": {
+            "orders_per_burst": args.orders,
+            "bursts": args.bursts,
+            "burst_interval_s": args.burst_interval,
+            "pipeline": args.pipeline,
+            "api_faults": api_faults,
+            "telegram_faults": telegram_faults,
+            "config": config,
+        },
+        "injected": stats["injected"],
+        "delivered": stats["delivered"],
+        "missing": stats["injected"] - stats["delivered"],
+        "duplicate_messages": stats["duplicates"],
+        "throughput_orders_per_s": round(stats["delivered"] / elapsed, 2) if elapsed else None,
+        "elapsed_s": round(elapsed, 3) if elapsed else None,
+        "latency_s": {
+            "p50": _percentile(latencies, 0.5),
+            "p90": _percentile(latencies, 0.9),
+            "p99": _percentile(latencies, 0.99),
+            "max": round(latencies[-1], 4) if latencies else None,
+        },
+        "memory_mb": {
+            "start": round(rss_start / 2 ** 20, 1),
+            "peak": round(peak / 2 ** 20, 1),
+            "end": round((sampler.samples[-1] if sampler.samples else rss_start) / 2 ** 20, 1),
+        },
+        "poll_cycles": cycles,
+        "counters": stats["counters"],
+    }
+
+
+def _range(value: str) -> List[float]:
+    low, _, high = value.partition("-")
+    return [float(low), float(high or low)]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Нагрузочный прогон монитора против локальных заглушек API и Telegram")
+    parser.add_argument("--orders", type=int, default=2000, help="заказов в одном всплеске")
+    parser.add_argument("--bursts", type=int, default=1)
+    parser.add_argument("--burst-interval", type=float, default=30.0, help="пауза между всплесками, сек")
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="POLLING_INTERVAL монитора, сек")
+    parser.add_argument("--pipeline", action="store_true", help="режим асинхронного конвейера")
+    parser.add_argument("--api-latency", type=_range, default=[0.05, 0.3], help="задержка API, сек (min-max)")
+    parser.add_argument("--api-429", type=float, default=0.02, help="доля ответов 429 от API")
+    parser.add_argument("--api-timeouts", type=float, default=0.01, help="доля зависших запросов к API")
+    parser.add_argument("--tg-latency", type=_range, default=[0.02, 0.1], help="задержка Telegram, сек")
+    parser.add_argument("--tg-429", type=float, default=0.01, help="доля ответов 429 от Telegram")
+    parser.add_argument("--tg-timeouts", type=float, default=0.005, help="доля зависших запросов к Telegram")
+    parser.add_argument("--set", action="append", metavar="KEY=VALUE",
+                        help="переопределение настройки монитора (значение в JSON), можно несколько раз")
+    parser.add_argument("--timeout", type=float, default=600.0, help="максимальное ожидание доставки, сек")
+    parser.add_argument("--settle", type=float, default=3.0, help="ожидание после доставки, сек")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="файл результатов (по умолчанию benchmarks/results/load-<время>.json)")
+    parser.add_argument("--verbose", action="store_true", help="журнал монитора уровня INFO")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    report = run_load(args)
+
+    output = Path(args.output) if args.output else \
+        RESULTS_DIR / f"load-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(json.dumps({key: value for key, value in report.items() if key != "scenario"},
+                     ensure_ascii=False, indent=2))
+    print(f"Results saved to {output}")
+    return 0 if report["missing"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,287 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from benchmarks.synthetic import generate_address, generate_orders
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCALES = [1000, 10000, 100000]
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+# Подготовка возвращает функцию одного прогона, число операций в нем и, если бенчмарк
+# меняет общее состояние (глобальные кэши), функцию его восстановления
+Setup = Callable[[int, int, Path], Tuple[Any, ...]]
+
+
+def _init_config(workdir: Path) -> None:
+    """Минимальная конфигурация для клиентов и форматтеров, без обращения к config.json"""
+    from src.config.settings import init_config
+
+    config_file = workdir / "config.json"
+    config_file.write_text(json.dumps({"STATIC_TOKEN": "benchmark", "TELEGRAM_BOT_TOKEN": "0:benchmark",
+                                       "TELEGRAM_CHANNEL_ID": "0"}), encoding="utf-8")
+    init_config(str(config_file))
+
+
+def bench_fuzzy_find_city(scale: int, seed: int, workdir: Path):
+    from src.utils.formatters import fuzzy_find_city
+
+    rng = random.Random(seed)
+    addresses = [generate_address(rng) for _ in range(scale)]
+
+    def run() -> None:
+        for address in addresses:
+            fuzzy_find_city(address)
+    return run, scale
+
+
+def bench_order_from_dict(scale: int, seed: int, workdir: Path):
+    from src.models.order import Order
+
+    payloads = generate_orders(scale, seed)
+
+    def run() -> None:
+        for payload in payloads:
+            Order.from_dict(payload)
+    return run, scale
+
+
+def _orders(scale: int, seed: int) -> List[Any]:
+    from src.models.order import Order
+    return [Order.from_dict(payload) for payload in generate_orders(scale, seed)]
+
+
+def bench_format_order_message(scale: int, seed: int, workdir: Path):
+    from src.utils.formatters import CITY_RESOLVER, RENDER_CACHE, format_order_message
+
+    orders = _orders(scale, seed)
+
+    def run() -> None:
+        # Холодные кэши: худший случай, все заказы новые
+        RENDER_CACHE.clear()
+        CITY_RESOLVER.clear()
+        for order in orders:
+            format_order_message(order)
+    return run, scale
+
+
+def bench_format_order_message_warm(scale: int, seed: int, workdir: Path):
+    from src.utils.formatters import RENDER_CACHE, format_order_message
+
+    orders = _orders(scale, seed)
+    previous_size = RENDER_CACHE.maxsize
+    RENDER_CACHE.resize(scale)
+    try:
+        for order in orders:
+            format_order_message(order)
+    except Exception:
+        RENDER_CACHE.resize(previous_size)
+        raise
+
+    def run() -> None:
+        for order in orders:
+            format_order_message(order)
+    return run, scale, lambda: RENDER_CACHE.resize(previous_size)
+
+
+def bench_is_active_auction(scale: int, seed: int, workdir: Path):
+    from src.services.api_client import APIClient
+
+    client = APIClient("benchmark", watermark_file=str(workdir / "watermark.json"))
+    orders = _orders(scale, seed)
+
+    def run() -> None:
+        for order in orders:
+            client.is_active_auction(order)
+    return run, scale
+
+
+def _journal_records(scale: int, expired: int = 0) -> Dict[str, float]:
+    """Записи журнала: scale действующих и expired уже истекших"""
+    now = time.time()
+    records = {f"syn-{i}": now + 86400 for i in range(scale)}
+    records.update((f"old-{i}", now - 3600) for i in range(expired))
+    return records
+
+
+def bench_journal_append(scale: int, seed: int, workdir: Path):
+    from src.utils.sent_journal import SentOrdersJournal
+
+    file = workdir / f"journal_append_{scale}.log"
+    expires_at = time.time() + 86400
+
+    def run() -> None:
+        # Каждый прогон начинается с пустого журнала, дозапись с fsync как в мониторе
+        file.unlink(missing_ok=True)
+        journal = SentOrdersJournal(str(file), str(workdir / "missing.json"))
+        for i in range(scale):
+            journal.append(f"syn-{i}", expires_at)
+        journal.close()
+    return run, scale
+
+
+def bench_journal_load(scale: int, seed: int, workdir: Path):
+    from src.utils.sent_journal import SentOrdersJournal
+
+    file = workdir / f"journal_load_{scale}.log"
+    SentOrdersJournal(str(file), str(workdir / "missing.json"))._rewrite(_journal_records(scale))
+
+    def run() -> None:
+        SentOrdersJournal(str(file), str(workdir / "missing.json")).load()
+    return run, scale
+
+
+def bench_journal_compact(scale: int, seed: int, workdir: Path):
+    import shutil
+
+    from src.utils.sent_journal import SentOrdersJournal
+
+    # Половина записей журнала истекла; хранилище знает только о действующих
+    records = _journal_records(scale, expired=scale)
+    live = {order_id: expires_at for order_id, expires_at in records.items() if order_id.startswith("syn-")}
+    source = workdir / f"journal_compact_{scale}.src"
+    file = workdir / f"journal_compact_{scale}.log"
+    SentOrdersJournal(str(source), str(workdir / "missing.json"))._rewrite(records)
+
+    def run() -> None:
+        shutil.copyfile(source, file)
+        SentOrdersJournal(str(file), str(workdir / "missing.json"))._compact(live)
+    return run, len(records)
+
+
+BENCHMARKS: Dict[str, Setup] = {
+    "fuzzy_find_city": bench_fuzzy_find_city,
+    "order_from_dict": bench_order_from_dict,
+    "format_order_message": bench_format_order_message,
+    "format_order_message_warm": bench_format_order_message_warm,
+    "is_active_auction": bench_is_active_auction,
+    "journal_append": bench_journal_append,
+    "journal_load": bench_journal_load,
+    "journal_compact": bench_journal_compact,
+}
+
+
+def measure(run: Callable[[], Any], repeat: int) -> List[float]:
+    """Длительности прогонов, секунды"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def run_benchmarks(names: List[str], scales: List[int], repeat: int = 3, seed: int = 0) -> Dict[str, Any]:
+    """Прогон выбранных бенчмарков на всех масштабах"""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        _init_config(workdir)
+        for name in names:
+            for scale in scales:
+                run, ops, *restore = BENCHMARKS[name](scale, seed, workdir)
+                try:
+                    timings = measure(run, repeat)
+                finally:
+                    for restore_state in restore:
+                        restore_state()
+                best = min(timings)
+                result = {
+                    "name": name,
+                    "scale": scale,
+                    "ops": ops,
+                    "repeat": repeat,
+                    "best_s": round(best, 6),
+                    "median_s": round(statistics.median(timings), 6),
+                    "us_per_op": round(best / ops * 1e6, 3),
+                    "ops_per_sec": round(ops / best) if best else None,
+                }
+                results.append(result)
+                print(f"{name:<28} {scale:>8}  {result['us_per_op']:>10.3f} us/op  "
+                      f"(best {best:.3f} s of {repeat})", flush=True)
+    return {"meta": _metadata(seed), "results": results}
+
+
+def _metadata(seed: int) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": seed,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Регрессии относительно сохраненного прогона: замедление больше threshold (доля)"""
+    previous = {(r["name"], r["scale"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in current["results"]:
+        old = previous.get((result["name"], result["scale"]))
+        if old is None or not old["us_per_op"]:
+            continue
+        ratio = result["us_per_op"] / old["us_per_op"]
+        line = (f"{result['name']:<28} {result['scale']:>8}  {old['us_per_op']:>10.3f} -> "
+                f"{result['us_per_op']:>10.3f} us/op  x{ratio:.2f}")
+        print(line)
+        if ratio > 1 + threshold:
+            regressions.append(line)
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Микробенчмарки горячих участков монитора")
+    parser.add_argument("--bench", nargs="+", choices=sorted(BENCHMARKS), default=list(BENCHMARKS),
+                        help="какие бенчмарки запускать (по умолчанию все)")
+    parser.add_argument("--scales", nargs="+", type=int, default=DEFAULT_SCALES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="файл результатов (по умолчанию benchmarks/results/<время>.json)")
+    parser.add_argument("--compare", help="сравнить с сохраненными результатами")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="допустимое замедление при сравнении, доля (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    report = run_benchmarks(args.bench, args.scales, args.repeat, args.seed)
+
+    output = Path(args.output) if args.output else \
+        RESULTS_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Results saved to {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.utils.body_types import BODY_TYPE_TRANSLATION
+from src.utils.cities_reference import CITIES_REFERENCE
+
+CITIES = sorted(set(CITIES_REFERENCE.values()))
+BODY_TYPES = sorted(BODY_TYPE_TRANSLATION)
+
+REGIONS = ["Московская обл.", "Свердловская обл.", "Ленинградская обл.", "Краснодарский край",
+           "Челябинская обл.", "Республика Татарстан", "Новосибирская обл.", "Ростовская обл."]
+STREETS = ["ул. Ленина", "ул. Фронтовых бригад", "пр-т Мира", "ул. Промышленная",
+           "Складской пр-д", "ул. Заводская", "ш. Энтузиастов", "ул. Транспортная"]
+CUSTOMERS = ["ООО Ромашка", "АО ТрансЛогистик", "ООО СеверСнаб", "ПАО ХимПром", "ООО Агроторг"]
+OFFSETS = [timezone.utc, timezone(timedelta(hours=3)), timezone(timedelta(hours=5)),
+           timezone(timedelta(hours=7)), timezone(timedelta(hours=10)), timezone(timedelta(hours=-3))]
+
+# Шаблоны адресов в том виде, в каком их присылает API
+ADDRESS_TEMPLATES = [
+    "г. {city}, {street}, д. {house}",
+    "{region}, г. {city}, {street} {house}",
+    "Россия, {city}, промзона",
+    "{city}, {street}, стр. {house}",
+    "{region}, {city}",
+    "г {city} {street} {house}к{building}",
+]
+
+
+def add_typo(rng: random.Random, word: str) -> str:
+    """Одна опечатка: перестановка, пропуск, удвоение или замена буквы"""
+    if len(word) < 4:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    kind = rng.randrange(4)
+    if kind == 0:
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    if kind == 1:
+        return word[:i] + word[i + 1:]
+    if kind == 2:
+        return word[:i] + word[i] + word[i:]
+    return word[:i] + rng.choice("аеиоуыяк") + word[i + 1:]
+
+
+def generate_address(rng: random.Random, city: Optional[str] = None, typo_rate: float = 0.15) -> str:
+    """Адрес со случайным городом из справочника и, иногда, опечаткой или другим регистром"""
+    city = city or rng.choice(CITIES)
+    if rng.random() < typo_rate:
+        city = add_typo(rng, city)
+    if rng.random() < 0.05:
+        city = city.lower()
+    return rng.choice(ADDRESS_TEMPLATES).format(
+        city=city, region=rng.choice(REGIONS), street=rng.choice(STREETS),
+        house=rng.randint(1, 250), building=rng.randint(1, 9))
+
+
+def _time(moment: datetime, rng: random.Random) -> Dict[str, str]:
+    value = moment.astimezone(rng.choice(OFFSETS)).isoformat(timespec="seconds")
+    return {"time": value.replace("+00:00", "Z")}
+
+
+def _auction(rng: random.Random, now: datetime) -> Dict[str, Any]:
+    """Торги в одном из форматов API: с датой окончания или с началом и длительностью"""
+    hours_left = rng.uniform(-2, 48)
+    auction: Dict[str, Any] = {
+        "timeLeft": f"{max(0, int(hours_left))} ч.",
+        "currency": rng.choice(["RUB", "RUB", "RUB", "USD"]),
+    }
+    if rng.random() < 0.8:
+        auction["endDate"] = _time(now + timedelta(hours=hours_left), rng)
+    else:
+        duration = rng.choice([3600, 7200, 86400])
+        auction["auctionType"] = "duration"
+        auction["duration"] = duration
+        auction["startDate"] = _time(now + timedelta(hours=hours_left) - timedelta(seconds=duration), rng)
+    return auction
+
+
+def generate_order(rng: random.Random, index: int, now: Optional[datetime] = None,
+                   typo_rate: float = 0.15) -> Dict[str, Any]:
+    """Один заказ: маршрут из 1-4 перевозок, типы кузова (по порядку номеров перебираются все)"""
+    now = now or datetime.now(timezone.utc)
+    shipments = []
+    departure = now + timedelta(hours=rng.uniform(6, 96))
+    for _ in range(rng.choice([1, 1, 1, 2, 2, 3, 4])):
+        arrival = departure + timedelta(hours=rng.uniform(8, 120))
+        shipments.append({
+            "npShipment": {"npGeoAddress": {"address": generate_address(rng, typo_rate=typo_rate)},
+                           "period": {"from": _time(departure, rng)}},
+            "npUnshipment": {"npGeoAddress": {"address": generate_address(rng, typo_rate=typo_rate)},
+                             "period": {"from": _time(arrival, rng)}},
+        })
+        departure = arrival
+
+    body_types = {BODY_TYPES[index % len(BODY_TYPES)]}
+    body_types.update(rng.sample(BODY_TYPES, rng.randint(0, 2)))
+    created = now - timedelta(hours=rng.uniform(1, 72))
+    has_winner = rng.random() < 0.05
+    return {
+        "id": f"syn-{index}",
+        "status": "onMatch",
+        "customer": {"customerName": rng.choice(CUSTOMERS)},
+        "auction": _auction(rng, now),
+        "matcher": {
+            "winnerExecutor": {"id": "exec-1"} if has_winner else None,
+            "matcherStatus": rng.choice(["active"] * 9 + ["finished"]),
+        },
+        "createdAt": _time(created, rng),
+        "updatedAt": _time(created + timedelta(minutes=rng.uniform(0, 600)), rng),
+        "dimensions": {"weight": rng.choice([1500, 5000, 10000, 20000, 22000]),
+                       "volume": rng.choice([10, 36, 82, 86, 120])},
+        "bodyType": sorted(body_types),
+        "distribution": {"amount": rng.randrange(10000, 500000, 500)},
+        "shipments": shipments,
+    }
+
+
+def iter_orders(count: int, seed: int = 0, start: int = 0,
+                now: Optional[datetime] = None, typo_rate: float = 0.15) -> Iterator[Dict[str, Any]]:
+    """Поток воспроизводимых заказов: одинаковый seed дает одинаковые заказы"""
+    rng = random.Random(seed)
+    now = now or datetime.now(timezone.utc)
+    for index in range(start, start + count):
+        yield generate_order(rng, index, now, typo_rate)
+
+
+def generate_orders(count: int, seed: int = 0, start: int = 0,
+                    now: Optional[datetime] = None, typo_rate: float = 0.15) -> List[Dict[str, Any]]:
+    return list(iter_orders(count, seed, start, now, typo_rate))
@@ -22,10 +22,53 @@ def load_config(config_path: str = "config.json") -> dict:
             "API_BASE_URL": config_data.get("API_BASE_URL", "https://yamagistrali.ru"),
             "TELEGRAM_BOT_TOKEN": config_data.get("TELEGRAM_BOT_TOKEN"),
             "TELEGRAM_CHANNEL_ID": config_data.get("TELEGRAM_CHANNEL_ID"),
+            "TELEGRAM_API_URL": config_data.get("TELEGRAM_API_URL", "https://api.telegram.org/bot"),
+            "TELEGRAM_DRY_RUN": config_data.get("TELEGRAM_DRY_RUN", False),
             "STATIC_TOKEN": config_data.get("STATIC_TOKEN"),
+            "ACCOUNTS": config_data.get("ACCOUNTS", []),
             "POLLING_INTERVAL": config_data.get("POLLING_INTERVAL", 300),
             "LOOKBACK_PERIOD_HOURS": config_data.get("LOOKBACK_PERIOD_HOURS", 24),
-            "MAX_CACHED_ORDERS": config_data.get("MAX_CACHED_ORDERS", 200)
+            "MAX_CACHED_ORDERS": config_data.get("MAX_CACHED_ORDERS", 10000),
+            "CITY_CACHE_SIZE": config_data.get("CITY_CACHE_SIZE", 4096),
+            "RENDER_CACHE_SIZE": config_data.get("RENDER_CACHE_SIZE", 2048),
+            "DIGEST_THRESHOLD": config_data.get("DIGEST_THRESHOLD", 10),
+            "ROUTING_RULES": config_data.get("ROUTING_RULES", []),
+            "ROUTING_DEFAULT_CHANNEL": config_data.get("ROUTING_DEFAULT_CHANNEL", True),
+            "OUTBOX_ENABLED": config_data.get("OUTBOX_ENABLED", True),
+            "OUTBOX_BATCH_SIZE": config_data.get("OUTBOX_BATCH_SIZE", 20),
+            "OUTBOX_RETRY_BASE": config_data.get("OUTBOX_RETRY_BASE", 30),
+            "OUTBOX_MAX_BACKOFF": config_data.get("OUTBOX_MAX_BACKOFF", 900),
+            "OUTBOX_MAX_ATTEMPTS": config_data.get("OUTBOX_MAX_ATTEMPTS", 50),
+            "TELEGRAM_MAX_CONCURRENCY": config_data.get("TELEGRAM_MAX_CONCURRENCY", 8),
+            "TELEGRAM_GLOBAL_RATE_PER_SEC": config_data.get("TELEGRAM_GLOBAL_RATE_PER_SEC", 30),
+            "TELEGRAM_CHAT_RATE_PER_MIN": config_data.get("TELEGRAM_CHAT_RATE_PER_MIN", 20),
+            "TELEGRAM_MAX_RETRIES": config_data.get("TELEGRAM_MAX_RETRIES", 3),
+            "TELEGRAM_SEND_TIMEOUT": config_data.get("TELEGRAM_SEND_TIMEOUT", 30),
+            "METRICS_ENABLED": config_data.get("METRICS_ENABLED", False),
+            "METRICS_HOST": config_data.get("METRICS_HOST", "127.0.0.1"),
+            "METRICS_PORT": config_data.get("METRICS_PORT", 9108),
+            "PROFILE_SPANS": config_data.get("PROFILE_SPANS", False),
+            "PROFILE_ON_START": config_data.get("PROFILE_ON_START", False),
+            "PROFILE_CAPTURE_CYCLES": config_data.get("PROFILE_CAPTURE_CYCLES", 3),
+            "PROFILE_TRACEMALLOC": config_data.get("PROFILE_TRACEMALLOC", True),
+            "PIPELINE_MODE": config_data.get("PIPELINE_MODE", False),
+            "PIPELINE_QUEUE_SIZE": config_data.get("PIPELINE_QUEUE_SIZE", 100),
+            "WATERMARK_OVERLAP_SECONDS": config_data.get("WATERMARK_OVERLAP_SECONDS", 120),
+            "API_REQUEST_TIMEOUT": config_data.get("API_REQUEST_TIMEOUT", 30),
+            "API_RECORD_DIR": config_data.get("API_RECORD_DIR", ""),
+            "API_REPLAY_FILE": config_data.get("API_REPLAY_FILE", ""),
+            "API_REPLAY_SPEED": config_data.get("API_REPLAY_SPEED", 0),
+            "API_REPLAY_SHIFT_TIME": config_data.get("API_REPLAY_SHIFT_TIME", True),
+            "API_PAGE_SIZE": config_data.get("API_PAGE_SIZE", 200),
+            "API_MAX_PAGES": config_data.get("API_MAX_PAGES", 50),
+            "API_FETCH_CONCURRENCY": config_data.get("API_FETCH_CONCURRENCY", 1),
+            "DEDUP_GRACE_HOURS": config_data.get("DEDUP_GRACE_HOURS", 24),
+            "DEDUP_DEFAULT_TTL_HOURS": config_data.get("DEDUP_DEFAULT_TTL_HOURS", 72),
+            "DEDUP_BLOOM_CAPACITY": config_data.get("DEDUP_BLOOM_CAPACITY", 0),
+            "POLLING_MIN_INTERVAL": config_data.get("POLLING_MIN_INTERVAL", 30),
+            "POLLING_MAX_INTERVAL": config_data.get("POLLING_MAX_INTERVAL", 600),
+            "POLLING_REQUESTS_PER_HOUR": config_data.get("POLLING_REQUESTS_PER_HOUR", 120),
+            "POLLING_ERROR_BACKOFF": config_data.get("POLLING_ERROR_BACKOFF", 30)
         }
         
         return _CONFIG
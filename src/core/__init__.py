@@ -1,3 +1,6 @@
 from .monitor import MagistraliMonitor
+from .pipeline import OrderPipeline
+from .router import OrderRouter
+from .scheduler import PollingScheduler
 
-__all__ = ['MagistraliMonitor']
\ No newline at end of file
+__all__ = ['MagistraliMonitor', 'OrderPipeline', 'OrderRouter', 'PollingScheduler']
@@ -1,113 +1,635 @@
 import time
 import logging
 import traceback
-from typing import Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Collection, Set, Tuple
 
 from src.config.settings import get_config, init_config  # ← ИЗМЕНИТЕ ЗДЕСЬ
-from src.services.api_client import APIClient
+from src.services.api_client import APIClient, create_session
 from src.services.telegram_service import TelegramService
-from src.utils.file_manager import load_sent_orders, save_sent_orders
-from src.utils.formatters import get_safe, format_order_message
+from src.services.outbox_worker import OutboxWorker
+from src.services.metrics_server import MetricsServer
+from src.services.replay import ReplaySource
+from src.core.pipeline import OrderPipeline
+from src.core.router import OrderRouter
+from src.core.scheduler import PollingScheduler
+from src.utils.dedup_store import SentOrdersStore
+from src.utils.sent_journal import SentOrdersJournal
+from src.utils.posted_messages import PostedMessagesStore
+from src.utils.outbox import Outbox
+from src.utils.subscriptions import SubscriptionStore
+from src.utils.timestamps import timestamp_cache_info
+from src.utils.profiling import PROFILER
+from src.utils.startup import STARTUP
+from src.utils.metrics import DEDUP_SIZE, POLL_DURATION, POSTED_MESSAGES, QUEUE_DEPTH, record_cycle
+from src.models.order import Order
+from src.utils.formatters import (
+    format_order_message, format_digest_messages, message_key, order_features, order_state,
+    CITY_RESOLVER, RENDER_CACHE
+)
 
 logger = logging.getLogger(__name__)
 
 class MagistraliMonitor:
     """Основной класс для мониторинга заказов"""
     
-    def __init__(self):
+    def __init__(self, overrides: Optional[Dict[str, Any]] = None):
         # Инициализация конфигурации
         self.config = init_config()  # Сохраняем конфиг в переменную
+        # Настройки из командной строки важнее config.json
+        self.config.update(overrides or {})
+        
+        # Воспроизведение записанных ответов API: без сети и без отправки в Telegram,
+        # состояние (журнал, сообщения, отметки) ведется отдельно от рабочего
+        self.data_dir = "data"
+        self.replay: Optional[ReplaySource] = None
+        if self.config["API_REPLAY_FILE"]:
+            self.replay = ReplaySource(self.config["API_REPLAY_FILE"],
+                                       speed=self.config["API_REPLAY_SPEED"],
+                                       shift_time=self.config["API_REPLAY_SHIFT_TIME"])
+            self.data_dir = f"data/replay/{time.strftime('%Y%m%d-%H%M%S')}"
+            self.config["TELEGRAM_DRY_RUN"] = True
+            self.config["OUTBOX_ENABLED"] = False
+            logger.info(f"Replay mode, state is kept in {self.data_dir}")
         
         # Инициализация сервисов
-        self.api_client = APIClient(self.config["STATIC_TOKEN"])
+        self.api_clients = self._create_api_clients()
+        self.api_client = self.api_clients[0]
+        self.account_stats = {client.name: self._empty_account_stats() for client in self.api_clients}
+        # Аккаунты опрашиваются параллельно, по потоку на аккаунт
+        self._fetch_executor = ThreadPoolExecutor(max_workers=len(self.api_clients),
+                                                  thread_name_prefix="api-account")
         self.telegram_service = TelegramService()
         
+        CITY_RESOLVER.resize(self.config["CITY_CACHE_SIZE"])
+        RENDER_CACHE.resize(self.config["RENDER_CACHE_SIZE"])
+        PROFILER.configure(spans=self.config["PROFILE_SPANS"],
+                           capture_cycles=self.config["PROFILE_CAPTURE_CYCLES"],
+                           trace_memory=self.config["PROFILE_TRACEMALLOC"])
+        if self.config["PROFILE_ON_START"]:
+            PROFILER.request_capture()
+        
+        self.scheduler = PollingScheduler(
+            base_interval=self.config["POLLING_INTERVAL"],
+            min_interval=self.config["POLLING_MIN_INTERVAL"],
+            max_interval=self.config["POLLING_MAX_INTERVAL"],
+            requests_per_hour=self.config["POLLING_REQUESTS_PER_HOUR"],
+            error_backoff=self.config["POLLING_ERROR_BACKOFF"]
+        )
+        
         # Загрузка отправленных заказов
-        self.sent_orders = load_sent_orders()
+        self.journal = SentOrdersJournal(f"{self.data_dir}/sent_orders.log",
+                                         f"{self.data_dir}/sent_orders.json")
+        self.sent_orders = SentOrdersStore(
+            max_size=self.config["MAX_CACHED_ORDERS"],
+            default_ttl=self.config["DEDUP_DEFAULT_TTL_HOURS"] * 3600,
+            bloom_capacity=self.config["DEDUP_BLOOM_CAPACITY"],
+            lookup=self.journal.lookup
+        )
+        self.sent_orders.load(self.journal.load())
         logger.info(f"Loaded {len(self.sent_orders)} sent orders")
+        
+        # Опубликованные сообщения для правки при изменении цены или срока торгов
+        self.posted_messages = PostedMessagesStore(f"{self.data_dir}/posted_messages.json")
+        self.posted_messages.load()
+        # Чаты, куда уже доставлены копии заказа, пока остальные не доставлены:
+        # повторная рассылка идет только в чаты с ошибкой
+        self.partial_deliveries: Dict[str, Tuple[float, Set[Optional[str]]]] = {}
+        
+        # Правила распределения заказов по дополнительным каналам
+        self.router = OrderRouter(self.config["ROUTING_RULES"],
+                                  include_default=self.config["ROUTING_DEFAULT_CHANNEL"],
+                                  default_channel=self.telegram_service.channel_id)
+        # Личные подписки диспетчеров на направления
+        self.subscriptions = SubscriptionStore()
+        self.subscriptions.load()
+        
+        # Постоянная очередь исходящих сообщений: опрос не ждет Telegram
+        self.outbox: Optional[Outbox] = None
+        self.outbox_worker: Optional[OutboxWorker] = None
+        if self.config["OUTBOX_ENABLED"]:
+            self.outbox = Outbox(f"{self.data_dir}/outbox.db")
+            self.outbox_worker = OutboxWorker(
+                self.outbox,
+                self.telegram_service.dispatcher,
+                self.telegram_service.channel_id,
+                batch_size=self.config["OUTBOX_BATCH_SIZE"],
+                retry_base=self.config["OUTBOX_RETRY_BASE"],
+                max_backoff=self.config["OUTBOX_MAX_BACKOFF"],
+                max_attempts=self.config["OUTBOX_MAX_ATTEMPTS"]
+            )
+        
+        # Значения, которые вычисляются в момент запроса метрик
+        DEDUP_SIZE.set_function(lambda: len(self.sent_orders))
+        POSTED_MESSAGES.set_function(lambda: len(self.posted_messages))
+        if self.outbox is not None:
+            QUEUE_DEPTH.set_function(lambda: {("outbox",): self.outbox.pending()}, source="outbox")
+        self.metrics_server: Optional[MetricsServer] = None
+        if self.config["METRICS_ENABLED"]:
+            self.metrics_server = MetricsServer(self.config["METRICS_HOST"], self.config["METRICS_PORT"])
     
-    def process_orders(self) -> None:
-        """Обработка заказов"""
+    def _create_api_clients(self) -> List[APIClient]:
+        """Клиенты API для аккаунтов из ACCOUNTS (или STATIC_TOKEN) с общим пулом соединений"""
+        accounts = self.config["ACCOUNTS"] or [{"name": "default", "token": self.config["STATIC_TOKEN"]}]
+        session = create_session(max(10, self.config["API_FETCH_CONCURRENCY"] * len(accounts)))
+        # Ответы воспроизводимых опросов не записываются повторно
+        record_dir = self.config["API_RECORD_DIR"] if self.replay is None else None
+        clients = []
+        for i, account in enumerate(accounts):
+            name = str(account.get("name") or f"account{i + 1}")
+            # Первый аккаунт продолжает отметку однопроцессной установки
+            watermark_file = (f"{self.data_dir}/watermark.json" if i == 0
+                              else f"{self.data_dir}/watermark_{name}.json")
+            clients.append(APIClient(account["token"], watermark_file=watermark_file,
+                                     session=self.replay.session(name) if self.replay else session,
+                                     name=name, lookback_hours=account.get("lookback_hours"),
+                                     record_dir=record_dir))
+        if len(clients) > 1:
+            logger.info(f"Monitoring {len(clients)} accounts: {', '.join(c.name for c in clients)}")
+        return clients
+    
+    @staticmethod
+    def _empty_account_stats() -> Dict[str, Any]:
+        return {
+            'received': 0,
+            'new': 0,
+            'errors': 0,
+            'requests': 0,
+            'last_poll_ms': 0
+        }
+    
+    def _fetch_account(self, client: APIClient) -> List[Order]:
+        """Опрос одного аккаунта с учетом статистики"""
+        stats = self.account_stats[client.name]
+        requests_before = client.requests_made
+        started = time.perf_counter()
+        orders = client.get_active_orders()
+        stats['last_poll_ms'] = round((time.perf_counter() - started) * 1000)
+        stats['requests'] += client.requests_made - requests_before
+        if client.last_error:
+            stats['errors'] += 1
+        else:
+            stats['received'] += len(orders)
+        return orders
+    
+    def fetch_orders(self) -> Tuple[List[Tuple[Order, str]], int, List[APIClient]]:
+        """Параллельный опрос всех аккаунтов: заказы с именем аккаунта,
+        число запросов и аккаунты, опрос которых прошел без ошибок"""
+        requests_before = sum(client.requests_made for client in self.api_clients)
+        if len(self.api_clients) == 1:
+            results = [self._fetch_account(self.api_client)]
+        else:
+            results = list(self._fetch_executor.map(self._fetch_account, self.api_clients))
+        requests = sum(client.requests_made for client in self.api_clients) - requests_before
+        
+        orders = []
+        succeeded = []
+        seen = set()
+        for client, client_orders in zip(self.api_clients, results):
+            if client.last_error:
+                continue
+            succeeded.append(client)
+            for order in client_orders:
+                # Заказ, видимый нескольким аккаунтам, обрабатывается один раз
+                if order.id and order.id in seen:
+                    continue
+                seen.add(order.id)
+                orders.append((order, client.name))
+        return orders, requests, succeeded
+    
+    def get_skip_reason(self, order_id: str, order: Order,
+                        queued_ids: Optional[Collection[str]] = None) -> Optional[str]:
+        """Причина пропуска заказа или None, если заказ нужно отправить"""
+        # Проверка на уже отправленные заказы
+        if order_id in self.sent_orders or (queued_ids and order_id in queued_ids):
+            logger.debug(f"Order {order_id} already sent")
+            return 'already_sent'
+            
+        # Проверка активности торгов
+        if not self.api_client.is_active_auction(order):
+            logger.debug(f"Order {order_id} skipped - auction not active")
+            return 'not_active'
+            
+        return None
+    
+    def get_deadline(self, order: Order) -> Optional[float]:
+        """Момент окончания торгов (epoch) или None"""
         try:
-            orders = self.api_client.get_active_orders()
+            end_time = self.api_client.get_auction_end(order)
+        except Exception as e:
+            logger.debug(f"Cannot determine auction end: {str(e)}")
+            return None
+        return end_time.timestamp() if end_time is not None else None
+    
+    def register_new_order(self, order: Order) -> Optional[float]:
+        """Учет нового заказа в планировщике; возвращает момент истечения для дедупликации"""
+        deadline = self.get_deadline(order)
+        self.scheduler.record_new_order(deadline - time.time() if deadline is not None else None)
+        if deadline is None:
+            return None
+        return deadline + self.config["DEDUP_GRACE_HOURS"] * 3600
+    
+    def mark_sent(self, order_id: str, expires_at: Optional[float] = None) -> None:
+        """Отметка заказа, доставленного во все чаты, как отправленного с дозаписью в журнал"""
+        self.partial_deliveries.pop(order_id, None)
+        if order_id not in self.sent_orders:
+            expires_at = self.sent_orders.add(order_id, expires_at)
+            self.journal.append(order_id, expires_at)
+    
+    def record_delivery(self, message_data: Dict[str, Any], order_id: str,
+                        expires_at: Optional[float] = None) -> None:
+        """Учет копии заказа, доставленной в один чат; опубликованное сообщение запоминается для правок"""
+        if expires_at is None:
+            expires_at = time.time() + self.config["DEDUP_DEFAULT_TTL_HOURS"] * 3600
+        chats = self.partial_deliveries.setdefault(order_id, (expires_at, set()))[1]
+        chats.add(message_data.get("chat_id"))
+        if not message_data.get("digest") and message_data.get("message_id") is not None:
+            self.record_posted(message_data, message_data["message_id"], expires_at)
+    
+    def is_delivered(self, order_id: str, chat_id: Optional[str]) -> bool:
+        """Копия заказа уже доставлена в чат при прошлой, частично неудачной рассылке"""
+        partial = self.partial_deliveries.get(order_id)
+        if partial is not None and chat_id in partial[1]:
+            return True
+        # После перезапуска о доставке говорит опубликованное сообщение
+        return self.posted_messages.get(message_key({"order_id": order_id, "chat_id": chat_id})) is not None
+    
+    def undelivered(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Копии сообщения для чатов, куда заказ еще не доставлен"""
+        return [message_data for message_data in messages
+                if not self.is_delivered(message_data["order_id"], message_data.get("chat_id"))]
+    
+    def record_posted(self, message_data: Dict[str, Any], message_id: int,
+                      expires_at: Optional[float]) -> None:
+        """Запоминание опубликованного сообщения для последующих правок"""
+        if expires_at is None:
+            expires_at = time.time() + self.config["DEDUP_DEFAULT_TTL_HOURS"] * 3600
+        self.posted_messages.record(message_key(message_data), message_id,
+                                    message_data.get("state", ""), expires_at,
+                                    order_id=message_data["order_id"],
+                                    chat_id=message_data.get("chat_id"))
+    
+    def route(self, order: Order) -> List[Optional[str]]:
+        """Чаты для заказа: основной канал (None), каналы по правилам и подписчики"""
+        if not len(self.subscriptions):
+            return self.router.route(order)
+        features = order_features(order)
+        chats = self.router.route(order, features)
+        subscribers = self.subscriptions.match(features).difference(chats)
+        return chats + sorted(subscribers)
+    
+    def route_message(self, message_data: Dict[str, Any], order: Order) -> List[Dict[str, Any]]:
+        """Копии сообщения для каждого чата, в который попадает заказ"""
+        routed = []
+        for chat_id in self.route(order):
+            copy = dict(message_data)
+            if chat_id is not None:
+                copy["chat_id"] = chat_id
+            routed.append(copy)
+        return routed
+    
+    def get_updates(self, order_id: str, order: Order) -> List[Dict[str, Any]]:
+        """Правки опубликованных сообщений, если изменились цена или срок торгов
+        либо торги завершились; пустой список, если править нечего"""
+        posted_messages = [posted for posted in self.posted_messages.for_order(order_id)
+                           if not posted.closed]
+        if not posted_messages:
+            return []
+        
+        closed = not self.api_client.is_active_auction(order)
+        # Сообщение форматируется, только если есть что править
+        if not closed:
+            state = order_state(order)
+            posted_messages = [posted for posted in posted_messages if posted.state != state]
+            if not posted_messages:
+                return []
+        message_data = format_order_message(order, closed=closed)
+        if not message_data:
+            return []
+        
+        updates = []
+        for posted in posted_messages:
+            update = dict(message_data, edit=True, message_id=posted.message_id, closed=closed)
+            if posted.chat_id is not None:
+                update["chat_id"] = posted.chat_id
+            updates.append(update)
+        return updates
+    
+    def mark_updated(self, message_data: Dict[str, Any]) -> None:
+        """Учет успешной правки опубликованного сообщения"""
+        self.posted_messages.update(message_key(message_data), message_data.get("state", ""),
+                                    closed=message_data.get("closed", False))
+    
+    def message_expiry(self, message_data: Dict[str, Any],
+                       queued_ids: Dict[str, Optional[float]]) -> Optional[float]:
+        """Момент, после которого сообщение в очереди уже не нужно отправлять"""
+        if message_data.get("edit"):
+            posted = self.posted_messages.get(message_key(message_data))
+            return posted.expires_at if posted is not None else None
+        expiries = [queued_ids.get(order_id) for order_id in
+                    message_data.get("order_ids", [message_data["order_id"]])]
+        if None in expiries:
+            return None
+        return max(expiries, default=None)
+    
+    def enqueue_messages(self, messages: List[Dict[str, Any]],
+                         queued_ids: Dict[str, Optional[float]]) -> Dict[str, bool]:
+        """Постановка сообщений в постоянную очередь, результат по ключу сообщения"""
+        return {message_key(message_data): self.outbox.enqueue(
+                    message_data, self.message_expiry(message_data, queued_ids))
+                for message_data in messages}
+    
+    def collect_deliveries(self) -> None:
+        """Учет сообщений, доставленных фоновым обработчиком очереди"""
+        if self.outbox is None:
+            return
+        delivered = self.outbox.delivered_items()
+        if not delivered:
+            return
+        for item in delivered:
+            message_data = item.message_data
+            if message_data.get("edit"):
+                self.mark_updated(message_data)
+            elif not message_data.get("digest") and item.message_id is not None:
+                self.record_posted(message_data, item.message_id, item.expires_at)
+        # Записи удаляются из очереди только после сохранения message_id
+        if self.posted_messages.save():
+            self.outbox.remove(delivered)
+    
+    def finish_cycle(self) -> None:
+        """Обслуживание хранилищ после цикла опроса"""
+        self.collect_deliveries()
+        self.subscriptions.reload_if_changed()
+        # Удаление устаревших записей и компактизация журнала (в фоне, при необходимости)
+        self.sent_orders.expire()
+        self.journal.maybe_compact(self.sent_orders)
+        self.posted_messages.expire()
+        self.posted_messages.save()
+        if self.partial_deliveries:
+            now = time.time()
+            self.partial_deliveries = {order_id: partial for order_id, partial in self.partial_deliveries.items()
+                                       if partial[0] > now}
+        logger.info(f"Dedup store: {self.sent_orders.stats()}, "
+                    f"posted messages: {self.posted_messages.stats()}")
+        if self.outbox is not None:
+            logger.info(f"Outbox: {self.outbox.stats()}")
+        if len(self.api_clients) > 1:
+            logger.info(f"Accounts: {self.account_stats}")
+    
+    def process_orders(self) -> bool:
+        """Обработка заказов; False, если опрос завершился ошибкой"""
+        PROFILER.begin_cycle()
+        try:
+            with POLL_DURATION.time():
+                return self._process_orders()
+        finally:
+            PROFILER.end_cycle()
+    
+    def _process_orders(self) -> bool:
+        try:
+            with PROFILER.span("deliveries"):
+                self.collect_deliveries()
+            with PROFILER.span("fetch"):
+                fetched, requests, succeeded = self.fetch_orders()
+                self.scheduler.record_requests(requests)
+            # Ошибка опроса - только если не ответил ни один аккаунт
+            if not succeeded:
+                return False
+            orders = [order for order, _ in fetched]
+            accounts = {order.id: account for order, account in fetched}
+
             new_count = 0
             skipped_count = 0
+            failed_count = 0
+            updated_count = 0
+            new_orders = []
+            pending = []
+            updates = []
+            queued_ids = {}
             skipped_reasons = {
                 'already_sent': 0,
                 'not_active': 0,
+                'not_routed': 0,
                 'invalid_data': 0
             }
             
             logger.info(f"Starting processing of {len(orders)} orders")
             
-            for order in orders:
-                order_id = get_safe(order, ["id"])
-                if not order_id:
-                    logger.debug(f"Skipped order without ID: {order}")
-                    skipped_count += 1
-                    skipped_reasons['invalid_data'] += 1
-                    continue
-                    
-                # Проверка на уже отправленные заказы
-                if order_id in self.sent_orders:
-                    logger.debug(f"Order {order_id} already sent")
-                    skipped_count += 1
-                    skipped_reasons['already_sent'] += 1
-                    continue
-                    
-                # Проверка активности торгов
-                if not self.api_client.is_active_auction(order):
-                    logger.debug(f"Order {order_id} skipped - auction not active")
-                    skipped_count += 1
-                    skipped_reasons['not_active'] += 1
-                    continue
+            with PROFILER.span("filter"):
+                for order in orders:
+                    order_id = order.id
+                    if not order_id:
+                        logger.debug(f"Skipped order without ID: {order}")
+                        skipped_count += 1
+                        skipped_reasons['invalid_data'] += 1
+                        continue
                     
-                # Форматирование и отправка сообщения
-                message_data = format_order_message(order)
-                if not message_data:
-                    logger.warning(f"Failed to format message for order {order_id}")
-                    skipped_count += 1
-                    skipped_reasons['invalid_data'] += 1
-                    continue
+                    reason = self.get_skip_reason(order_id, order, queued_ids)
+                    if reason == 'already_sent' and order_id not in queued_ids:
+                        order_updates = self.get_updates(order_id, order)
+                        if order_updates:
+                            updates.extend(order_updates)
+                            continue
+                    if reason:
+                        skipped_count += 1
+                        skipped_reasons[reason] += 1
+                        continue
                     
-                if self.telegram_service.send_message(message_data):
-                    self.sent_orders.add(order_id)
-                    new_count += 1
-                    logger.info(f"Successfully sent order {order_id}")
+                    new_orders.append(order)
+                    queued_ids[order_id] = None
+            
+            # Заказ -> доставлены ли в этом цикле все его копии
+            delivered: Dict[str, bool] = {}
+            
+            # При всплеске новые заказы объединяются в сводки, иначе - по сообщению на заказ
+            with PROFILER.span("format"):
+                threshold = self.config["DIGEST_THRESHOLD"]
+                if threshold and len(new_orders) > threshold:
+                    # Отдельные сводки для каждого канала из его заказов
+                    by_chat: Dict[Optional[str], List[Order]] = {}
+                    for order in new_orders:
+                        chats = self.route(order)
+                        if not chats:
+                            skipped_count += 1
+                            skipped_reasons['not_routed'] += 1
+                            continue
+                        queued_ids[order.id] = self.register_new_order(order)
+                        chats = [chat_id for chat_id in chats if not self.is_delivered(order.id, chat_id)]
+                        if not chats:
+                            delivered[order.id] = True
+                        for chat_id in chats:
+                            by_chat.setdefault(chat_id, []).append(order)
+                    for chat_id, chat_orders in by_chat.items():
+                        for digest in format_digest_messages(chat_orders):
+                            if chat_id is not None:
+                                digest["chat_id"] = chat_id
+                            pending.append(digest)
+                    logger.info(f"Burst of {len(new_orders)} new orders, "
+                                f"sending {len(pending)} digest messages")
                 else:
-                    logger.warning(f"Failed to send order {order_id}")
-                    skipped_count += 1
-                    skipped_reasons['invalid_data'] += 1
+                    for order in new_orders:
+                        # Форматирование сообщения
+                        message_data = format_order_message(order)
+                        if not message_data:
+                            logger.warning(f"Failed to format message for order {order.id}")
+                            skipped_count += 1
+                            skipped_reasons['invalid_data'] += 1
+                            continue
+                        routed = self.route_message(message_data, order)
+                        if not routed:
+                            # Без основного канала заказ может не попасть ни в один чат
+                            logger.debug(f"Order {order.id} matches no channel")
+                            skipped_count += 1
+                            skipped_reasons['not_routed'] += 1
+                            continue
+                        queued_ids[order.id] = self.register_new_order(order)
+                        routed = self.undelivered(routed)
+                        if not routed:
+                            # Все копии доставлены при прошлых попытках
+                            delivered[order.id] = True
+                        pending.extend(routed)
+            
+            # Параллельная отправка с учетом лимитов Telegram
+            with PROFILER.span("send"):
+                messages = pending + updates
+                if self.outbox is not None:
+                    # Доставкой занимается фоновый обработчик, сообщения уже сохранены на диске
+                    results = self.enqueue_messages(messages, queued_ids)
+                else:
+                    results = self.telegram_service.send_messages(messages)
+            with PROFILER.span("bookkeeping"):
+                for message_data in messages:
+                    order_id = message_data["order_id"]
+                    sent = results.get(message_key(message_data))
+                    if sent and message_data.get("edit"):
+                        # При работе через очередь состояние обновится после доставки
+                        if self.outbox is None:
+                            self.mark_updated(message_data)
+                        updated_count += 1
+                        logger.info(f"Updated message for order {order_id}"
+                                    f"{' (closed)' if message_data.get('closed') else ''}")
+                    elif sent and message_data.get("digest"):
+                        for digest_order_id in message_data["order_ids"]:
+                            self.record_delivery(message_data, digest_order_id, queued_ids.get(digest_order_id))
+                            delivered.setdefault(digest_order_id, True)
+                        logger.info(f"Successfully sent digest of {len(message_data['order_ids'])} orders")
+                    elif sent:
+                        self.record_delivery(message_data, order_id, queued_ids.get(order_id))
+                        delivered.setdefault(order_id, True)
+                        logger.info(f"Successfully sent order {order_id}")
+                    else:
+                        for failed_order_id in message_data.get("order_ids", [order_id]):
+                            delivered[failed_order_id] = False
+                        failed = len(message_data.get("order_ids", [order_id]))
+                        logger.warning(f"Failed to send {'digest ' if message_data.get('digest') else ''}"
+                                       f"order {order_id}")
+                        skipped_count += failed
+                        skipped_reasons['invalid_data'] += failed
+                        failed_count += failed
+            
+                # Заказ отправлен, когда доставлены все его копии; иначе следующий
+                # опрос разошлет его только в чаты, где доставка не удалась
+                for delivered_id, complete in delivered.items():
+                    if not complete:
+                        continue
+                    if delivered_id not in self.sent_orders:
+                        self.account_stats[accounts[delivered_id]]['new'] += 1
+                    self.mark_sent(delivered_id, queued_ids.get(delivered_id))
+                    new_count += 1
+                
+                # Отметка сдвигается только если все заказы окна обработаны,
+                # иначе следующий опрос повторно запросит неотправленные
+                if failed_count == 0:
+                    for client in succeeded:
+                        client.commit_watermark()
             
             # Логируем статистику обработки
             logger.info(
                 f"Processing completed. "
                 f"Total: {len(orders)}, "
                 f"New: {new_count}, "
+                f"Updated: {updated_count}, "
                 f"Skipped: {skipped_count} "
                 f"(reasons: {skipped_reasons})"
             )
+            record_cycle(new_count, updated_count, skipped_reasons)
+            logger.info(f"City cache: {CITY_RESOLVER.stats()}")
+            logger.info(f"Timestamp cache: {timestamp_cache_info()}")
+            logger.info(f"Render cache (cycle): {RENDER_CACHE.take_cycle_stats()}")
             
-            # Сохраняем отправленные заказы
-            save_sent_orders(self.sent_orders)
+            with PROFILER.span("maintenance"):
+                self.finish_cycle()
+            return True
             
         except Exception as e:
             logger.error(f"Error in order processing: {str(e)}\n{traceback.format_exc()}")
+            return False
+    
+    def run_replay(self) -> None:
+        """Прогон записанных опросов через обработку заказов, затем итоговая статистика"""
+        logger.info("Replaying recorded API responses")
+        started = time.perf_counter()
+        cycles = 0
+        while self.replay.has_more():
+            self.process_orders()
+            cycles += 1
+            delay = self.replay.next_delay()
+            if delay > 0:
+                time.sleep(delay)
+        elapsed = time.perf_counter() - started
+        logger.info(f"Replay finished: {cycles} cycles in {elapsed:.2f} sec, "
+                    f"accounts {self.replay.stats()}, {len(self.sent_orders)} orders marked as sent, "
+                    f"state in {self.data_dir}")
     
     def run_monitoring(self) -> None:
         """Основной цикл мониторинга"""
         logger.info("Starting monitoring of active auctions")
         
-        if not self.api_client.verify_token():
-            logger.error("Invalid token, check settings")
+        # Аккаунты с недействительным токеном отключаются, мониторинг идет по остальным
+        valid = []
+        for client in self.api_clients:
+            if client.verify_token():
+                valid.append(client)
+            else:
+                logger.error(f"Invalid token for account {client.name}, account disabled, check settings")
+                self.account_stats.pop(client.name, None)
+        if not valid:
+            logger.error("No account with a valid token, monitoring is not started")
+            return
+        self.api_clients = valid
+        self.api_client = valid[0]
+        STARTUP.mark("tokens verified")
+        if self.replay is not None:
+            STARTUP.finish()
+            self.run_replay()
             return
         self.telegram_service.send_startup_message()
+        STARTUP.mark("startup message sent")
+        STARTUP.finish()
+        if self.metrics_server is not None:
+            self.metrics_server.start()
+        PROFILER.install_signal_handler()
+
+        if self.config["PIPELINE_MODE"]:
+            logger.info("Running in asyncio pipeline mode")
+            self.telegram_service.loop.run_until_complete(OrderPipeline(self).run())
+            return
+
+        if self.outbox_worker is not None:
+            # Цикл событий Telegram переходит в поток обработчика очереди
+            self.outbox_worker.start_thread(self.telegram_service.loop)
 
         while True:
             try:
-                self.process_orders()
-                time.sleep(self.config["POLLING_INTERVAL"])
+                if self.process_orders():
+                    delay = self.scheduler.next_delay()
+                else:
+                    delay = self.scheduler.error_delay()
+                    logger.warning(f"Polling failed ({self.scheduler.errors} in a row), "
+                                   f"retrying in {delay:.0f} sec")
+                logger.info(f"Next poll in {delay:.0f} sec")
+                time.sleep(delay)
                 
             except Exception as e:
                 logger.error(f"Error in main loop: {str(e)}\n{traceback.format_exc()}")
-                time.sleep(60)
\ No newline at end of file
+                time.sleep(self.scheduler.error_delay())
\ No newline at end of file
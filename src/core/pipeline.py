@@ -0,0 +1,292 @@
+import asyncio
+import concurrent.futures
+import logging
+import traceback
+from typing import TYPE_CHECKING, Dict, Optional
+
+from src.utils.formatters import format_order_message, RENDER_CACHE
+from src.utils.metrics import QUEUE_DEPTH, record_cycle
+from src.utils.profiling import PROFILER
+
+if TYPE_CHECKING:
+    from src.core.monitor import MagistraliMonitor
+    from src.services.api_client import APIClient
+
+logger = logging.getLogger(__name__)
+
+# Маркер завершения работы для стадий конвейера
+_STOP = object()
+
+
+class OrderPipeline:
+    """Асинхронный конвейер fetch -> filter -> format -> send на ограниченных очередях"""
+
+    def __init__(self, monitor: "MagistraliMonitor"):
+        self.monitor = monitor
+        self.config = monitor.config
+        queue_size = self.config["PIPELINE_QUEUE_SIZE"]
+        self.raw_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.format_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.send_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        # Заказы, которые уже прошли фильтр, но еще не отправлены
+        self.in_flight: Dict[str, Optional[float]] = {}
+        # Сколько сообщений заказа (по каналам) еще не обработано стадией отправки
+        self._messages_left: Dict[str, int] = {}
+        # Новые заказы в рассылке: доставлены ли пока все их копии
+        self._delivered: Dict[str, bool] = {}
+        self.send_failures = 0
+        self._stopping = False
+        self.stats = self._empty_stats()
+        QUEUE_DEPTH.set_function(lambda: {(name,): depth for name, depth in self.queue_depths().items()},
+                                 source="pipeline")
+
+    @staticmethod
+    def _empty_stats() -> Dict[str, int]:
+        return {
+            'received': 0,
+            'new': 0,
+            'updated': 0,
+            'already_sent': 0,
+            'not_active': 0,
+            'not_routed': 0,
+            'invalid_data': 0
+        }
+
+    def _message_done(self, order_id: str) -> None:
+        """Заказ покидает in_flight, когда обработаны сообщения во все его каналы"""
+        left = self._messages_left.get(order_id, 1) - 1
+        if left > 0:
+            self._messages_left[order_id] = left
+            return
+        self._messages_left.pop(order_id, None)
+        # Заказ отмечается отправленным, только когда доставлены все копии
+        if self._delivered.pop(order_id, False):
+            self.monitor.mark_sent(order_id, self.in_flight.get(order_id))
+            self.stats['new'] += 1
+        self.in_flight.pop(order_id, None)
+
+    def _send_failed(self, order_id: str) -> None:
+        """Недоставленная копия: заказ останется неотправленным и держит отметку опроса"""
+        self.send_failures += 1
+        if order_id in self._delivered:
+            self._delivered[order_id] = False
+
+    def queue_depths(self) -> Dict[str, int]:
+        """Текущая заполненность очередей"""
+        return {
+            'raw': self.raw_queue.qsize(),
+            'format': self.format_queue.qsize(),
+            'send': self.send_queue.qsize()
+        }
+
+    def _commit_watermark(self) -> None:
+        """Сдвиг отметки опроса, когда все ранее полученные заказы обработаны"""
+        if self.in_flight or not self.raw_queue.empty() or self.send_failures:
+            self.send_failures = 0
+            return
+        for client in self.monitor.api_clients:
+            if not client.last_error:
+                client.commit_watermark()
+
+    def _fetch_into_queue(self, loop: asyncio.AbstractEventLoop, client: "APIClient") -> int:
+        """Потоковая загрузка в рабочем потоке: каждый заказ сразу попадает в очередь"""
+        received = 0
+        for order in client.iter_active_orders():
+            # put() ждет, пока в очереди не освободится место
+            future = asyncio.run_coroutine_threadsafe(self.raw_queue.put(order), loop)
+            while True:
+                try:
+                    future.result(timeout=1)
+                    break
+                except concurrent.futures.TimeoutError:
+                    if self._stopping:
+                        future.cancel()
+                        return received
+            received += 1
+        return received
+
+    async def fetch_stage(self, max_cycles: Optional[int] = None) -> None:
+        """Периодический опрос API; блокирующий запрос выполняется в отдельном потоке"""
+        scheduler = self.monitor.scheduler
+        cycle = 0
+        while True:
+            try:
+                logger.info(f"Pipeline cycle stats: {self.stats}, queues: {self.queue_depths()}")
+                logger.info(f"Render cache (cycle): {RENDER_CACHE.take_cycle_stats()}")
+                record_cycle(self.stats['new'], self.stats['updated'],
+                             {reason: self.stats[reason]
+                              for reason in ('already_sent', 'not_active', 'not_routed', 'invalid_data')})
+                self.stats = self._empty_stats()
+                with PROFILER.span("maintenance"):
+                    self.monitor.finish_cycle()
+                    self._commit_watermark()
+                # Граница цикла: стадии конвейера работают параллельно,
+                # поэтому замеры цикла охватывают и обработку предыдущего опроса
+                PROFILER.end_cycle()
+                PROFILER.begin_cycle()
+
+                # Аккаунты опрашиваются параллельно и пишут в общую очередь
+                clients = self.monitor.api_clients
+                loop = asyncio.get_running_loop()
+                requests_before = sum(client.requests_made for client in clients)
+                with PROFILER.span("fetch"):
+                    counts = await asyncio.gather(*(asyncio.to_thread(self._fetch_into_queue, loop, client)
+                                                    for client in clients))
+                scheduler.record_requests(sum(client.requests_made for client in clients)
+                                          - requests_before)
+                for client, count in zip(clients, counts):
+                    account = self.monitor.account_stats[client.name]
+                    if client.last_error:
+                        account['errors'] += 1
+                    else:
+                        account['received'] += count
+                if all(client.last_error for client in clients):
+                    delay = scheduler.error_delay()
+                    logger.warning(f"Polling failed ({scheduler.errors} in a row), "
+                                   f"retrying in {delay:.0f} sec")
+                    await asyncio.sleep(delay)
+                    continue
+                self.stats['received'] += sum(counts)
+
+                cycle += 1
+                if max_cycles is not None and cycle >= max_cycles:
+                    await self.raw_queue.put(_STOP)
+                    return
+                delay = scheduler.next_delay()
+                logger.info(f"Next poll in {delay:.0f} sec")
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in fetch stage: {str(e)}\n{traceback.format_exc()}")
+                await asyncio.sleep(scheduler.error_delay())
+
+    async def filter_stage(self) -> None:
+        """Отбор новых активных заказов"""
+        while True:
+            order = await self.raw_queue.get()
+            try:
+                if order is _STOP:
+                    await self.format_queue.put(_STOP)
+                    return
+                order_id = order.id
+                if not order_id:
+                    self.stats['invalid_data'] += 1
+                    continue
+                with PROFILER.span("filter"):
+                    reason = self.monitor.get_skip_reason(order_id, order, self.in_flight)
+                    updates = []
+                    if reason == 'already_sent' and order_id not in self.in_flight:
+                        updates = self.monitor.get_updates(order_id, order)
+                if updates:
+                    # Правки уже отрисованы, стадию форматирования пропускаем
+                    self.in_flight[order_id] = None
+                    self._messages_left[order_id] = len(updates)
+                    for update in updates:
+                        await self.send_queue.put(update)
+                    continue
+                if reason:
+                    self.stats[reason] += 1
+                    continue
+                self.in_flight[order_id] = self.monitor.register_new_order(order)
+                await self.format_queue.put(order)
+            except Exception as e:
+                logger.error(f"Error in filter stage: {str(e)}")
+            finally:
+                self.raw_queue.task_done()
+
+    async def format_stage(self) -> None:
+        """Форматирование сообщений"""
+        while True:
+            order = await self.format_queue.get()
+            try:
+                if order is _STOP:
+                    await self.send_queue.put(_STOP)
+                    return
+                with PROFILER.span("format"):
+                    message_data = format_order_message(order)
+                if not message_data:
+                    order_id = order.id
+                    logger.warning(f"Failed to format message for order {order_id}")
+                    self.in_flight.pop(order_id, None)
+                    self.stats['invalid_data'] += 1
+                    continue
+                routed = self.monitor.route_message(message_data, order)
+                if not routed:
+                    # Ни одно правило не подошло: заказ не должен держать отметку опроса
+                    logger.debug(f"Order {order.id} matches no channel")
+                    self.in_flight.pop(order.id, None)
+                    self.stats['not_routed'] += 1
+                    continue
+                routed = self.monitor.undelivered(routed)
+                self._delivered[order.id] = True
+                if not routed:
+                    # Все копии доставлены при прошлых попытках
+                    self._message_done(order.id)
+                    continue
+                self._messages_left[order.id] = len(routed)
+                for routed_message in routed:
+                    await self.send_queue.put(routed_message)
+            except Exception as e:
+                logger.error(f"Error in format stage: {str(e)}")
+            finally:
+                self.format_queue.task_done()
+
+    async def send_stage(self) -> None:
+        """Отправка сообщений; несколько экземпляров работают параллельно"""
+        dispatcher = self.monitor.telegram_service.dispatcher
+        channel_id = self.monitor.telegram_service.channel_id
+        outbox = self.monitor.outbox
+        while True:
+            message_data = await self.send_queue.get()
+            try:
+                if message_data is _STOP:
+                    await self.send_queue.put(_STOP)
+                    return
+                order_id = message_data["order_id"]
+                with PROFILER.span("send"):
+                    if outbox is not None:
+                        # Доставку выполняет обработчик очереди, работающий рядом с конвейером
+                        # Запись в SQLite блокирует, поэтому выполняется вне цикла событий
+                        sent = await asyncio.to_thread(
+                            outbox.enqueue, message_data, self.monitor.message_expiry(message_data, self.in_flight))
+                    else:
+                        sent = await dispatcher.send(message_data.get("chat_id") or channel_id, message_data)
+                if sent and message_data.get("edit"):
+                    if outbox is None:
+                        self.monitor.mark_updated(message_data)
+                    self.stats['updated'] += 1
+                    logger.info(f"Updated message for order {order_id}")
+                elif sent:
+                    self.monitor.record_delivery(message_data, order_id, self.in_flight.get(order_id))
+                    logger.info(f"Successfully sent order {order_id}")
+                else:
+                    logger.warning(f"Failed to send order {order_id}")
+                    self.stats['invalid_data'] += 1
+                    self._send_failed(order_id)
+                self._message_done(order_id)
+            except Exception as e:
+                logger.error(f"Error in send stage: {str(e)}")
+                self._send_failed(message_data.get("order_id"))
+                self._message_done(message_data.get("order_id"))
+            finally:
+                self.send_queue.task_done()
+
+    async def run(self, max_cycles: Optional[int] = None) -> None:
+        """Запуск всех стадий конвейера (max_cycles ограничивает число опросов)"""
+        senders = [self.send_stage() for _ in range(self.config["TELEGRAM_MAX_CONCURRENCY"])]
+        stages = [self.fetch_stage(max_cycles), self.filter_stage(), self.format_stage(), *senders]
+        tasks = [asyncio.create_task(stage) for stage in stages]
+        worker = self.monitor.outbox_worker
+        worker_task = asyncio.create_task(worker.run()) if worker is not None else None
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            self._stopping = True
+            for task in tasks:
+                task.cancel()
+            if worker_task is not None:
+                worker_task.cancel()
+            PROFILER.end_cycle()
+            self.monitor.journal.close()
+            self.monitor.posted_messages.save()
@@ -0,0 +1,44 @@
+import logging
+from typing import Any, Dict, List, Optional
+
+from src.models.order import Order
+from src.utils.filter_index import FilterIndex, OrderFeatures, OrderFilter
+from src.utils.formatters import order_features
+
+logger = logging.getLogger(__name__)
+
+
+class OrderRouter:
+    """Распределение заказов по каналам Telegram по правилам из конфигурации
+
+    None в результате означает основной канал TELEGRAM_CHANNEL_ID.
+    """
+
+    def __init__(self, rules: List[Dict[str, Any]], include_default: bool = True,
+                 default_channel: Optional[str] = None):
+        self.include_default = include_default
+        self.default_channel = str(default_channel) if default_channel is not None else None
+        self.index = FilterIndex()
+        self._channels: Dict[int, str] = {}
+        for rule in rules or []:
+            try:
+                channel = str(rule["channel"])
+                self._channels[self.index.add(OrderFilter.from_dict(rule))] = channel
+            except Exception as e:
+                logger.error(f"Invalid routing rule {rule}: {str(e)}")
+        if self._channels:
+            logger.info(f"Loaded {len(self._channels)} routing rules "
+                        f"for {len(set(self._channels.values()))} channels")
+
+    def route(self, order: Order, features: Optional[OrderFeatures] = None) -> List[Optional[str]]:
+        """Каналы, в которые нужно отправить заказ"""
+        chats: List[Optional[str]] = [None] if self.include_default else []
+        if not self._channels:
+            return chats
+        if features is None:
+            features = order_features(order)
+        matched = {self._channels[rule_id] for rule_id in self.index.match(features)}
+        if self.include_default:
+            matched.discard(self.default_channel)
+        chats.extend(sorted(matched))
+        return chats
@@ -0,0 +1,84 @@
+import logging
+import random
+import time
+from collections import deque
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PollingScheduler:
+    """Адаптивный интервал опроса: по потоку новых заказов, срокам торгов и ошибкам"""
+
+    def __init__(self, base_interval: float, min_interval: float, max_interval: float,
+                 requests_per_hour: int, error_backoff: float,
+                 speedup: float = 0.5, slowdown: float = 1.5, deadline_fraction: float = 0.25):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.requests_per_hour = requests_per_hour
+        self.error_backoff = error_backoff
+        self.speedup = speedup
+        self.slowdown = slowdown
+        # Доля оставшегося времени торгов, за которую нужно успеть опросить API снова
+        self.deadline_fraction = deadline_fraction
+        self.interval = self._clamp(base_interval)
+        self.errors = 0
+        self._new_orders = 0
+        self._nearest_deadline: Optional[float] = None
+        self._requests: deque = deque()
+
+    def _clamp(self, interval: float) -> float:
+        return max(self.min_interval, min(self.max_interval, interval))
+
+    def record_new_order(self, seconds_left: Optional[float] = None) -> None:
+        """Учет нового заказа и времени до окончания его торгов"""
+        self._new_orders += 1
+        if seconds_left is not None and seconds_left > 0:
+            if self._nearest_deadline is None or seconds_left < self._nearest_deadline:
+                self._nearest_deadline = seconds_left
+
+    def record_requests(self, count: int) -> None:
+        """Учет запросов к API для соблюдения часового бюджета"""
+        now = time.monotonic()
+        self._requests.extend([now] * count)
+
+    def next_delay(self) -> float:
+        """Пауза после успешного опроса"""
+        self.errors = 0
+        if self._new_orders:
+            self.interval = self._clamp(self.interval * self.speedup)
+        else:
+            self.interval = self._clamp(self.interval * self.slowdown)
+
+        delay = self.interval
+        if self._nearest_deadline is not None:
+            delay = min(delay, self._nearest_deadline * self.deadline_fraction)
+
+        logger.debug(f"Polling: new={self._new_orders}, nearest deadline={self._nearest_deadline}, "
+                     f"interval={self.interval:.0f}")
+        self._new_orders = 0
+        self._nearest_deadline = None
+        return self._apply_budget(self._clamp(delay))
+
+    def error_delay(self) -> float:
+        """Пауза после ошибки: экспоненциальный рост со случайным разбросом"""
+        self.errors += 1
+        delay = min(self.max_interval, self.error_backoff * 2 ** (self.errors - 1))
+        delay = random.uniform(delay / 2, delay)
+        return self._apply_budget(delay)
+
+    def _apply_budget(self, delay: float) -> float:
+        """Увеличение паузы, если часовой бюджет запросов исчерпан"""
+        if self.requests_per_hour <= 0:
+            return delay
+
+        now = time.monotonic()
+        while self._requests and self._requests[0] <= now - 3600:
+            self._requests.popleft()
+
+        # Равномерное расходование бюджета задает нижнюю границу интервала
+        delay = max(delay, 3600 / self.requests_per_hour)
+        if len(self._requests) >= self.requests_per_hour:
+            index = len(self._requests) - self.requests_per_hour
+            delay = max(delay, self._requests[index] + 3600 - now)
+        return delay
@@ -1,6 +1,8 @@
+import argparse
 import logging
 import sys
 import os
+from typing import Any, Dict, List, Optional
 
 # Настройка логирования
 logging.basicConfig(
@@ -14,16 +16,50 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Параметры командной строки"""
+    parser = argparse.ArgumentParser(description="Мониторинг активных торгов Ямагистрали")
+    parser.add_argument("--record", metavar="DIR", help="записывать ответы API в каталог DIR")
+    parser.add_argument("--replay", nargs="+", metavar="PATH",
+                        help="воспроизвести записанные ответы (файлы или каталоги) без сети")
+    parser.add_argument("--replay-speed", type=float,
+                        help="скорость воспроизведения: 0 - без пауз, 1 - как при записи")
+    parser.add_argument("--dry-run", action="store_true", help="не отправлять сообщения в Telegram")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="отчет о времени запуска и импорта модулей до первого запроса к API")
+    return parser.parse_args(argv)
+
+def config_overrides(args: argparse.Namespace) -> Dict[str, Any]:
+    """Переопределения настроек из командной строки"""
+    overrides: Dict[str, Any] = {}
+    if args.record:
+        overrides["API_RECORD_DIR"] = args.record
+    if args.replay:
+        overrides["API_REPLAY_FILE"] = args.replay
+    if args.replay_speed is not None:
+        overrides["API_REPLAY_SPEED"] = args.replay_speed
+    if args.dry_run:
+        overrides["TELEGRAM_DRY_RUN"] = True
+    return overrides
+
 def main():
     """Основная функция запуска приложения"""
     try:
+        args = parse_args()
+        # Легкий модуль без зависимостей: замер начинается до тяжелых импортов
+        from src.utils.startup import STARTUP
+        if args.startup_profile:
+            STARTUP.enable()
         logger.info("Starting Magistrali Monitor application")
         
-        # Прямые импорты без префикса src
-        from core.monitor import MagistraliMonitor
+        # Импорт по полному имени: модули монитора сами импортируют src.*, и без префикса
+        # пакет core загружался бы второй раз под другим именем
+        from src.core.monitor import MagistraliMonitor
+        STARTUP.mark("modules imported")
         
         # Создаем и запускаем монитор
-        monitor = MagistraliMonitor()
+        monitor = MagistraliMonitor(config_overrides(args))
+        STARTUP.mark("monitor initialized")
         monitor.run_monitoring()
         
     except KeyboardInterrupt:
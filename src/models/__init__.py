@@ -0,0 +1,4 @@
+from .order import Order, Shipment
+from src.utils.timestamps import Timestamp, parse_datetime, parse_timestamp
+
+__all__ = ['Order', 'Shipment', 'Timestamp', 'parse_datetime', 'parse_timestamp']
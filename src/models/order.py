@@ -0,0 +1,103 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from src.utils.dict_utils import get_safe
+from src.utils.timestamps import Timestamp, parse_datetime, parse_timestamp
+
+
+@dataclass(slots=True)
+class Shipment:
+    """Участок маршрута: адреса и начала окон погрузки и выгрузки"""
+
+    loading_address: Optional[str]
+    loading_time: Optional[Timestamp]
+    unloading_address: Optional[str]
+    unloading_time: Optional[Timestamp]
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Shipment":
+        return cls(
+            loading_address=get_safe(data, ["npShipment", "npGeoAddress", "address"]),
+            loading_time=parse_timestamp(get_safe(data, ["npShipment", "period", "from", "time"])),
+            unloading_address=get_safe(data, ["npUnshipment", "npGeoAddress", "address"]),
+            unloading_time=parse_timestamp(get_safe(data, ["npUnshipment", "period", "from", "time"]))
+        )
+
+
+@dataclass(slots=True)
+class Order:
+    """Заказ transferOrder, разобранный один раз из ответа API"""
+
+    id: Optional[str]
+    status: Optional[str]
+    customer_name: Optional[str]
+    time_left: Optional[str]
+    created_at: Optional[Timestamp]
+    updated_at: Optional[Timestamp]
+    weight: Any
+    volume: Any
+    body_types: Tuple[str, ...]
+    currency: Optional[str]
+    amount: Any
+    has_winner: bool
+    matcher_status: Optional[str]
+    auction_end: Optional[datetime]
+    shipments: Tuple[Shipment, ...]
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Order":
+        """Разбор заказа из словаря API"""
+        if not isinstance(data, dict):
+            raise ValueError("Invalid order format")
+
+        shipments = get_safe(data, ["shipments"], [])
+        body_types = get_safe(data, ["bodyType"], [])
+        return cls(
+            id=get_safe(data, ["id"]),
+            status=get_safe(data, ["status"]),
+            customer_name=get_safe(data, ["customer", "customerName"]),
+            time_left=get_safe(data, ["auction", "timeLeft"]),
+            created_at=parse_timestamp(get_safe(data, ["createdAt", "time"])),
+            updated_at=parse_timestamp(get_safe(data, ["updatedAt", "time"])),
+            weight=get_safe(data, ["dimensions", "weight"]),
+            volume=get_safe(data, ["dimensions", "volume"]),
+            body_types=tuple(body_types) if isinstance(body_types, list) else (),
+            currency=get_safe(data, ["auction", "currency"]),
+            amount=get_safe(data, ["distribution", "amount"]),
+            has_winner=get_safe(data, ["matcher", "winnerExecutor"]) is not None,
+            matcher_status=get_safe(data, ["matcher", "matcherStatus"]),
+            auction_end=cls._parse_auction_end(data),
+            shipments=tuple(Shipment.from_dict(shipment) for shipment in shipments
+                            if isinstance(shipment, dict)) if isinstance(shipments, list) else ()
+        )
+
+    @classmethod
+    def coerce(cls, order: Any) -> "Order":
+        """Заказ как модель: готовая модель возвращается как есть, словарь разбирается"""
+        if isinstance(order, cls):
+            return order
+        return cls.from_dict(order)
+
+    @staticmethod
+    def _parse_auction_end(data: Dict[str, Any]) -> Optional[datetime]:
+        """Время окончания торгов (matcherAuction, auction или start + duration)"""
+        # Время окончания из matcherAuction (приоритет)
+        matcher_end = parse_datetime(get_safe(data, ["matcher", "matcherAuction", "endDate", "time"]))
+        if matcher_end is not None:
+            return matcher_end
+
+        # Время окончания из auction
+        auction_end = parse_datetime(get_safe(data, ["auction", "endDate", "time"]))
+        if auction_end is not None:
+            return auction_end
+
+        # Длительность для типа duration
+        duration = get_safe(data, ["auction", "duration"], 0)
+        auction_type = get_safe(data, ["auction", "auctionType"], "period")
+        if duration and isinstance(duration, (int, float)) and auction_type == "duration":
+            start_time = parse_datetime(get_safe(data, ["auction", "startDate", "time"]))
+            if start_time is not None:
+                return start_time + timedelta(seconds=duration)
+
+        return None
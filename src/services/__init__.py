@@ -1,4 +1,13 @@
-from .api_client import APIClient
-from .telegram_service import TelegramService
+from src.utils.lazy_exports import lazy_exports
 
-__all__ = ['APIClient', 'TelegramService']
\ No newline at end of file
+# Модуль пакета -> экспортируемые имена; модуль импортируется при первом обращении к имени,
+# так импорт APIClient не тянет за собой python-telegram-bot и HTTP-сервер метрик
+_EXPORTS = {
+    'api_client': ('APIClient',),
+    'telegram_service': ('TelegramService',),
+    'telegram_dispatcher': ('TelegramDispatcher',),
+    'outbox_worker': ('OutboxWorker',),
+    'metrics_server': ('MetricsServer',),
+    'replay': ('ReplaySource',),
+}
+__all__, __getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
@@ -1,111 +1,335 @@
 import requests
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Union
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
 
 from src.config.settings import get_config
-from src.utils.formatters import get_safe
+from src.utils.capture import CaptureWriter
+from src.utils.file_manager import load_watermark, save_watermark
+from src.utils.metrics import API_ERRORS, API_FETCH_DURATION, API_PAYLOAD_BYTES, ORDERS_RECEIVED
+from src.utils.startup import STARTUP
+from src.models.order import Order
+from src.utils.timestamps import parse_timestamp
+from src.utils.json_stream import iter_json_array
 
 logger = logging.getLogger(__name__)
 
+STREAM_CHUNK_SIZE = 64 * 1024
+
+def create_session(pool_size: Optional[int] = None) -> requests.Session:
+    """HTTP-сессия с пулом соединений; общая для всех аккаунтов (токен передается в запросе)"""
+    session = requests.Session()
+    session.headers.update({
+        "Content-Type": "application/json",
+        "Accept": "application/json",
+        # gzip/deflate всегда, br -- если установлен пакет brotli
+        "Accept-Encoding": ACCEPT_ENCODING,
+        "User-Agent": "MagistraliMonitor/1.0"
+    })
+    # Пул соединений должен вмещать параллельную загрузку страниц
+    if pool_size is None:
+        pool_size = max(10, get_config()["API_FETCH_CONCURRENCY"])
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
 class APIClient:
     """Клиент для работы с API Магистрали"""
     
-    def __init__(self, token: str = None, base_url: str = None):
+    def __init__(self, token: str = None, base_url: str = None,
+                 watermark_file: str = "data/watermark.json",
+                 session: Optional[requests.Session] = None, name: str = "default",
+                 lookback_hours: Optional[float] = None, record_dir: Optional[str] = None):
         config = get_config()
+        self.name = name
         self.token = token or config["STATIC_TOKEN"]
         self.base_url = base_url or config["API_BASE_URL"]
-        self.session = self._create_session()
+        self.lookback_hours = lookback_hours
+        self.session = session or create_session()
+        self._auth_headers = {"Authorization": f"Bearer {self.token}"}
+        
+        # Отметка последнего обработанного updatedAt для инкрементального опроса
+        self.watermark_file = watermark_file
+        self.watermark = self._parse_watermark(load_watermark(watermark_file))
+        self._pending_watermark: Optional[datetime] = None
+        
+        # Счетчик запросов к API и ошибка последнего опроса (для планировщика)
+        self.requests_made = 0
+        self.last_error: Optional[str] = None
+        
+        # Запись ответов getFlatForExecutor для последующего воспроизведения
+        self.recorder: Optional[CaptureWriter] = None
+        if record_dir:
+            self.recorder = CaptureWriter(record_dir, name)
+            logger.info(f"Recording API responses of account {name} to {self.recorder.file}")
+        self._poll = 0
         
-    def _create_session(self) -> requests.Session:
-        """Создание сессии с настройками"""
-        session = requests.Session()
-        session.headers.update({
-            "Authorization": f"Bearer {self.token}",
-            "Content-Type": "application/json",
-            "Accept": "application/json",
-            "User-Agent": "MagistraliMonitor/1.0"
-        })
-        return session
-    
     def verify_token(self) -> bool:
         """Проверка валидности токена"""
         try:
             url = f"{self.base_url}/api/users/userEmployees/get/list/v0"
-            response = self.session.get(url, timeout=10)
+            STARTUP.mark("first API request")
+            response = self.session.get(url, headers=self._auth_headers, timeout=10)
             return response.status_code == 200
         except Exception as e:
             logger.error(f"Token verification error: {str(e)}")
             return False
     
-    def get_active_orders(self) -> List[Dict[str, Any]]:
+    def get_active_orders(self) -> List[Order]:
         """Получение активных заказов"""
+        orders = list(self.iter_active_orders())
+        logger.info(f"Received {len(orders)} orders from API (account {self.name})")
+        
+        # Логируем первые 3 заказа для отладки
+        for i, order in enumerate(orders[:3]):
+            logger.info(f"Example order {i+1}: ID={order.id} "
+                      f"Status={order.status} "
+                      f"Auction status={order.matcher_status}")
+        
+        return orders
+    
+    def iter_active_orders(self) -> Iterator[Order]:
+        """Потоковое получение активных заказов: каждый заказ отдается сразу после декодирования"""
+        self.last_error = None
+        self._poll += 1
+        started = time.perf_counter()
+        received = 0
         try:
             config = get_config()  # ← ДОБАВЬТЕ ЭТУ СТРОКУ
-            lookback_time = datetime.utcnow() - timedelta(hours=config["LOOKBACK_PERIOD_HOURS"])
-            logger.info(f"Requesting orders updated after: {lookback_time.isoformat()}")
+            lookback_time = self._get_updated_from(config)
+            logger.info(f"Requesting orders updated after: {lookback_time.isoformat()} (account {self.name})")
             
             url = f"{self.base_url}/api/orders/v0/transferOrder/getFlatForExecutor"
-            payload = {
-                "data": {
-                    "limit": 200,
-                    "filter": {
-                        "statuses": ["onMatch"],
-                        "updatedFrom": lookback_time.isoformat() + "Z"
-                    }
-                }
+            order_filter = {
+                "statuses": ["onMatch"],
+                "updatedFrom": lookback_time.isoformat() + "Z"
             }
             
             logger.info(f"Sending request to API: {url}")
-            response = self.session.post(url, json=payload, timeout=30)
+            latest = None
+            # Дубли возникают при сдвиге страниц между запросами
+            seen = set()
+            for raw_order in self._iter_all_pages(url, order_filter, config):
+                if not isinstance(raw_order, dict):
+                    continue
+                # Заказ разбирается в модель один раз, дальше работают только с ней
+                order = Order.from_dict(raw_order)
+                order_id = order.id
+                if order_id is not None:
+                    if order_id in seen:
+                        continue
+                    seen.add(order_id)
+                    
+                updated = self._get_updated_at(order)
+                if updated is not None and (latest is None or updated > latest):
+                    latest = updated
+                received += 1
+                yield order
+                
+            self._track_watermark(latest, config)
+            
+        except Exception as e:
+            logger.error(f"Error getting orders: {str(e)}")
+            self.last_error = str(e)
+            API_ERRORS.inc(account=self.name)
+        finally:
+            # При потоковой обработке время включает и обработку заказов получателем
+            API_FETCH_DURATION.observe(time.perf_counter() - started, account=self.name)
+            ORDERS_RECEIVED.inc(received, account=self.name)
+    
+    def _stream_page(self, url: str, order_filter: Dict[str, Any], offset: int,
+                     limit: int, page: Dict[str, Any]) -> Iterator[Any]:
+        """Потоковый запрос одной страницы; по окончании в page записываются count, total и elapsed"""
+        started = time.monotonic()
+        recorded_at = time.time()
+        STARTUP.mark("first API request")
+        self.requests_made += 1
+        payload = {
+            "data": {
+                "limit": limit,
+                "offset": offset,
+                "filter": order_filter
+            }
+        }
+        meta: Dict[str, Any] = {}
+        count = 0
+        size = 0
+        body: Optional[List[bytes]] = [] if self.recorder is not None else None
+        response = self.session.post(url, json=payload, headers=self._auth_headers,
+                                     timeout=get_config()["API_REQUEST_TIMEOUT"], stream=True)
+        try:
+            if body is not None and response.status_code >= 400:
+                self._record(recorded_at, order_filter, offset, limit, response.status_code, b"")
             response.raise_for_status()
+            # iter_content распаковывает gzip/br на лету, тело целиком в памяти не держится
+            def counted(chunks: Iterator[bytes]) -> Iterator[bytes]:
+                nonlocal size
+                for chunk in chunks:
+                    size += len(chunk)
+                    if body is not None:
+                        body.append(chunk)
+                    yield chunk
             
-            data = response.json()
-            orders = get_safe(data, ["data", "orders"], [])
-            logger.info(f"Received {len(orders)} orders from API")
+            chunks = counted(response.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+            for order in iter_json_array(chunks, ("data", "orders"), meta):
+                count += 1
+                yield order
+        finally:
+            response.close()
+            API_PAYLOAD_BYTES.observe(size, account=self.name)
             
-            # Логируем первые 3 заказа для отладки
-            for i, order in enumerate(orders[:3]):
-                logger.info(f"Example order {i+1}: ID={get_safe(order, ['id'])} "
-                          f"Status={get_safe(order, ['status'])} "
-                          f"Auction status={get_safe(order, ['matcher', 'matcherStatus'])}")
+        # Записывается только полностью прочитанная страница
+        if body is not None:
+            self._record(recorded_at, order_filter, offset, limit, 200, b"".join(body))
+        total = meta.get("total")
+        # При потоковой обработке время включает и обработку заказов получателем
+        page.update(count=count, total=total if isinstance(total, int) else None,
+                    elapsed=time.monotonic() - started)
+    
+    def _record(self, recorded_at: float, order_filter: Dict[str, Any], offset: int,
+                limit: int, status: int, body: bytes) -> None:
+        """Сохранение ответа в файл записи; сбой записи не прерывает опрос"""
+        try:
+            self.recorder.write({
+                "ts": recorded_at,
+                "poll": self._poll,
+                "offset": offset,
+                "limit": limit,
+                "updated_from": order_filter.get("updatedFrom"),
+                "status": status,
+                "body": body.decode("utf-8", errors="replace"),
+            })
+        except Exception as e:
+            logger.error(f"Error recording API response: {str(e)}")
+    
+    def _fetch_page(self, url: str, order_filter: Dict[str, Any],
+                    offset: int, limit: int) -> Dict[str, Any]:
+        """Загрузка страницы целиком (для параллельных запросов)"""
+        page: Dict[str, Any] = {}
+        page["orders"] = list(self._stream_page(url, order_filter, offset, limit, page))
+        return page
+    
+    def _iter_all_pages(self, url: str, order_filter: Dict[str, Any],
+                        config: Dict[str, Any]) -> Iterator[Any]:
+        """Постраничная загрузка до исчерпания выборки, окнами по API_FETCH_CONCURRENCY страниц"""
+        page_size = config["API_PAGE_SIZE"]
+        max_pages = config["API_MAX_PAGES"]
+        concurrency = max(1, config["API_FETCH_CONCURRENCY"])
+        
+        first: Dict[str, Any] = {}
+        yield from self._stream_page(url, order_filter, 0, page_size, first)
+        timings = [first["elapsed"]]
+        total = first["total"]
+        exhausted = first["count"] < page_size
+        offset = page_size
+        
+        while not exhausted and len(timings) < max_pages:
+            if total is not None and offset >= total:
+                break
+            window = min(concurrency, max_pages - len(timings))
+            offsets = [offset + i * page_size for i in range(window)]
+            if total is not None:
+                offsets = [o for o in offsets if o < total]
+                
+            if len(offsets) == 1:
+                page: Dict[str, Any] = {}
+                yield from self._stream_page(url, order_filter, offsets[0], page_size, page)
+                pages = [page]
+            else:
+                with ThreadPoolExecutor(max_workers=len(offsets)) as pool:
+                    pages = list(pool.map(
+                        lambda o: self._fetch_page(url, order_filter, o, page_size), offsets))
+                for page in pages:
+                    yield from page.pop("orders")
+                    
+            for page in pages:
+                timings.append(page["elapsed"])
+                if page["count"] < page_size:
+                    exhausted = True
+            offset = offsets[-1] + page_size
             
-            return [order for order in orders if isinstance(order, dict)]
+        if not exhausted and (total is None or offset < total):
+            logger.warning(f"Stopped after API_MAX_PAGES={max_pages} pages, result set may be incomplete")
             
-        except Exception as e:
-            logger.error(f"Error getting orders: {str(e)}")
-            return []
+        logger.info(f"Fetched {len(timings)} pages: "
+                    f"{', '.join(f'{t * 1000:.0f} ms' for t in timings)}")
+    
+    def _get_updated_from(self, config: Dict[str, Any]) -> datetime:
+        """Начало окна запроса: отметка или полный период при холодном старте"""
+        lookback_hours = self.lookback_hours or config["LOOKBACK_PERIOD_HOURS"]
+        lookback_time = datetime.utcnow() - timedelta(hours=lookback_hours)
+        if self.watermark and self.watermark > lookback_time:
+            return self.watermark
+        return lookback_time
+    
+    @staticmethod
+    def _get_updated_at(order: Order) -> Optional[datetime]:
+        """updatedAt заказа в наивном UTC"""
+        return order.updated_at.utc if order.updated_at is not None else None
     
-    def is_active_auction(self, order: Dict[str, Any]) -> bool:
+    def _track_watermark(self, latest: Optional[datetime], config: Dict[str, Any]) -> None:
+        """Запоминание максимального updatedAt из ответа (до подтверждения)"""
+        if latest is not None:
+            candidate = latest - timedelta(seconds=config["WATERMARK_OVERLAP_SECONDS"])
+            if self._pending_watermark is None or candidate > self._pending_watermark:
+                self._pending_watermark = candidate
+    
+    def commit_watermark(self) -> None:
+        """Подтверждение отметки после успешной обработки всех полученных заказов"""
+        if self._pending_watermark is None:
+            return
+        if self.watermark is None or self._pending_watermark > self.watermark:
+            self.watermark = self._pending_watermark
+            save_watermark(self.watermark.isoformat() + "Z", self.watermark_file)
+            logger.info(f"Watermark advanced to {self.watermark.isoformat()}")
+        self._pending_watermark = None
+    
+    @staticmethod
+    def _parse_watermark(value: Optional[str]) -> Optional[datetime]:
+        """Разбор сохраненной отметки в наивное UTC-время"""
+        if not value:
+            return None
+        timestamp = parse_timestamp(value)
+        if timestamp is None:
+            logger.warning(f"Ignoring invalid watermark: {value}")
+            return None
+        return timestamp.utc
+    
+    def is_active_auction(self, order: Union[Order, Dict[str, Any]]) -> bool:
         """Проверка активности торгов с подробным логированием"""
+        order_id = "unknown"
         try:
-            if not isinstance(order, dict):
+            if not isinstance(order, (Order, dict)):
                 logger.debug("Skipped order - not a dictionary")
                 return False
                 
-            order_id = get_safe(order, ["id"], "unknown")
+            order = Order.coerce(order)
+            order_id = order.id or "unknown"
             
-            # Основные параметры
-            status = get_safe(order, ["status"])
-            winner = get_safe(order, ["matcher", "winnerExecutor"])
-            time_left = self._calculate_time_left(order)
-            
-            # Подробное логирование
-            logger.debug(f"Checking order {order_id}: "
-                        f"status={status}, "
-                        f"winner={winner is not None}, "
-                        f"time_left={time_left}")
+            # Подробное логирование (время считаем, только если оно попадет в лог)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Checking order {order_id}: "
+                            f"status={order.status}, "
+                            f"winner={order.has_winner}, "
+                            f"time_left={self._calculate_time_left(order)}")
             
             # Упрощенные критерии активности
-            if winner is not None:
+            if order.has_winner:
                 logger.debug(f"Order {order_id} - has winner")
                 return False
                 
-            if status != "onMatch":
+            if order.status != "onMatch":
                 logger.debug(f"Order {order_id} - invalid status")
                 return False
                 
-            if "завершены" in time_left:
+            end_time = order.auction_end
+            if end_time is not None and datetime.now(end_time.tzinfo) >= end_time:
                 logger.debug(f"Order {order_id} - auction completed")
                 return False
                 
@@ -116,46 +340,26 @@ class APIClient:
             logger.error(f"Error checking order {order_id}: {str(e)}")
             return False
     
-    def _calculate_time_left(self, order: Dict[str, Any]) -> str:
+    def get_auction_end(self, order: Union[Order, Dict[str, Any]]) -> Optional[datetime]:
+        """Время окончания торгов (matcherAuction, auction или start + duration)"""
+        return Order.coerce(order).auction_end
+    
+    def _calculate_time_left(self, order: Union[Order, Dict[str, Any]]) -> str:
         """Вычисление оставшегося времени до окончания торгов"""
         try:
+            order = Order.coerce(order)
+            
             # Проверяем наличие победителя
-            if get_safe(order, ["matcher", "winnerExecutor"]) is not None:
+            if order.has_winner:
                 return "торги завершены (есть победитель)"
                 
-            # Проверяем время окончания из matcherAuction (приоритет)
-            matcher_end_time_str = get_safe(order, ["matcher", "matcherAuction", "endDate", "time"])
-            if matcher_end_time_str and matcher_end_time_str != "N/A":
-                matcher_end_time = datetime.fromisoformat(matcher_end_time_str.replace("Z", "+00:00"))
-                now = datetime.now(matcher_end_time.tzinfo)
-                if now >= matcher_end_time:
-                    return "торги завершены"
-                delta = matcher_end_time - now
-                return self._format_timedelta(delta)
-                
-            # Проверяем время окончания из auction
-            end_time_str = get_safe(order, ["auction", "endDate", "time"])
-            if end_time_str and end_time_str != "N/A":
-                end_time = datetime.fromisoformat(end_time_str.replace("Z", "+00:00"))
+            end_time = order.auction_end
+            if end_time is not None:
                 now = datetime.now(end_time.tzinfo)
                 if now >= end_time:
                     return "торги завершены"
                 delta = end_time - now
                 return self._format_timedelta(delta)
-                
-            # Проверяем длительность для типа duration
-            duration = get_safe(order, ["auction", "duration"], 0)
-            auction_type = get_safe(order, ["auction", "auctionType"], "period")
-            if duration and auction_type == "duration":
-                start_time_str = get_safe(order, ["auction", "startDate", "time"])
-                if start_time_str and start_time_str != "N/A":
-                    start_time = datetime.fromisoformat(start_time_str.replace("Z", "+00:00"))
-                    end_time = start_time + timedelta(seconds=duration)
-                    now = datetime.now(end_time.tzinfo)
-                    if now >= end_time:
-                        return "торги завершены"
-                    delta = end_time - now
-                    return self._format_timedelta(delta)
                     
             return "не указано"
         except Exception as e:
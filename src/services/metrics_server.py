@@ -0,0 +1,69 @@
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from src.utils.metrics import METRICS, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsServer:
+    """HTTP-эндпоинт /metrics в текстовом формате Prometheus в фоновом потоке"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 9108,
+                 registry: MetricsRegistry = METRICS):
+        self.host = host
+        self.port = port
+        self.registry = registry
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _handler(self) -> type:
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                try:
+                    body = registry.render().encode("utf-8")
+                except Exception as e:
+                    logger.error(f"Error rendering metrics: {str(e)}")
+                    self.send_error(500)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                logger.debug(f"Metrics request: {format % args}")
+
+        return Handler
+
+    def start(self) -> bool:
+        """Запуск сервера; False, если порт занят или недоступен"""
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+        except OSError as e:
+            logger.error(f"Cannot start metrics server on {self.host}:{self.port}: {str(e)}")
+            return False
+        self._server.daemon_threads = True
+        # Порт 0 - свободный порт, выбранный системой
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name="metrics-server", daemon=True)
+        self._thread.start()
+        logger.info(f"Metrics available at http://{self.host}:{self.port}/metrics")
+        return True
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Optional
+
+from src.services.telegram_dispatcher import TelegramDispatcher
+from src.utils.outbox import Outbox, OutboxItem
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxWorker:
+    """Фоновая отправка сообщений из постоянной очереди с повторами и паузами"""
+
+    def __init__(self, outbox: Outbox, dispatcher: TelegramDispatcher, chat_id: str,
+                 batch_size: int = 20, retry_base: float = 30.0, max_backoff: float = 900.0,
+                 max_attempts: int = 50, idle_interval: float = 1.0):
+        self.outbox = outbox
+        self.dispatcher = dispatcher
+        self.chat_id = chat_id
+        self.batch_size = batch_size
+        self.retry_base = retry_base
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self.idle_interval = idle_interval
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    def _retry_delay(self, attempts: int) -> float:
+        """Экспоненциальная пауза со случайным разбросом"""
+        delay = min(self.max_backoff, self.retry_base * 2 ** attempts)
+        return random.uniform(delay / 2, delay)
+
+    async def _deliver(self, item: OutboxItem) -> None:
+        order_id = item.message_data.get("order_id")
+        if item.expires_at is not None and item.expires_at <= time.time():
+            logger.warning(f"Dropping outbox message for order {order_id}: auction is over")
+            self.outbox.drop(item)
+            return
+
+        chat_id = item.message_data.get("chat_id") or self.chat_id
+        if await self.dispatcher.send(chat_id, item.message_data):
+            self.outbox.mark_delivered(item, item.message_data.get("message_id"))
+            return
+
+        if item.attempts + 1 >= self.max_attempts:
+            logger.error(f"Dropping outbox message for order {order_id} "
+                         f"after {item.attempts + 1} attempts")
+            self.outbox.drop(item)
+            return
+
+        delay = self._retry_delay(item.attempts)
+        logger.warning(f"Delivery of order {order_id} failed (attempt {item.attempts + 1}), "
+                       f"next try in {delay:.0f} sec")
+        self.outbox.retry(item, delay)
+
+    async def drain_once(self) -> int:
+        """Одна пачка сообщений, время которых наступило; возвращает их количество"""
+        items = self.outbox.due(self.batch_size)
+        if items:
+            results = await asyncio.gather(*(self._deliver(item) for item in items),
+                                           return_exceptions=True)
+            for item, result in zip(items, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Error delivering order {item.message_data.get('order_id')}: "
+                                 f"{str(result)}")
+        return len(items)
+
+    async def run(self) -> None:
+        """Разбор очереди до остановки"""
+        logger.info(f"Outbox worker started, {self.outbox.pending()} messages pending")
+        while not self._stopping:
+            try:
+                if not await self.drain_once():
+                    await asyncio.sleep(self.idle_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in outbox worker: {str(e)}")
+                await asyncio.sleep(self.idle_interval)
+
+    def start_thread(self, loop: asyncio.AbstractEventLoop) -> threading.Thread:
+        """Запуск в отдельном потоке на переданном цикле событий"""
+        def target() -> None:
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(self.run())
+
+        self._thread = threading.Thread(target=target, name="outbox-worker", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self) -> None:
+        self._stopping = True
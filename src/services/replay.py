@@ -0,0 +1,119 @@
+import json
+import logging
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from src.utils.capture import load_captures, shift_times
+
+logger = logging.getLogger(__name__)
+
+_EMPTY_PAGE = b'{"data":{"orders":[]}}'
+
+
+class ReplayResponse:
+    """Ответ из записи с интерфейсом requests.Response, которым пользуется APIClient"""
+
+    def __init__(self, status_code: int, body: bytes):
+        self.status_code = status_code
+        self.body = body
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise RuntimeError(f"Replayed HTTP error {self.status_code}")
+
+    def iter_content(self, chunk_size: int = 65536) -> Iterator[bytes]:
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start:start + chunk_size]
+
+    def close(self) -> None:
+        pass
+
+
+class ReplaySession:
+    """Замена HTTP-сессии одного аккаунта: каждый опрос получает страницы следующего записанного опроса"""
+
+    def __init__(self, polls: List[Dict[int, Dict[str, Any]]], shift_time: bool = True):
+        self.polls = polls
+        self.shift_time = shift_time
+        self.position = -1
+        self._lock = threading.Lock()
+
+    def has_more(self) -> bool:
+        return self.position + 1 < len(self.polls)
+
+    def poll_time(self, position: int) -> Optional[float]:
+        if 0 <= position < len(self.polls):
+            return min(record["ts"] for record in self.polls[position].values())
+        return None
+
+    def get(self, url: str, **kwargs: Any) -> ReplayResponse:
+        """Проверка токена в режиме воспроизведения всегда успешна"""
+        return ReplayResponse(200, b"{}")
+
+    def post(self, url: str, **kwargs: Any) -> ReplayResponse:
+        payload = kwargs.get("json") or {}
+        offset = int((payload.get("data") or {}).get("offset", 0))
+        with self._lock:
+            # Первая страница начинает следующий записанный опрос
+            if offset == 0:
+                self.position += 1
+            if not 0 <= self.position < len(self.polls):
+                return ReplayResponse(200, _EMPTY_PAGE)
+            record = self.polls[self.position].get(offset)
+        if record is None:
+            return ReplayResponse(200, _EMPTY_PAGE)
+        body = record.get("body") or ""
+        if self.shift_time and body and record.get("status", 200) < 400:
+            # Заказы выглядят так же, как в момент записи: до конца торгов столько же времени
+            data = shift_times(json.loads(body), timedelta(seconds=time.time() - record["ts"]))
+            return ReplayResponse(200, json.dumps(data, ensure_ascii=False).encode("utf-8"))
+        return ReplayResponse(record.get("status", 200), body.encode("utf-8"))
+
+
+class ReplaySource:
+    """Воспроизведение записанных ответов API без сети: с исходной или ускоренной скоростью
+
+    speed = 0 - без пауз между опросами, 1 - как при записи, 2 - вдвое быстрее и т.д.
+    """
+
+    def __init__(self, paths: Union[str, List[str]], speed: float = 0.0, shift_time: bool = True):
+        self.speed = speed
+        self.shift_time = shift_time
+        records = load_captures([paths] if isinstance(paths, str) else paths)
+        # Аккаунт -> опросы в порядке записи -> страницы по смещению
+        self._polls: Dict[str, Dict[Any, Dict[int, Dict[str, Any]]]] = {}
+        for record in records:
+            polls = self._polls.setdefault(record.get("account", "default"), {})
+            key = (record.get("run"), record.get("poll", 0))
+            polls.setdefault(key, {})[int(record.get("offset", 0))] = record
+        self.sessions: Dict[str, ReplaySession] = {}
+        logger.info(f"Replay: {len(records)} pages, "
+                    f"{sum(len(polls) for polls in self._polls.values())} polls "
+                    f"for accounts {', '.join(self._polls) or '-'}")
+
+    def session(self, account: str) -> ReplaySession:
+        """Сессия для аккаунта; единственный записанный аккаунт подходит под любое имя"""
+        name = account if account in self._polls or len(self._polls) != 1 else next(iter(self._polls))
+        if name not in self.sessions:
+            self.sessions[name] = ReplaySession(list(self._polls.get(name, {}).values()), self.shift_time)
+        return self.sessions[name]
+
+    def has_more(self) -> bool:
+        return any(session.has_more() for session in self.sessions.values())
+
+    def next_delay(self) -> float:
+        """Пауза до следующего опроса по записанным интервалам, деленным на speed"""
+        if self.speed <= 0:
+            return 0.0
+        gaps = []
+        for session in self.sessions.values():
+            current, following = session.poll_time(session.position), session.poll_time(session.position + 1)
+            if current is not None and following is not None:
+                gaps.append(following - current)
+        return max(0.0, min(gaps, default=0.0)) / self.speed
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: {"replayed": min(session.position + 1, len(session.polls)), "polls": len(session.polls)}
+                for name, session in self.sessions.items()}
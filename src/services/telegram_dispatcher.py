@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+from src.utils.formatters import message_key
+from src.utils.metrics import TELEGRAM_SEND_DURATION
+from src.utils.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+SendCallable = Callable[[str, Dict], Awaitable[Any]]
+
+
+class _NeverRaised(Exception):
+    """Заглушка исключений Telegram в пробном режиме"""
+
+
+class TelegramDispatcher:
+    """Параллельная отправка сообщений с учетом лимитов Telegram"""
+
+    def __init__(self, send: SendCallable, max_concurrency: int = 8,
+                 global_rate: float = 30.0, chat_rate_per_min: float = 20.0,
+                 max_retries: int = 3, send_timeout: float = 30.0, dry_run: bool = False):
+        self._send = send
+        self.dry_run = dry_run
+        self.max_concurrency = max_concurrency
+        self.chat_rate_per_min = chat_rate_per_min
+        self.max_retries = max_retries
+        self.send_timeout = send_timeout
+        self._global_bucket = TokenBucket(rate=global_rate, capacity=global_rate)
+        self._chat_buckets: Dict[str, TokenBucket] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._errors: Optional[Tuple[type, type, type, type]] = None
+
+    def _error_types(self) -> Tuple[type, type, type, type]:
+        """Классы исключений Telegram: RetryAfter, BadRequest, NetworkError, TelegramError
+
+        python-telegram-bot импортируется при первой отправке, а не при запуске;
+        в пробном режиме не импортируется вовсе.
+        """
+        if self._errors is None:
+            if self.dry_run:
+                self._errors = (_NeverRaised,) * 4
+            else:
+                from telegram.error import BadRequest, NetworkError, RetryAfter, TelegramError
+                self._errors = (RetryAfter, BadRequest, NetworkError, TelegramError)
+        return self._errors
+
+    def _chat_bucket(self, chat_id: str) -> TokenBucket:
+        """Ограничитель для конкретного чата"""
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(rate=self.chat_rate_per_min / 60.0,
+                                 capacity=self.chat_rate_per_min)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    async def _timed_send(self, chat_id: str, message_data: Dict) -> None:
+        """Один вызов Telegram API с замером длительности"""
+        started = time.perf_counter()
+        result = "error"
+        try:
+            await asyncio.wait_for(self._send(chat_id, message_data), timeout=self.send_timeout)
+            result = "ok"
+        finally:
+            TELEGRAM_SEND_DURATION.observe(time.perf_counter() - started, result=result)
+
+    async def send(self, chat_id: str, message_data: Dict) -> bool:
+        """Отправка одного сообщения с повторами и соблюдением лимитов"""
+        if not message_data or "text" not in message_data:
+            return False
+
+        RetryAfter, BadRequest, NetworkError, TelegramError = self._error_types()
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        order_id = message_data.get("order_id", "unknown")
+        chat_bucket = self._chat_bucket(str(chat_id))
+
+        for attempt in range(1, self.max_retries + 1):
+            await chat_bucket.acquire()
+            await self._global_bucket.acquire()
+            try:
+                # Слот занимается только на время запроса: чат, исчерпавший свой лимит,
+                # ждет в ограничителе, не задерживая отправку в другие чаты
+                async with self._semaphore:
+                    await self._timed_send(chat_id, message_data)
+                return True
+            except RetryAfter as e:
+                logger.warning(f"Flood control for chat {chat_id}, "
+                               f"retry in {e.retry_after} sec (order {order_id})")
+                chat_bucket.pause(e.retry_after)
+            except BadRequest as e:
+                logger.error(f"Telegram rejected order {order_id}: {str(e)}")
+                return False
+            except (asyncio.TimeoutError, NetworkError) as e:
+                if attempt < self.max_retries:
+                    wait_time = 2 ** (attempt - 1)
+                    logger.warning(f"Error sending order {order_id} (attempt {attempt}): "
+                                   f"{str(e) or type(e).__name__}, waiting {wait_time} sec...")
+                    await asyncio.sleep(wait_time)
+            except TelegramError as e:
+                logger.error(f"Telegram error for order {order_id}: {str(e)}")
+                return False
+
+        logger.error(f"Failed to send order {order_id} after {self.max_retries} attempts")
+        return False
+
+    async def dispatch(self, chat_id: str, messages: List[Dict]) -> Dict[str, bool]:
+        """Параллельная отправка пачки сообщений, результат по ключу сообщения
+
+        Сообщение с полем chat_id уходит в указанный чат, остальные - в chat_id.
+        """
+        results = await asyncio.gather(
+            *(self.send(message_data.get("chat_id") or chat_id, message_data)
+              for message_data in messages),
+            return_exceptions=True
+        )
+        report = {}
+        for message_data, result in zip(messages, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error sending order {message_data.get('order_id')}: {str(result)}")
+                result = False
+            report[message_key(message_data)] = result
+        return report
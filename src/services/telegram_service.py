@@ -1,76 +1,129 @@
 import asyncio
 import logging
-from typing import Dict, Optional
-
-import backoff
-from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.error import TelegramError
+from typing import TYPE_CHECKING, Dict, List, Optional
 
 from src.config.settings import get_config
+from src.services.telegram_dispatcher import TelegramDispatcher
+from src.utils.formatters import message_key, order_url
+
+if TYPE_CHECKING:
+    from telegram import Bot
 
 logger = logging.getLogger(__name__)
 
+# Лимит частоты в пробном режиме: фактически без ограничений
+DRY_RUN_RATE = 1e6
+
 class TelegramService:
     """Сервис для работы с Telegram"""
-    
-    def __init__(self, bot_token: str = None, channel_id: str = None):
+
+    def __init__(self, bot_token: str = None, channel_id: str = None, dry_run: Optional[bool] = None):
         config = get_config()
-        self.bot = Bot(token=bot_token or config["TELEGRAM_BOT_TOKEN"])
+        concurrency = config["TELEGRAM_MAX_CONCURRENCY"]
+        # Пробный режим: сообщения не уходят в Telegram, лимиты частоты не действуют
+        self.dry_run = config["TELEGRAM_DRY_RUN"] if dry_run is None else dry_run
+        self._dry_run_message_id = 0
+        self._bot_token = bot_token or config["TELEGRAM_BOT_TOKEN"]
+        self._bot: Optional["Bot"] = None
         self.channel_id = channel_id or config["TELEGRAM_CHANNEL_ID"]
+        self.dispatcher = TelegramDispatcher(
+            self._send_telegram_async,
+            max_concurrency=concurrency,
+            global_rate=DRY_RUN_RATE if self.dry_run else config["TELEGRAM_GLOBAL_RATE_PER_SEC"],
+            chat_rate_per_min=DRY_RUN_RATE if self.dry_run else config["TELEGRAM_CHAT_RATE_PER_MIN"],
+            max_retries=config["TELEGRAM_MAX_RETRIES"],
+            send_timeout=config["TELEGRAM_SEND_TIMEOUT"],
+            dry_run=self.dry_run
+        )
         self.loop = asyncio.new_event_loop()
         asyncio.set_event_loop(self.loop)
-    
-    @backoff.on_exception(backoff.expo, 
-                         (TelegramError, asyncio.TimeoutError), 
-                         max_tries=3)
-    async def _send_telegram_async(self, message_data: Dict) -> bool:
-        """Асинхронная отправка сообщения с повторными попытками"""
-        if not message_data or "text" not in message_data:
-            return False
-        
-        max_retries = 3
 
-        for attempt in range(max_retries):
+    @property
+    def bot(self) -> "Bot":
+        """Клиент Bot API создается при первом обращении: импорт python-telegram-bot не задерживает запуск"""
+        if self._bot is None:
+            from telegram import Bot
+            from telegram.request import HTTPXRequest
+
+            config = get_config()
+            # Пул соединений должен вмещать все параллельные запросы
+            self._bot = Bot(token=self._bot_token,
+                            base_url=config["TELEGRAM_API_URL"],
+                            request=HTTPXRequest(connection_pool_size=config["TELEGRAM_MAX_CONCURRENCY"]))
+        return self._bot
+
+    async def _send_telegram_async(self, chat_id: str, message_data: Dict) -> None:
+        """Один вызов Bot API без повторов (повторы выполняет диспетчер)
+
+        Сообщение с флагом edit редактирует ранее опубликованное (message_id),
+        для нового сообщения message_id записывается в message_data.
+        """
+        if self.dry_run:
+            if not message_data.get("edit"):
+                self._dry_run_message_id += 1
+                message_data["message_id"] = self._dry_run_message_id
+            logger.debug(f"Dry run: message for {message_key(message_data)} to {chat_id} not sent")
+            return
+
+        from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+        from telegram.error import BadRequest
+
+        reply_markup = None
+        # У сводки ссылки на заказы в тексте, кнопка не нужна
+        if not message_data.get("digest"):
+            url = message_data.get("button_url") or order_url(message_data["order_id"])
+            keyboard = [[InlineKeyboardButton("📋 Открыть заказ", url=url)]]
+            reply_markup = InlineKeyboardMarkup(keyboard)
+
+        if message_data.get("edit"):
             try:
-                keyboard = [[InlineKeyboardButton("📋 Открыть заказ", 
-                            url=f"https://yamagistrali.ru/orders/{message_data['order_id']}")]]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                
-                await asyncio.wait_for(
-                    self.bot.send_message(
-                        chat_id=self.channel_id,
-                        text=message_data["text"],
-                        disable_web_page_preview=True,
-                        reply_markup=reply_markup,
-                        parse_mode="Markdown"
-                    ),
-                    timeout=30.0
+                await self.bot.edit_message_text(
+                    chat_id=chat_id,
+                    message_id=message_data["message_id"],
+                    text=message_data["text"],
+                    disable_web_page_preview=True,
+                    reply_markup=reply_markup,
+                    parse_mode="Markdown"
                 )
-                return True
-            except asyncio.TimeoutError:
-                if attempt < max_retries - 1:
-                    wait_time = (attempt + 1) * 5
-                    logger.warning(f"Timeout sending (attempt {attempt + 1}), waiting {wait_time} sec...")
-                    await asyncio.sleep(wait_time)
-                else:
-                    logger.error(f"Failed to send order {message_data.get('order_id', 'unknown')} after {max_retries} attempts")
-                    return False
-            except TelegramError as e:
-                logger.error(f"Telegram error: {str(e)}")
-                return False
-    
+            except BadRequest as e:
+                # Текст уже совпадает с опубликованным - считаем правку выполненной
+                if "message is not modified" not in str(e).lower():
+                    raise
+            return
+
+        message = await self.bot.send_message(
+            chat_id=chat_id,
+            text=message_data["text"],
+            disable_web_page_preview=True,
+            reply_markup=reply_markup,
+            parse_mode="Markdown"
+        )
+        message_data["message_id"] = message.message_id
+
     def send_message(self, message_data: Dict) -> bool:
         """Синхронная обертка для отправки в Telegram"""
         try:
-            return self.loop.run_until_complete(self._send_telegram_async(message_data))
+            return self.loop.run_until_complete(
+                self.dispatcher.send(self.channel_id, message_data))
         except Exception as e:
             logger.error(f"Error sending: {str(e)}")
             return False
-    
+
+    def send_messages(self, messages: List[Dict]) -> Dict[str, bool]:
+        """Параллельная отправка пачки сообщений, результат по каждому заказу"""
+        if not messages:
+            return {}
+        try:
+            return self.loop.run_until_complete(
+                self.dispatcher.dispatch(self.channel_id, messages))
+        except Exception as e:
+            logger.error(f"Error sending batch: {str(e)}")
+            return {message_key(message_data): False for message_data in messages}
+
     def send_startup_message(self) -> bool:
         """Отправка сообщения о запуске бота"""
         startup_message = {
             "text": "🟢 *Бот запущен и начал мониторинг активных торгов*",
             "order_id": "none"
         }
-        return self.send_message(startup_message)
\ No newline at end of file
+        return self.send_message(startup_message)
@@ -1,16 +1,32 @@
-from .formatters import (
-    get_safe, format_timedelta, format_datetime, extract_city_from_address,
-    fuzzy_find_city, format_datetime_with_timezone, get_timezone_from_datetime,
-    translate_body_types, format_order_message
-)
-from .file_manager import load_sent_orders, save_sent_orders
-from .cities_reference import CITIES_REFERENCE, find_city_in_address
-from .body_types import BODY_TYPE_TRANSLATION
+from src.utils.lazy_exports import lazy_exports
 
-__all__ = [
-    'get_safe', 'format_timedelta', 'format_datetime', 'extract_city_from_address',
-    'fuzzy_find_city', 'format_datetime_with_timezone', 'get_timezone_from_datetime',
-    'translate_body_types', 'format_order_message',
-    'load_sent_orders', 'save_sent_orders',
-    'CITIES_REFERENCE', 'find_city_in_address', 'BODY_TYPE_TRANSLATION'
-]
\ No newline at end of file
+# Модуль пакета -> экспортируемые имена; модуль импортируется при первом обращении к имени,
+# чтобы импорт одного модуля (src.utils.startup и т.п.) не тянул за собой весь пакет
+_EXPORTS = {
+    'formatters': (
+        'get_safe', 'format_timedelta', 'format_datetime', 'extract_city_from_address',
+        'fuzzy_find_city', 'resolve_city', 'CITY_RESOLVER', 'format_datetime_with_timezone',
+        'get_timezone_from_datetime', 'translate_body_types', 'format_order_message',
+        'order_fingerprint', 'order_state', 'RENDER_CACHE', 'format_digest_messages', 'order_url',
+        'message_key', 'order_features'
+    ),
+    'file_manager': ('load_sent_orders', 'save_sent_orders', 'load_watermark', 'save_watermark'),
+    'cities_reference': ('CITIES_REFERENCE', 'CITY_MATCHER', 'find_city_in_address'),
+    'city_matcher': ('CityMatcher',),
+    'lru_cache': ('LRUCache',),
+    'city_resolver': ('CityResolver',),
+    'render_cache': ('RenderCache',),
+    'filter_index': (
+        'FilterIndex', 'OrderFilter', 'OrderFeatures', 'normalize_city', 'normalize_body_type'
+    ),
+    'sent_journal': ('SentOrdersJournal',),
+    'dedup_store': ('SentOrdersStore', 'BloomFilter'),
+    'posted_messages': ('PostedMessage', 'PostedMessagesStore'),
+    'outbox': ('Outbox', 'OutboxItem'),
+    'subscriptions': ('Subscription', 'SubscriptionStore'),
+    'body_types': ('BODY_TYPE_TRANSLATION',),
+    'timestamps': ('Timestamp', 'parse_timestamp', 'timestamp_cache_info'),
+    'metrics': ('METRICS', 'MetricsRegistry', 'Counter', 'Gauge', 'Histogram'),
+    'capture': ('CaptureWriter', 'iter_capture', 'load_captures', 'shift_times'),
+}
+__all__, __getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
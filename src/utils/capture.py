@@ -0,0 +1,88 @@
+import gzip
+import json
+import logging
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Union
+
+logger = logging.getLogger(__name__)
+
+
+class CaptureWriter:
+    """Запись ответов getFlatForExecutor в сжатый файл: по JSON-строке на страницу
+
+    Каждая запись сбрасывается на диск (Z_SYNC_FLUSH), поэтому файл читается
+    и после аварийной остановки процесса.
+    """
+
+    def __init__(self, directory: str, account: str = "default"):
+        self.account = account
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        # Номера опросов начинаются заново при каждом запуске
+        self.run = stamp
+        self.file = Path(directory) / f"{account}-{stamp}.jsonl.gz"
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        self._gzip = gzip.open(self.file, "wb")
+        self._lock = threading.Lock()
+        self.records = 0
+
+    def write(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(dict(record, account=self.account, run=self.run), ensure_ascii=False).encode("utf-8") + b"\n"
+        with self._lock:
+            self._gzip.write(line)
+            self._gzip.flush(zlib.Z_SYNC_FLUSH)
+            self.records += 1
+
+    def close(self) -> None:
+        with self._lock:
+            self._gzip.close()
+
+
+def iter_capture(path: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+    """Записи одного файла; обрезанный при сбое хвост пропускается"""
+    try:
+        with gzip.open(path, "rb") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping damaged record in capture {path}")
+    except (EOFError, zlib.error) as e:
+        logger.warning(f"Capture {path} is truncated: {str(e)}")
+
+
+def load_captures(paths: Iterable[Union[str, Path]]) -> List[Dict[str, Any]]:
+    """Записи из файлов или каталогов с *.jsonl.gz в порядке времени записи"""
+    files: List[Path] = []
+    for path in paths:
+        path = Path(path)
+        files.extend(sorted(path.glob("*.jsonl.gz")) if path.is_dir() else [path])
+    records = [record for file in files for record in iter_capture(file)]
+    records.sort(key=lambda record: record.get("ts", 0))
+    return records
+
+
+def _shift(value: str, delta: timedelta) -> str:
+    try:
+        moment = datetime.fromisoformat(value.replace("Z", "+00:00")) + delta
+    except ValueError:
+        return value
+    shifted = moment.isoformat()
+    return shifted.replace("+00:00", "Z") if value.endswith("Z") else shifted
+
+
+def shift_times(data: Any, delta: timedelta) -> Any:
+    """Сдвиг всех меток {"time": ...} в ответе API на delta (на месте)"""
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if key == "time" and isinstance(value, str):
+                data[key] = _shift(value, delta)
+            else:
+                shift_times(value, delta)
+    elif isinstance(data, list):
+        for item in data:
+            shift_times(item, delta)
+    return data
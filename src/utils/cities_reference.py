@@ -1,4 +1,6 @@
 # cities_reference.py
+from src.utils.city_matcher import CityMatcher
+
 CITIES_REFERENCE = {
 "Абакан": "Абакан",
 "Айхал": "Айхал",
@@ -184,7 +186,7 @@ CITIES_REFERENCE = {
 "Минусинск": "Минусинск",
 "Мирный": "Мирный",
 "Мончегорск": "Мончегорск",
-"Москва13": "Москва13",
+"Москва": "Москва",
 "Мурманск": "Мурманск",
 "Мценск": "Мценск",
 "Мышкин": "Мышкин",
@@ -226,7 +228,7 @@ CITIES_REFERENCE = {
 "Пенза": "Пенза",
 "Пересвет": "Пересвет",
 "Переславль-Залесский": "Переславль-Залесский",
-"Пермь0": "Пермь0",
+"Пермь": "Пермь",
 "Петрозаводск": "Петрозаводск",
 "Петропавловск-Камчатский": "Петропавловск-Камчатский",
 "Пирамида": "Пирамида",
@@ -374,13 +376,9 @@ CITIES_REFERENCE = {
 "Яхрома": "Яхрома"
 }
 
+# Индекс строится один раз при импорте модуля
+CITY_MATCHER = CityMatcher(CITIES_REFERENCE)
+
 def find_city_in_address(address):
     """Поиск города в адресе по справочнику"""
-    if not address or not isinstance(address, str):
-        return None
-    
-    address_lower = address.lower()
-    for city_key, city_name in CITIES_REFERENCE.items():
-        if city_key in address_lower:
-            return city_name
-    return None
\ No newline at end of file
+    return CITY_MATCHER.find_exact(address)
\ No newline at end of file
@@ -0,0 +1,90 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# Граница между строчной и заглавной буквой: "ВеликийУстюг" -> "Великий Устюг"
+_CAMEL_BOUNDARY = re.compile(r"(?<=[a-zа-яё])(?=[A-ZА-ЯЁ])")
+_TOKEN = re.compile(r"[^\W_]+")
+
+FUZZY_THRESHOLD = 0.8
+FUZZY_LENGTH_DELTA = 2
+FUZZY_MIN_LENGTH = 4
+
+
+def tokenize(text: str) -> List[str]:
+    """Разбиение строки на нормализованные токены"""
+    text = _CAMEL_BOUNDARY.sub(" ", text)
+    return _TOKEN.findall(text.lower().replace("ё", "е"))
+
+
+class CityMatcher:
+    """Поиск городов в адресе по предварительно построенному индексу"""
+
+    def __init__(self, reference: Dict[str, str]):
+        # Префиксное дерево по токенам: {токен: узел}, город хранится под ключом None
+        self._trie: Dict[Optional[str], Any] = {}
+        # Нормализованное название -> каноническое, сгруппированные по длине
+        self._by_length: Dict[int, Dict[str, str]] = {}
+        self._max_tokens = 1
+
+        for key, city in reference.items():
+            tokens = tokenize(key)
+            if not tokens:
+                continue
+            node = self._trie
+            for token in tokens:
+                node = node.setdefault(token, {})
+            node.setdefault(None, city)
+            self._max_tokens = max(self._max_tokens, len(tokens))
+
+            normalized = " ".join(tokens)
+            self._by_length.setdefault(len(normalized), {}).setdefault(normalized, city)
+
+    def _scan(self, tokens: List[str]) -> Optional[str]:
+        """Самое раннее (и самое длинное в этой позиции) точное вхождение"""
+        for start in range(len(tokens)):
+            node = self._trie
+            found = None
+            for token in tokens[start:start + self._max_tokens]:
+                node = node.get(token)
+                if node is None:
+                    break
+                if None in node:
+                    found = node[None]
+            if found:
+                return found
+        return None
+
+    def _fuzzy(self, tokens: List[str]) -> Optional[str]:
+        """Нечеткий поиск по n-граммам адреса среди городов близкой длины"""
+        # Levenshtein нужен только для нечеткого поиска, импорт откладывается до него
+        from Levenshtein import ratio
+
+        best: Tuple[float, Optional[str]] = (0.0, None)
+        words = [token for token in tokens if not token.isdigit()]
+        for size in range(1, self._max_tokens + 1):
+            for start in range(len(words) - size + 1):
+                candidate = " ".join(words[start:start + size])
+                length = len(candidate)
+                if length < FUZZY_MIN_LENGTH:
+                    continue
+                for delta in range(-FUZZY_LENGTH_DELTA, FUZZY_LENGTH_DELTA + 1):
+                    for name, city in self._by_length.get(length + delta, {}).items():
+                        score = ratio(candidate, name)
+                        if score > best[0]:
+                            best = (score, city)
+        if best[0] >= FUZZY_THRESHOLD:
+            return best[1]
+        return None
+
+    def find_exact(self, address: Optional[str]) -> Optional[str]:
+        """Точный поиск города в адресе"""
+        if not address or not isinstance(address, str):
+            return None
+        return self._scan(tokenize(address))
+
+    def find(self, address: Optional[str]) -> Optional[str]:
+        """Точный поиск города с нечетким поиском в качестве запасного варианта"""
+        if not address or not isinstance(address, str):
+            return None
+        tokens = tokenize(address)
+        return self._scan(tokens) or self._fuzzy(tokens)
@@ -0,0 +1,28 @@
+from typing import Callable, Optional
+
+from src.utils.city_matcher import tokenize
+from src.utils.lru_cache import LRUCache
+
+DEFAULT_CACHE_SIZE = 4096
+
+
+class CityResolver(LRUCache):
+    """Кэширующий слой определения города по адресу (LRU с ограничением размера)"""
+
+    def __init__(self, resolve: Callable[[str], Optional[str]], maxsize: int = DEFAULT_CACHE_SIZE):
+        super().__init__(maxsize)
+        self._resolve = resolve
+
+    def resolve(self, address: Optional[str]) -> Optional[str]:
+        """Определение города с использованием кэша"""
+        if not address or not isinstance(address, str):
+            return None
+
+        key = " ".join(tokenize(address))
+        found, city = self._lookup(key)
+        if found:
+            return city
+
+        city = self._resolve(address)
+        self._store(key, city)
+        return city
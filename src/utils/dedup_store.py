@@ -0,0 +1,180 @@
+import hashlib
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Фильтр Блума для быстрого отрицательного ответа на проверку членства"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = capacity
+        # Стандартные формулы: m = -n ln p / (ln 2)^2, k = m/n ln 2
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> Iterator[int]:
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(item))
+
+
+class SentOrdersStore:
+    """Хранилище отправленных заказов с истечением срока и ограничением размера (LRU)
+
+    Заказ с непрошедшим сроком, вытесненный сверх лимита, запоминается в отдельном
+    фильтре Блума; повторная проверка такого заказа уточняется функцией lookup
+    (поиск в журнале: найдена ли запись и момент ее истечения).
+    """
+
+    def __init__(self, max_size: int, default_ttl: float, bloom_capacity: int = 0,
+                 lookup: Optional[Callable[[str], Tuple[bool, Optional[float]]]] = None):
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self.bloom_capacity = bloom_capacity
+        self._lookup = lookup
+        # order_id -> момент (epoch), после которого запись можно забыть
+        self._entries: "OrderedDict[str, float]" = OrderedDict()
+        self._bloom: Optional[BloomFilter] = None
+        # Вытесненные заказы с непрошедшим сроком и самый поздний из их сроков
+        self._evicted: Optional[BloomFilter] = None
+        self._evicted_until = 0.0
+        self.expired = 0
+        self.evicted = 0
+        self.evicted_live = 0
+        self.recalled = 0
+        self._rebuild_bloom()
+
+    def _rebuild_bloom(self) -> None:
+        """Пересоздание фильтра Блума по текущим записям"""
+        if self.bloom_capacity <= 0:
+            self._bloom = None
+            return
+        self._bloom = BloomFilter(max(self.bloom_capacity, 2 * len(self._entries)))
+        for order_id in self._entries:
+            self._bloom.add(order_id)
+
+    def load(self, entries: Dict[str, Optional[float]]) -> None:
+        """Начальная загрузка записей (например, из журнала) без устаревших"""
+        now = time.time()
+        for order_id, expires_at in entries.items():
+            if expires_at is None:
+                expires_at = now + self.default_ttl
+            if expires_at > now:
+                self._entries[order_id] = expires_at
+        self._evict()
+        self._rebuild_bloom()
+
+    def add(self, order_id: str, expires_at: Optional[float] = None) -> float:
+        """Добавление заказа; без времени окончания торгов используется default_ttl"""
+        if expires_at is None:
+            expires_at = time.time() + self.default_ttl
+        self._entries[order_id] = expires_at
+        self._entries.move_to_end(order_id)
+
+        if self._bloom is not None:
+            if self._bloom.count >= self._bloom.capacity:
+                self._rebuild_bloom()
+            else:
+                self._bloom.add(order_id)
+
+        # Сначала освобождаем место за счет устаревших записей, затем вытесняем по LRU
+        if len(self._entries) > self.max_size:
+            self.expire()
+            self._evict()
+        return expires_at
+
+    def _evict(self) -> None:
+        """Вытеснение давно не использованных записей сверх лимита"""
+        now = time.time()
+        while len(self._entries) > self.max_size:
+            evicted_id, evicted_expiry = self._entries.popitem(last=False)
+            self.evicted += 1
+            if evicted_expiry <= now:
+                continue
+            if self._evicted is None:
+                self._evicted = BloomFilter(max(self.bloom_capacity, self.max_size, 1))
+            self._evicted.add(evicted_id)
+            self._evicted_until = max(self._evicted_until, evicted_expiry)
+            self.evicted_live += 1
+            if self.evicted_live == 1:
+                logger.warning(f"Evicting still active orders from dedup store, consider raising "
+                               f"MAX_CACHED_ORDERS ({self.max_size}); evicted IDs are checked in the journal")
+
+    def _recall(self, order_id: str) -> bool:
+        """Проверка среди вытесненных заказов; найденный заказ возвращается в хранилище"""
+        if self._evicted is None or order_id not in self._evicted:
+            return False
+        if self._lookup is None:
+            return True
+        found, expires_at = self._lookup(order_id)
+        if not found:
+            return False
+        if expires_at is None:
+            expires_at = time.time() + self.default_ttl
+        if expires_at <= time.time():
+            return False
+        self.recalled += 1
+        self.add(order_id, expires_at)
+        return True
+
+    def __contains__(self, order_id: str) -> bool:
+        if self._bloom is None or order_id in self._bloom:
+            expires_at = self._entries.get(order_id)
+            if expires_at is not None:
+                if expires_at > time.time():
+                    self._entries.move_to_end(order_id)
+                    return True
+                del self._entries[order_id]
+                self.expired += 1
+                return False
+        return self._recall(order_id)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def items(self) -> Iterator[Tuple[str, float]]:
+        return iter(self._entries.items())
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Удаление записей, чьи торги уже не могут вернуться"""
+        now = time.time() if now is None else now
+        stale = [order_id for order_id, expires_at in self._entries.items() if expires_at <= now]
+        for order_id in stale:
+            del self._entries[order_id]
+        self.expired += len(stale)
+        # Сроки всех вытесненных заказов прошли - фильтр больше не нужен
+        if self._evicted is not None and self._evicted_until <= now:
+            self._evicted = None
+        return len(stale)
+
+    def stats(self) -> Dict[str, int]:
+        """Статистика хранилища"""
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "evicted_live": self.evicted_live,
+            "recalled": self.recalled
+        }
@@ -0,0 +1,16 @@
+from typing import Any
+
+
+def get_safe(dictionary: Any, keys: list, default: Any = None) -> Any:
+    """Безопасное получение значения из вложенных словарей"""
+    if not isinstance(dictionary, dict):
+        return default
+        
+    current = dictionary
+    for key in keys:
+        if not isinstance(current, dict):
+            return default
+        current = current.get(key)
+        if current is None:
+            return default
+    return current
@@ -1,7 +1,8 @@
 import json
 import logging
+import os
 from pathlib import Path
-from typing import Set
+from typing import Optional, Set
 
 logger = logging.getLogger(__name__)
 
@@ -39,11 +40,48 @@ def save_sent_orders(sent_orders: Set[str], file_path: str = "data/sent_orders.j
         file.parent.mkdir(parents=True, exist_ok=True)
         
         data = {order_id: 1 for order_id in sent_orders}
-        with open(file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        # Запись во временный файл и атомарная замена, чтобы сбой не испортил историю
+        tmp_file = file.with_suffix(file.suffix + ".tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, file)
             
         return True
         
     except Exception as e:
         logger.error(f"Error saving sent orders: {str(e)}")
+        return False
+
+def load_watermark(file_path: str = "data/watermark.json") -> Optional[str]:
+    """Загрузка сохраненной отметки updatedFrom для инкрементального опроса"""
+    try:
+        file = Path(file_path)
+        if not file.exists():
+            return None
+            
+        with open(file, 'r', encoding='utf-8') as f:
+            content = f.read()
+            if not content.strip():
+                return None
+            return json.loads(content).get("updatedFrom")
+            
+    except Exception as e:
+        logger.error(f"Error loading watermark: {str(e)}")
+        return None
+
+def save_watermark(watermark: str, file_path: str = "data/watermark.json") -> bool:
+    """Сохранение отметки updatedFrom"""
+    try:
+        file = Path(file_path)
+        file.parent.mkdir(parents=True, exist_ok=True)
+        
+        with open(file, 'w', encoding='utf-8') as f:
+            json.dump({"updatedFrom": watermark}, f)
+            
+        return True
+        
+    except Exception as e:
+        logger.error(f"Error saving watermark: {str(e)}")
         return False
\ No newline at end of file
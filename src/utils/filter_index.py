@@ -0,0 +1,223 @@
+import logging
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from src.utils.body_types import BODY_TYPE_TRANSLATION
+from src.utils.cities_reference import CITY_MATCHER
+from src.utils.city_matcher import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Русское название типа кузова -> код API
+_BODY_TYPE_CODES = {name.lower(): code for code, name in BODY_TYPE_TRANSLATION.items()}
+
+Range = Tuple[Optional[float], Optional[float]]
+
+
+def normalize_city(name: str) -> str:
+    """Ключ города для индексов: каноническое название из справочника в нормализованном виде"""
+    return " ".join(tokenize(CITY_MATCHER.find_exact(name) or name))
+
+
+def normalize_body_type(value: str) -> str:
+    """Код типа кузова по коду или русскому названию"""
+    code = _BODY_TYPE_CODES.get(value.strip().lower(), value.strip())
+    if code not in BODY_TYPE_TRANSLATION:
+        logger.warning(f"Unknown body type in filter: {value}")
+    return code
+
+
+@dataclass(frozen=True, slots=True)
+class OrderFeatures:
+    """Поля заказа, по которым работают фильтры (города уже нормализованы)"""
+
+    cities: FrozenSet[str]
+    origin: Optional[str]
+    destination: Optional[str]
+    body_types: FrozenSet[str]
+    weight: Optional[float]
+    volume: Optional[float]
+    price: Optional[float]
+
+
+@dataclass(frozen=True, slots=True)
+class OrderFilter:
+    """Условия отбора заказов; пустое условие пропускает любой заказ"""
+
+    cities: FrozenSet[str] = frozenset()
+    origins: FrozenSet[str] = frozenset()
+    destinations: FrozenSet[str] = frozenset()
+    body_types: FrozenSet[str] = frozenset()
+    weight: Range = (None, None)
+    volume: Range = (None, None)
+    price: Range = (None, None)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "OrderFilter":
+        """Разбор условий из конфигурации (cities, from, to, body_types, *_min, *_max)"""
+        def cities(key: str) -> FrozenSet[str]:
+            return frozenset(normalize_city(name) for name in data.get(key) or [])
+
+        def bounds(name: str) -> Range:
+            low, high = data.get(f"{name}_min"), data.get(f"{name}_max")
+            return (float(low) if low is not None else None,
+                    float(high) if high is not None else None)
+
+        return cls(
+            cities=cities("cities"),
+            origins=cities("from"),
+            destinations=cities("to"),
+            body_types=frozenset(normalize_body_type(value) for value in data.get("body_types") or []),
+            weight=bounds("weight"),
+            volume=bounds("volume"),
+            price=bounds("price")
+        )
+
+
+class _SetDimension:
+    """Инвертированный индекс значение -> маска фильтров"""
+
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.wildcard = 0
+
+    def add(self, bit: int, values: FrozenSet[str]) -> None:
+        if not values:
+            self.wildcard |= bit
+            return
+        for value in values:
+            self.index[value] = self.index.get(value, 0) | bit
+
+    def mask(self, values: Iterable[Optional[str]]) -> int:
+        mask = self.wildcard
+        for value in values:
+            mask |= self.index.get(value, 0)
+        return mask
+
+
+class _RangeDimension:
+    """Индекс интервалов: маски фильтров для каждого отрезка между границами"""
+
+    def __init__(self):
+        self.wildcard = 0
+        self._ranges: List[Tuple[float, float, int]] = []
+        self._points: List[float] = []
+        self._point_masks: List[int] = []
+        self._gap_masks: List[int] = [0]
+
+    def add(self, bit: int, bounds: Range) -> None:
+        low, high = bounds
+        if low is None and high is None:
+            self.wildcard |= bit
+            return
+        self._ranges.append((float("-inf") if low is None else low,
+                             float("inf") if high is None else high, bit))
+
+    def compile(self) -> None:
+        """Проход по границам: маска активных фильтров на каждой границе и между ними"""
+        starts: Dict[float, int] = {}
+        ends: Dict[float, int] = {}
+        active = 0
+        for low, high, bit in self._ranges:
+            if low == float("-inf"):
+                active |= bit
+            else:
+                starts[low] = starts.get(low, 0) | bit
+            if high != float("inf"):
+                ends[high] = ends.get(high, 0) | bit
+
+        self._points = sorted(set(starts) | set(ends))
+        self._point_masks = []
+        self._gap_masks = [active]
+        for point in self._points:
+            active |= starts.get(point, 0)
+            self._point_masks.append(active)
+            active &= ~ends.get(point, 0)
+            self._gap_masks.append(active)
+
+    def mask(self, value: Optional[float]) -> int:
+        if value is None:
+            return self.wildcard
+        i = bisect_left(self._points, value)
+        if i < len(self._points) and self._points[i] == value:
+            return self.wildcard | self._point_masks[i]
+        return self.wildcard | self._gap_masks[i]
+
+
+class FilterIndex:
+    """Скомпилированный набор фильтров: отбор заказа без перебора всех фильтров
+
+    Каждый фильтр - бит в целочисленной маске. По каждому измерению заказ дает
+    маску подходящих фильтров, итог - их пересечение.
+    """
+
+    def __init__(self):
+        self._filters: Dict[int, OrderFilter] = {}
+        self._free: List[int] = []
+        self._next_id = 0
+        self._dirty = True
+        self._live = 0
+        self._sets: Dict[str, _SetDimension] = {}
+        self._ranges: Dict[str, _RangeDimension] = {}
+
+    def add(self, order_filter: OrderFilter) -> int:
+        """Добавление фильтра; возвращает его номер"""
+        if self._free:
+            filter_id = self._free.pop()
+        else:
+            filter_id = self._next_id
+            self._next_id += 1
+        self._filters[filter_id] = order_filter
+        self._dirty = True
+        return filter_id
+
+    def remove(self, filter_id: int) -> None:
+        """Удаление фильтра (индекс перестраивается при следующем отборе)"""
+        if self._filters.pop(filter_id, None) is not None:
+            self._free.append(filter_id)
+            self._dirty = True
+
+    def __len__(self) -> int:
+        return len(self._filters)
+
+    def _compile(self) -> None:
+        self._sets = {name: _SetDimension() for name in ("cities", "origins", "destinations", "body_types")}
+        self._ranges = {name: _RangeDimension() for name in ("weight", "volume", "price")}
+        self._live = 0
+        for filter_id, order_filter in self._filters.items():
+            bit = 1 << filter_id
+            self._live |= bit
+            for name, dimension in self._sets.items():
+                dimension.add(bit, getattr(order_filter, name))
+            for name, dimension in self._ranges.items():
+                dimension.add(bit, getattr(order_filter, name))
+        for dimension in self._ranges.values():
+            dimension.compile()
+        self._dirty = False
+
+    def match(self, features: OrderFeatures) -> List[int]:
+        """Номера фильтров, которым соответствует заказ"""
+        if self._dirty:
+            self._compile()
+
+        mask = self._live
+        for dimension, values in ((self._sets["cities"], features.cities),
+                                  (self._sets["origins"], (features.origin,)),
+                                  (self._sets["destinations"], (features.destination,)),
+                                  (self._sets["body_types"], features.body_types)):
+            mask &= dimension.mask(values)
+            if not mask:
+                return []
+        for name in ("weight", "volume", "price"):
+            mask &= self._ranges[name].mask(getattr(features, name))
+            if not mask:
+                return []
+
+        # Обход только установленных битов: время пропорционально числу совпадений
+        matched = []
+        while mask:
+            lowest = mask & -mask
+            matched.append(lowest.bit_length() - 1)
+            mask ^= lowest
+        return matched
@@ -1,26 +1,38 @@
-from datetime import datetime, timedelta
+from datetime import timedelta
+import hashlib
 import logging
-from typing import Any, Optional, Dict  
+import time
+from typing import TYPE_CHECKING, Any, Optional, Dict, List, Tuple, Union
 
 from src.utils.body_types import BODY_TYPE_TRANSLATION
-from src.utils.cities_reference import CITIES_REFERENCE, find_city_in_address
-from fuzzywuzzy import fuzz, process
+from src.utils.dict_utils import get_safe
+from src.utils.cities_reference import CITY_MATCHER
+from src.utils.city_matcher import tokenize
+from src.utils.city_resolver import CityResolver
+from src.utils.filter_index import OrderFeatures
+from src.utils.metrics import FORMAT_DURATION
+from src.utils.profiling import PROFILER
+from src.utils.render_cache import RenderCache
+from src.utils.timestamps import NO_TIMEZONE, Timestamp, parse_timestamp
+
+if TYPE_CHECKING:
+    from src.models.order import Order
 
 logger = logging.getLogger(__name__)
 
-def get_safe(dictionary: Any, keys: list, default: Any = None) -> Any:
-    """Безопасное получение значения из вложенных словарей"""
-    if not isinstance(dictionary, dict):
-        return default
-        
-    current = dictionary
-    for key in keys:
-        if not isinstance(current, dict):
-            return default
-        current = current.get(key)
-        if current is None:
-            return default
-    return current
+ORDER_URL_TEMPLATE = "https://yamagistrali.ru/orders/{}"
+# Максимальная длина текста сообщения в Telegram
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+def order_url(order_id: Any) -> str:
+    """Ссылка на страницу заказа"""
+    return ORDER_URL_TEMPLATE.format(order_id)
+
+def message_key(message_data: Dict[str, Any]) -> str:
+    """Ключ сообщения: ID заказа (или сводки) и, для дополнительных каналов, ID чата"""
+    chat_id = message_data.get("chat_id")
+    order_id = message_data.get("order_id")
+    return f"{order_id}@{chat_id}" if chat_id else str(order_id)
 
 def format_timedelta(delta: timedelta) -> str:
     """Форматирование временного интервала в читаемый вид"""
@@ -37,15 +49,13 @@ def format_timedelta(delta: timedelta) -> str:
 
 def format_datetime(datetime_str: Optional[str]) -> str:
     """Форматирование даты в понятный формат"""
-    try:
-        if not datetime_str or datetime_str == "N/A":
-            return "не указана"
-            
-        dt = datetime.fromisoformat(datetime_str.replace("Z", "+00:00"))
-        return dt.strftime("%d.%m.%Y %H:%M")
-    except Exception as e:
-        logger.error(f"Error formatting datetime: {str(e)}")
+    if not datetime_str or datetime_str == "N/A":
+        return "не указана"
+    timestamp = parse_timestamp(datetime_str)
+    if timestamp is None:
+        logger.error(f"Error formatting datetime: invalid value {datetime_str!r}")
         return "неизвестно"
+    return timestamp.display
 
 def extract_city_from_address(address: Optional[str]) -> Optional[str]:
     """Извлечение названия города из адреса"""
@@ -61,55 +71,31 @@ def extract_city_from_address(address: Optional[str]) -> Optional[str]:
 
 def fuzzy_find_city(address: Optional[str]) -> Optional[str]:
     """Нечеткий поиск города в адресе"""
-    if not address or not isinstance(address, str):
-        return None
-    
-    address_clean = address.lower().replace("г.", "").replace("город", "").strip()
-    cities = list(CITIES_REFERENCE.keys())
-    result = process.extractOne(address_clean, cities, scorer=fuzz.token_set_ratio)
-    
-    if result and result[1] > 70:
-        return CITIES_REFERENCE[result[0]]
-    
-    return None
+    return CITY_MATCHER.find(address)
+
+# Кэш адрес -> город: адреса складов постоянно повторяются
+CITY_RESOLVER = CityResolver(
+    lambda address: fuzzy_find_city(address) or extract_city_from_address(address))
+
+def resolve_city(address: Optional[str]) -> Optional[str]:
+    """Определение города по адресу с кэшированием"""
+    with PROFILER.span("format.resolve_city"):
+        return CITY_RESOLVER.resolve(address)
 
 def format_datetime_with_timezone(datetime_str: Optional[str]) -> str:
     """Форматирование даты с учетом часового пояса"""
-    try:
-        if not datetime_str or datetime_str == "N/A":
-            return "не указана"
-            
-        dt = datetime.fromisoformat(datetime_str.replace("Z", "+00:00"))
-        return dt.strftime("%d.%m.%Y %H:%M")
-    except Exception as e:
-        logger.error(f"Error formatting datetime with timezone: {str(e)}")
+    if not datetime_str or datetime_str == "N/A":
+        return "не указана"
+    timestamp = parse_timestamp(datetime_str)
+    if timestamp is None:
+        logger.error(f"Error formatting datetime with timezone: invalid value {datetime_str!r}")
         return "неизвестно"
+    return timestamp.display
 
 def get_timezone_from_datetime(datetime_str: Optional[str]) -> str:
     """Извлечение часового пояса из строки даты"""
-    try:
-        if not datetime_str or datetime_str == "N/A":
-            return "часовой пояс не указан"
-            
-        if "Z" in datetime_str:
-            return "UTC"
-            
-        if "+" in datetime_str:
-            tz_part = datetime_str.split("+")[1]
-            if ":" in tz_part:
-                return f"UTC+{tz_part.split(':')[0]}"
-            return f"UTC+{tz_part[:2]}"
-            
-        if "-" in datetime_str:
-            tz_part = datetime_str.split("-")[1]
-            if ":" in tz_part:
-                return f"UTC-{tz_part.split(':')[0]}"
-            return f"UTC-{tz_part[:2]}"
-            
-        return "часовой пояс не указан"
-    except Exception as e:
-        logger.error(f"Error determining timezone: {str(e)}")
-        return "часовой пояс не указан"
+    timestamp = parse_timestamp(datetime_str)
+    return timestamp.timezone if timestamp is not None else NO_TIMEZONE
 
 def translate_body_types(body_types: list) -> str:
     """Перевод типов кузова на русский язык"""
@@ -119,79 +105,150 @@ def translate_body_types(body_types: list) -> str:
     translated = [BODY_TYPE_TRANSLATION.get(bt, bt) for bt in body_types]
     return ", ".join(translated) if translated else "не указаны"
 
-def format_order_message(order: Dict[str, Any]) -> Optional[Dict[str, str]]:
-    """Форматирование сообщения о заказе с нечетким поиском городов"""
+def format_dt(timestamp: Optional[Timestamp]) -> str:
+    """Форматирование уже разобранной даты"""
+    return timestamp.display if timestamp is not None else "не указана"
+
+def timezone_label(timestamp: Optional[Timestamp]) -> str:
+    """Часовой пояс разобранной даты в виде UTC±HH"""
+    return timestamp.timezone if timestamp is not None else NO_TIMEZONE
+
+def order_fingerprint(order: "Order", closed: bool = False) -> str:
+    """Отпечаток полей заказа, которые попадают в сообщение"""
+    fields = (
+        closed, order.id, order.customer_name, order.time_left, order.amount, order.currency,
+        order.weight, order.volume, order.body_types,
+        tuple((shipment.loading_address, format_dt(shipment.loading_time),
+               timezone_label(shipment.loading_time),
+               shipment.unloading_address, format_dt(shipment.unloading_time),
+               timezone_label(shipment.unloading_time))
+              for shipment in order.shipments)
+    )
+    return hashlib.blake2b(repr(fields).encode("utf-8"), digest_size=16).hexdigest()
+
+def order_state(order: "Order") -> str:
+    """Состояние заказа, изменение которого требует правки опубликованного сообщения"""
+    auction_end = order.auction_end.isoformat() if order.auction_end is not None else ""
+    return f"{order.amount}|{order.currency}|{auction_end}"
+
+def _to_number(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def order_features(order: "Order") -> OrderFeatures:
+    """Поля заказа для фильтров маршрутизации и подписок"""
+    cities = []
+    origin = destination = None
+    for shipment in order.shipments:
+        loading_city = resolve_city(shipment.loading_address)
+        unloading_city = resolve_city(shipment.unloading_address)
+        if loading_city:
+            loading_city = " ".join(tokenize(loading_city))
+            cities.append(loading_city)
+            origin = origin or loading_city
+        if unloading_city:
+            unloading_city = " ".join(tokenize(unloading_city))
+            cities.append(unloading_city)
+            destination = unloading_city
+    return OrderFeatures(
+        cities=frozenset(cities),
+        origin=origin,
+        destination=destination,
+        body_types=frozenset(order.body_types),
+        weight=_to_number(order.weight),
+        volume=_to_number(order.volume),
+        price=_to_number(order.amount)
+    )
+
+# Кэш отпечаток -> сообщение: неудачные отправки и повторные опросы не рисуют сообщение заново
+RENDER_CACHE = RenderCache()
+
+def format_order_message(order: Union["Order", Dict[str, Any]],
+                         closed: bool = False) -> Optional[Dict[str, str]]:
+    """Форматирование сообщения о заказе с нечетким поиском городов (closed - торги завершены)"""
+    # Импорт здесь: модель заказа сама импортирует пакет src.utils
+    from src.models.order import Order
+
+    started = time.perf_counter()
     try:
-        if not isinstance(order, dict):
-            raise ValueError("Invalid order format")
+        order = Order.coerce(order)
+        with PROFILER.span("format.fingerprint"):
+            fingerprint = order_fingerprint(order, closed)
+        with PROFILER.span("format.render"):
+            message_data = RENDER_CACHE.get_or_render(
+                fingerprint, lambda: _render_order_message(order, closed))
+        if message_data is not None:
+            message_data["fingerprint"] = fingerprint
+            message_data["state"] = order_state(order)
+        return message_data
+    except Exception as e:
+        logger.error(f"Error formatting order: {str(e)}")
+        return None
+    finally:
+        FORMAT_DURATION.observe(time.perf_counter() - started)
 
+def _render_order_message(order: "Order", closed: bool = False) -> Optional[Dict[str, str]]:
+    """Отрисовка текста и кнопки сообщения о заказе"""
+    try:
         # Основная информация
-        order_id = get_safe(order, ["id"], "неизвестен")
-        customer = get_safe(order, ["customer", "customerName"], "неизвестен")
-        time_left = get_safe(order, ["auction", "timeLeft"], "не указано")
-        
-        # Даты создания и обновления заказа
-        created_at = format_datetime(get_safe(order, ["createdAt", "time"]))
-        updated_at = format_datetime(get_safe(order, ["updatedAt", "time"]))
+        order_id = order.id or "неизвестен"
+        customer = order.customer_name or "неизвестен"
+        time_left = order.time_left or "не указано"
+        if closed:
+            time_left = "торги завершены (есть победитель)" if order.has_winner else "торги завершены"
         
         # Характеристики груза
-        weight = get_safe(order, ["dimensions", "weight"], "не указан")
-        volume = get_safe(order, ["dimensions", "volume"], "не указан")
+        weight = order.weight if order.weight is not None else "не указан"
+        volume = order.volume if order.volume is not None else "не указан"
         
         # Перевод типов кузова
-        body_types = translate_body_types(get_safe(order, ["bodyType"], []))
+        body_types = translate_body_types(order.body_types)
         
         # Информация о торгах
-        currency = get_safe(order, ["auction", "currency"], "не указана")
-        amount = get_safe(order, ["distribution", "amount"], "не указана")
+        currency = order.currency or "не указана"
+        amount = order.amount if order.amount is not None else "не указана"
 
         # Обработка маршрутов
-        shipments = get_safe(order, ["shipments"], [])
         route_points = []
         loading_info = None
         unloading_infos = []
 
-        if shipments:
-            for shipment in shipments:
-                # Обработка погрузки
-                loading_address = get_safe(shipment, ["npShipment", "npGeoAddress", "address"])
-                loading_city = fuzzy_find_city(loading_address) or extract_city_from_address(loading_address)
-                loading_date = format_datetime_with_timezone(
-                    get_safe(shipment, ["npShipment", "period", "from", "time"]))
-                loading_tz = get_timezone_from_datetime(
-                    get_safe(shipment, ["npShipment", "period", "from", "time"]))
-                
-                # Обработка выгрузки
-                unloading_address = get_safe(shipment, ["npUnshipment", "npGeoAddress", "address"])
-                unloading_city = fuzzy_find_city(unloading_address) or extract_city_from_address(unloading_address)
-                unloading_date = format_datetime_with_timezone(
-                    get_safe(shipment, ["npUnshipment", "period", "from", "time"]))
-                unloading_tz = get_timezone_from_datetime(
-                    get_safe(shipment, ["npUnshipment", "period", "from", "time"]))
-                
-                # Добавляем точки маршрута
-                if loading_city and loading_city not in route_points:
-                    route_points.append(loading_city)
-                    loading_info = {
-                        "city": loading_city,
-                        "date": loading_date,
-                        "timezone": loading_tz
-                    }
-                
-                if unloading_city and unloading_city not in route_points:
-                    route_points.append(unloading_city)
-                    unloading_infos.append({
-                        "city": unloading_city,
-                        "date": unloading_date,
-                        "timezone": unloading_tz
-                    })
+        for shipment in order.shipments:
+            # Обработка погрузки
+            loading_city = resolve_city(shipment.loading_address)
+            loading_date = format_dt(shipment.loading_time)
+            loading_tz = timezone_label(shipment.loading_time)
+            
+            # Обработка выгрузки
+            unloading_city = resolve_city(shipment.unloading_address)
+            unloading_date = format_dt(shipment.unloading_time)
+            unloading_tz = timezone_label(shipment.unloading_time)
+            
+            # Добавляем точки маршрута
+            if loading_city and loading_city not in route_points:
+                route_points.append(loading_city)
+                loading_info = {
+                    "city": loading_city,
+                    "date": loading_date,
+                    "timezone": loading_tz
+                }
+            
+            if unloading_city and unloading_city not in route_points:
+                route_points.append(unloading_city)
+                unloading_infos.append({
+                    "city": unloading_city,
+                    "date": unloading_date,
+                    "timezone": unloading_tz
+                })
 
         # Формирование строки маршрута
         route_str = " - ".join(route_points) if route_points else "не удалось определить"
 
         # Формирование сообщения
         message_lines = [
-            "🚛 Новый заказ в открытых торгах",
+            "🔒 Торги по заказу завершены" if closed else "🚛 Новый заказ в открытых торгах",
             "",
             f"▪️ Заказчик: {customer}",
             f"▪️ До окончания торгов: {time_left}",
@@ -219,9 +276,74 @@ def format_order_message(order: Dict[str, Any]) -> Optional[Dict[str, str]]:
 
         return {
             "text": "\n".join(message_lines),
-            "order_id": order_id
+            "order_id": order_id,
+            "button_url": order_url(order_id)
         }
 
     except Exception as e:
         logger.error(f"Error formatting order: {str(e)}")
-        return None
\ No newline at end of file
+        return None
+
+def _format_digest_line(order: "Order", limit: int) -> str:
+    """Строка заказа в сводке: маршрут, стоимость, срок и ссылка"""
+    route_points = []
+    for shipment in order.shipments:
+        for address in (shipment.loading_address, shipment.unloading_address):
+            city = resolve_city(address)
+            if city and city not in route_points:
+                route_points.append(city)
+    route_str = " - ".join(route_points) if route_points else "маршрут не определен"
+    amount = order.amount if order.amount is not None else "?"
+    currency = order.currency or ""
+    time_left = order.time_left or "срок не указан"
+    link = f" · [открыть]({order_url(order.id)})"
+    text = f"▪️ {route_str} · {amount} {currency}".rstrip() + f" · {time_left}"
+    # Обрезается только текст без разметки, чтобы не разорвать ссылку
+    return text[:max(0, limit - len(link))] + link
+
+def format_digest_messages(orders: List["Order"],
+                           limit: int = TELEGRAM_MESSAGE_LIMIT) -> List[Dict[str, Any]]:
+    """Сводные сообщения о новых заказах, разбитые по лимиту длины Telegram
+
+    Заказ, для которого не удалось собрать строку сводки, отправляется
+    отдельным сообщением, чтобы не потеряться.
+    """
+    entries = []
+    singles = []
+    for order in orders:
+        try:
+            entries.append((order.id, _format_digest_line(order, limit // 2)))
+        except Exception as e:
+            logger.error(f"Error formatting digest line for order {order.id}: {str(e)}")
+            message_data = format_order_message(order)
+            if message_data:
+                singles.append(message_data)
+
+    # Заголовок с запасом под номер части и общее количество
+    header = f"📦 Новые заказы в открытых торгах: {len(entries)}"
+    reserve = len(header) + len(" (часть 999)") + 2
+
+    chunks: List[List[Tuple[Any, str]]] = []
+    current: List[Tuple[Any, str]] = []
+    length = reserve
+    for entry in entries:
+        line_length = len(entry[1]) + 1
+        if current and length + line_length > limit:
+            chunks.append(current)
+            current, length = [], reserve
+        current.append(entry)
+        length += line_length
+    if current:
+        chunks.append(current)
+
+    messages = []
+    for number, chunk in enumerate(chunks, 1):
+        title = header if len(chunks) == 1 else f"{header} (часть {number})"
+        order_ids = [order_id for order_id, _ in chunk]
+        messages.append({
+            "text": "\n".join([title, ""] + [line for _, line in chunk]),
+            "order_id": f"digest-{order_ids[0]}",
+            "order_ids": order_ids,
+            "digest": True
+        })
+    return messages + singles
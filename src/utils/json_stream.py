@@ -0,0 +1,120 @@
+import codecs
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+_WHITESPACE = " \t\n\r"
+_DECODER = json.JSONDecoder()
+
+# После такого количества прочитанных символов буфер обрезается
+_TRIM_THRESHOLD = 1 << 16
+
+
+class _StreamReader:
+    """Буфер над потоком байтов с декодированием UTF-8 по частям"""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Дочитывание следующей порции; False, если поток закончился"""
+        if self.eof:
+            return False
+        if self.pos > _TRIM_THRESHOLD:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        for chunk in self._chunks:
+            text = self._utf8.decode(chunk)
+            if text:
+                self.buf += text
+                return True
+        self.buf += self._utf8.decode(b"", final=True)
+        self.eof = True
+        return False
+
+    def peek(self) -> str:
+        while self.pos >= len(self.buf):
+            if not self.fill():
+                raise ValueError("Unexpected end of JSON stream")
+        return self.buf[self.pos]
+
+    def skip_ws(self) -> None:
+        while self.peek() in _WHITESPACE:
+            self.pos += 1
+
+    def expect(self, char: str) -> None:
+        self.skip_ws()
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} in JSON stream, got {self.peek()!r}")
+        self.pos += 1
+
+    def decode_value(self) -> Any:
+        """Декодирование одного JSON-значения целиком"""
+        self.skip_ws()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # Число на границе порции могло быть прочитано не полностью
+            if end == len(self.buf) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_array(chunks: Iterable[bytes], path: Sequence[str],
+                    meta: Optional[Dict[str, Any]] = None) -> Iterator[Any]:
+    """Потоковое чтение элементов массива по пути ключей (например, data.orders)
+
+    Элементы отдаются по одному по мере декодирования. Скалярные поля объекта,
+    содержащего массив (например, data.total), складываются в meta.
+    """
+    reader = _StreamReader(chunks)
+    yield from _walk(reader, list(path), meta)
+
+
+def _walk(reader: _StreamReader, path: List[str], meta: Optional[Dict[str, Any]]) -> Iterator[Any]:
+    reader.skip_ws()
+    if reader.peek() != "{":
+        reader.decode_value()
+        return
+    reader.pos += 1
+
+    while True:
+        reader.skip_ws()
+        char = reader.peek()
+        if char == "}":
+            reader.pos += 1
+            return
+        if char == ",":
+            reader.pos += 1
+            continue
+
+        key = reader.decode_value()
+        reader.expect(":")
+        reader.skip_ws()
+
+        if key == path[0] and len(path) > 1:
+            yield from _walk(reader, path[1:], meta)
+        elif key == path[0] and reader.peek() == "[":
+            reader.pos += 1
+            while True:
+                reader.skip_ws()
+                char = reader.peek()
+                if char == "]":
+                    reader.pos += 1
+                    break
+                if char == ",":
+                    reader.pos += 1
+                    continue
+                yield reader.decode_value()
+        else:
+            value = reader.decode_value()
+            if len(path) == 1 and meta is not None and not isinstance(value, (dict, list)):
+                meta[key] = value
@@ -0,0 +1,26 @@
+import importlib
+import sys
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+
+def lazy_exports(package: str, exports: Dict[str, Sequence[str]]
+                 ) -> Tuple[List[str], Callable[[str], Any], Callable[[], List[str]]]:
+    """__all__, __getattr__ и __dir__ пакета, импортирующего модули при первом обращении к имени
+
+    exports -- модуль пакета -> экспортируемые им имена.
+    """
+    modules = {name: module for module, names in exports.items() for name in names}
+    namespace = sys.modules[package].__dict__
+
+    def __getattr__(name: str) -> Any:
+        module = modules.get(name)
+        if module is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(f".{module}", package), name)
+        namespace[name] = value
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(namespace) | set(modules))
+
+    return list(modules), __getattr__, __dir__
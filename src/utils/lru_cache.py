@@ -0,0 +1,58 @@
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Tuple
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Основа кэшей с ограничением размера: вытеснение давно не использованных записей и счетчики"""
+
+    def __init__(self, maxsize: int):
+        self._cache: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        """Поиск записи с учетом попадания или промаха; (найдено, значение)"""
+        value = self._cache.get(key, _MISSING)
+        if value is _MISSING:
+            self.misses += 1
+            return False, None
+        self._cache.move_to_end(key)
+        self.hits += 1
+        return True, value
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        """Сохранение записи с вытеснением сверх лимита"""
+        self._cache[key] = value
+        self._evict()
+
+    def resize(self, maxsize: int) -> None:
+        """Изменение максимального размера кэша"""
+        self.maxsize = maxsize
+        self._evict()
+
+    def _evict(self) -> None:
+        """Удаление самых старых записей сверх лимита"""
+        while len(self._cache) > max(self.maxsize, 0):
+            self._cache.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Очистка кэша и счетчиков"""
+        self._cache.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, float]:
+        """Статистика использования кэша"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
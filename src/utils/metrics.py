@@ -0,0 +1,258 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+# Границы корзин по умолчанию, секунды
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Размер ответа API, байты
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+LabelValues = Tuple[str, ...]
+GaugeValue = Union[float, Dict[LabelValues, float]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+class _Metric:
+    """Общая часть метрик: имя, описание, метки и блокировка"""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"Metric {self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Монотонно растущий счетчик"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        if amount < 0:
+            raise ValueError("Counter can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+                for key, value in values]
+
+
+class Gauge(_Metric):
+    """Текущее значение; может вычисляться в момент опроса функцией"""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+        # Источник значений -> функция; повторная регистрация источника заменяет функцию
+        self._functions: Dict[str, Callable[[], GaugeValue]] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function: Callable[[], GaugeValue], source: str = "") -> None:
+        """Источник значения на момент опроса: число или словарь {значения меток: число}
+
+        Функции разных источников (source) дополняют друг друга по меткам.
+        """
+        with self._lock:
+            self._functions[source] = function
+
+    def _collect(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            values = dict(self._values)
+            functions = list(self._functions.values())
+        for function in functions:
+            try:
+                result = function()
+            except Exception:
+                continue
+            if isinstance(result, dict):
+                values.update(result)
+            else:
+                values[()] = result
+        return values
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+                for key, value in sorted(self._collect().items())]
+
+
+class Histogram(_Metric):
+    """Распределение значений по корзинам с суммой и количеством"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # значения меток -> [счетчики корзин, сумма, количество]
+        self._values: Dict[LabelValues, List] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Замер длительности блока в секундах"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: str) -> int:
+        entry = self._values.get(self._key(labels))
+        return entry[2] if entry else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(entry[0]), entry[1], entry[2]))
+                            for key, entry in self._values.items())
+        names = self.label_names + ("le",)
+        lines = []
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(names, key + (_format_value(bound),))} "
+                             f"{cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Набор метрик процесса в текстовом формате Prometheus"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+POLL_DURATION = METRICS.histogram(
+    "magistrali_poll_duration_seconds", "Duration of a full polling cycle")
+API_FETCH_DURATION = METRICS.histogram(
+    "magistrali_api_fetch_duration_seconds", "Duration of fetching active orders from the API",
+    labels=("account",))
+API_PAYLOAD_BYTES = METRICS.histogram(
+    "magistrali_api_payload_bytes", "Decoded size of an API response page",
+    labels=("account",), buckets=SIZE_BUCKETS)
+API_ERRORS = METRICS.counter(
+    "magistrali_api_errors_total", "Failed API polls", labels=("account",))
+ORDERS_RECEIVED = METRICS.counter(
+    "magistrali_orders_received_total", "Orders received from the API", labels=("account",))
+ORDERS_SENT = METRICS.counter(
+    "magistrali_orders_sent_total", "Orders published or updated in Telegram", labels=("kind",))
+ORDERS_SKIPPED = METRICS.counter(
+    "magistrali_orders_skipped_total", "Orders skipped by reason", labels=("reason",))
+FORMAT_DURATION = METRICS.histogram(
+    "magistrali_format_duration_seconds", "Time spent in format_order_message",
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25))
+TELEGRAM_SEND_DURATION = METRICS.histogram(
+    "magistrali_telegram_send_duration_seconds", "Duration of a Telegram API call",
+    labels=("result",))
+DEDUP_SIZE = METRICS.gauge(
+    "magistrali_dedup_orders", "Orders in the sent orders dedup store")
+POSTED_MESSAGES = METRICS.gauge(
+    "magistrali_posted_messages", "Tracked published messages")
+QUEUE_DEPTH = METRICS.gauge(
+    "magistrali_queue_depth", "Items waiting in internal queues", labels=("queue",))
+
+
+def record_cycle(new: int, updated: int, skipped_reasons: Dict[str, int]) -> None:
+    """Учет итогов цикла обработки заказов"""
+    if new:
+        ORDERS_SENT.inc(new, kind="new")
+    if updated:
+        ORDERS_SENT.inc(updated, kind="updated")
+    # Нулевые причины тоже публикуются, чтобы ряды существовали с первого опроса
+    for reason, count in skipped_reasons.items():
+        ORDERS_SKIPPED.inc(count, reason=reason)
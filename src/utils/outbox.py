@@ -0,0 +1,156 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src.utils.formatters import message_key
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    expires_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'pending',
+    message_id INTEGER
+)
+"""
+
+
+@dataclass(slots=True)
+class OutboxItem:
+    """Сообщение из очереди на отправку"""
+
+    id: int
+    key: str
+    message_data: Dict[str, Any]
+    expires_at: Optional[float]
+    attempts: int
+    message_id: Optional[int] = None
+
+
+def outbox_key(message_data: Dict[str, Any]) -> str:
+    """Ключ сообщения: повторная постановка того же заказа заменяет ожидающее сообщение"""
+    prefix = "edit" if message_data.get("edit") else "new"
+    return f"{prefix}:{message_key(message_data)}"
+
+
+class Outbox:
+    """Постоянная очередь исходящих сообщений в SQLite
+
+    Сообщение живет в очереди от постановки до подтверждения доставки
+    и переживает перезапуск процесса.
+    """
+
+    def __init__(self, file_path: str = "data/outbox.db"):
+        self.file = Path(file_path)
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.file), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(_SCHEMA)
+        self.enqueued = 0
+        self.delivered = 0
+        self.retried = 0
+        self.dropped = 0
+
+    def enqueue(self, message_data: Dict[str, Any], expires_at: Optional[float] = None) -> bool:
+        """Постановка сообщения в очередь; ожидающее сообщение с тем же ключом заменяется"""
+        key = outbox_key(message_data)
+        payload = json.dumps(message_data, ensure_ascii=False)
+        try:
+            with self._lock:
+                cursor = self._db.execute(
+                    "INSERT INTO outbox (key, payload, expires_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET payload = excluded.payload, "
+                    "expires_at = excluded.expires_at WHERE status = 'pending'",
+                    (key, payload, expires_at)
+                )
+                if cursor.rowcount == 0 and message_data.get("edit"):
+                    # Прошлая правка доставлена, но монитор ее еще не учел:
+                    # новая правка снова ставит запись в очередь, иначе она потеряется
+                    cursor = self._db.execute(
+                        "UPDATE outbox SET payload = ?, expires_at = ?, status = 'pending', "
+                        "attempts = 0, next_attempt = 0, message_id = NULL WHERE key = ?",
+                        (payload, expires_at, key)
+                    )
+            if cursor.rowcount == 0:
+                # Новое сообщение с этим ключом уже доставлено
+                logger.debug(f"Message {key} is already delivered, not enqueued again")
+                return True
+            self.enqueued += 1
+            return True
+        except Exception as e:
+            logger.error(f"Error enqueueing order {message_data.get('order_id')}: {str(e)}")
+            return False
+
+    def due(self, limit: int, now: Optional[float] = None) -> List[OutboxItem]:
+        """Сообщения, время отправки которых наступило"""
+        now = time.time() if now is None else now
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, key, payload, expires_at, attempts FROM outbox "
+                "WHERE status = 'pending' AND next_attempt <= ? ORDER BY id LIMIT ?",
+                (now, limit)
+            ).fetchall()
+        return [OutboxItem(row[0], row[1], json.loads(row[2]), row[3], row[4]) for row in rows]
+
+    def mark_delivered(self, item: OutboxItem, message_id: Optional[int] = None) -> None:
+        """Отметка доставки; запись ждет, пока монитор заберет результат"""
+        with self._lock:
+            self._db.execute("UPDATE outbox SET status = 'delivered', message_id = ? WHERE id = ?",
+                             (message_id, item.id))
+        self.delivered += 1
+
+    def retry(self, item: OutboxItem, delay: float) -> None:
+        """Перенос следующей попытки"""
+        with self._lock:
+            self._db.execute("UPDATE outbox SET attempts = attempts + 1, next_attempt = ? WHERE id = ?",
+                             (time.time() + delay, item.id))
+        self.retried += 1
+
+    def drop(self, item: OutboxItem) -> None:
+        """Удаление сообщения, которое больше не нужно отправлять"""
+        with self._lock:
+            self._db.execute("DELETE FROM outbox WHERE id = ?", (item.id,))
+        self.dropped += 1
+
+    def delivered_items(self) -> List[OutboxItem]:
+        """Доставленные сообщения (с message_id), которые монитор еще не учел"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, key, payload, expires_at, attempts, message_id FROM outbox "
+                "WHERE status = 'delivered' ORDER BY id"
+            ).fetchall()
+        return [OutboxItem(row[0], row[1], json.loads(row[2]), row[3], row[4], row[5]) for row in rows]
+
+    def remove(self, items: List[OutboxItem]) -> None:
+        """Удаление учтенных сообщений из очереди"""
+        with self._lock:
+            self._db.executemany("DELETE FROM outbox WHERE id = ?", [(item.id,) for item in items])
+
+    def pending(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM outbox WHERE status = 'pending'").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def stats(self) -> Dict[str, int]:
+        """Статистика очереди"""
+        return {
+            "pending": self.pending(),
+            "enqueued": self.enqueued,
+            "delivered": self.delivered,
+            "retried": self.retried,
+            "dropped": self.dropped
+        }
@@ -0,0 +1,132 @@
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class PostedMessage:
+    """Опубликованное сообщение о заказе и состояние заказа на момент публикации"""
+
+    message_id: int
+    state: str
+    expires_at: float
+    closed: bool = False
+    order_id: Optional[str] = None
+    chat_id: Optional[str] = None
+
+
+class PostedMessagesStore:
+    """ID сообщений в каналах по заказам для редактирования вместо повторной публикации
+
+    Записи хранятся по ключу сообщения (message_key): один заказ может быть
+    опубликован в нескольких каналах.
+    """
+
+    def __init__(self, file_path: str = "data/posted_messages.json"):
+        self.file = Path(file_path)
+        self._messages: Dict[str, PostedMessage] = {}
+        # ID заказа -> ключи его сообщений
+        self._by_order: Dict[str, Set[str]] = {}
+        self._dirty = False
+        self.edited = 0
+        self.closed = 0
+
+    def load(self) -> None:
+        """Загрузка сохраненных сообщений без устаревших"""
+        try:
+            if not self.file.exists():
+                return
+            with open(self.file, 'r', encoding='utf-8') as f:
+                content = f.read()
+            if not content.strip():
+                return
+            now = time.time()
+            for key, entry in json.loads(content).items():
+                message = PostedMessage(**entry)
+                if message.order_id is None:
+                    message.order_id = key
+                if message.expires_at > now:
+                    self._add(key, message)
+        except Exception as e:
+            logger.error(f"Error loading posted messages: {str(e)}")
+
+    def save(self) -> bool:
+        """Атомарная запись на диск, если были изменения"""
+        if not self._dirty:
+            return True
+        try:
+            self.file.parent.mkdir(parents=True, exist_ok=True)
+            data = {key: asdict(message) for key, message in self._messages.items()}
+            tmp_file = self.file.with_suffix(self.file.suffix + ".tmp")
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.file)
+            self._dirty = False
+            return True
+        except Exception as e:
+            logger.error(f"Error saving posted messages: {str(e)}")
+            return False
+
+    def _add(self, key: str, message: PostedMessage) -> None:
+        self._messages[key] = message
+        self._by_order.setdefault(message.order_id, set()).add(key)
+
+    def get(self, key: str) -> Optional[PostedMessage]:
+        return self._messages.get(key)
+
+    def for_order(self, order_id: str) -> List[PostedMessage]:
+        """Все опубликованные сообщения заказа"""
+        return [self._messages[key] for key in sorted(self._by_order.get(order_id, ()))]
+
+    def record(self, key: str, message_id: int, state: str, expires_at: float,
+               order_id: Optional[str] = None, chat_id: Optional[str] = None) -> None:
+        """Запоминание нового опубликованного сообщения"""
+        self._add(key, PostedMessage(message_id, state, expires_at,
+                                     order_id=order_id or key, chat_id=chat_id))
+        self._dirty = True
+
+    def update(self, key: str, state: str, closed: bool = False) -> None:
+        """Обновление состояния после успешного редактирования"""
+        message = self._messages.get(key)
+        if message is None:
+            return
+        message.state = state
+        message.closed = closed
+        self._dirty = True
+        self.edited += 1
+        if closed:
+            self.closed += 1
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Удаление сообщений заказов, торги по которым давно завершены"""
+        now = time.time() if now is None else now
+        stale = [key for key, message in self._messages.items() if message.expires_at <= now]
+        for key in stale:
+            message = self._messages.pop(key)
+            keys = self._by_order.get(message.order_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_order[message.order_id]
+        if stale:
+            self._dirty = True
+        return len(stale)
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def stats(self) -> Dict[str, int]:
+        """Статистика хранилища"""
+        return {
+            "size": len(self._messages),
+            "edited": self.edited,
+            "closed": self.closed
+        }
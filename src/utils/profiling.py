@@ -0,0 +1,175 @@
+import io
+import logging
+import signal
+import threading
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from typing import TYPE_CHECKING, ContextManager, Dict, List, Optional
+
+if TYPE_CHECKING:
+    import cProfile
+
+logger = logging.getLogger(__name__)
+
+# Выключенный замер: один общий объект без вызова часов
+_NULL_SPAN = nullcontext()
+
+
+class _Span:
+    """Замер длительности одного участка кода"""
+
+    __slots__ = ("profiler", "name", "started")
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self.profiler = profiler
+        self.name = name
+        self.started = 0.0
+
+    def __enter__(self) -> "_Span":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.profiler._record(self.name, time.perf_counter() - self.started)
+
+
+class Profiler:
+    """Замеры стадий цикла опроса и захват cProfile/tracemalloc на ближайшие циклы
+
+    Замеры включаются настройкой PROFILE_SPANS или на время захвата; в остальное
+    время span() возвращает пустой контекст. Захват запрашивается сигналом
+    SIGUSR1 или настройкой PROFILE_ON_START, результаты пишутся в data/profiles/.
+    """
+
+    def __init__(self, output_dir: str = "data/profiles"):
+        self.output_dir = Path(output_dir)
+        self.spans_enabled = False
+        self.capture_cycles = 3
+        self.trace_memory = True
+        self._timing = False
+        self._pending = 0
+        self._profile: Optional["cProfile.Profile"] = None
+        self._started_tracemalloc = False
+        self._captures = 0
+        self._lock = threading.Lock()
+        # Имя участка -> [суммарное время, количество]
+        self._spans: Dict[str, List[float]] = {}
+
+    def configure(self, spans: bool = False, capture_cycles: int = 3,
+                  trace_memory: bool = True, output_dir: Optional[str] = None) -> None:
+        self.spans_enabled = spans
+        self.capture_cycles = max(1, capture_cycles)
+        self.trace_memory = trace_memory
+        if output_dir is not None:
+            self.output_dir = Path(output_dir)
+        self._timing = spans or self._profile is not None
+
+    def span(self, name: str) -> ContextManager:
+        """Контекст замера участка; без накладных расходов, если замеры выключены"""
+        if not self._timing:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def _record(self, name: str, elapsed: float) -> None:
+        with self._lock:
+            entry = self._spans.get(name)
+            if entry is None:
+                self._spans[name] = [elapsed, 1]
+            else:
+                entry[0] += elapsed
+                entry[1] += 1
+
+    def take_spans(self) -> Dict[str, Dict[str, float]]:
+        """Замеры с начала цикла со сбросом"""
+        with self._lock:
+            spans, self._spans = self._spans, {}
+        return {name: {"seconds": round(total, 4), "count": int(count)}
+                for name, (total, count) in sorted(spans.items(), key=lambda item: -item[1][0])}
+
+    def request_capture(self, cycles: Optional[int] = None) -> None:
+        """Запрос захвата профиля на ближайшие циклы (безопасно вызывать из обработчика сигнала)"""
+        self._pending = cycles or self.capture_cycles
+
+    def install_signal_handler(self) -> bool:
+        """Захват по SIGUSR1; False, если сигнал недоступен (Windows) или поток не главный"""
+        signum = getattr(signal, "SIGUSR1", None)
+        if signum is None:
+            return False
+        try:
+            signal.signal(signum, lambda *_: self.request_capture())
+        except ValueError:
+            return False
+        logger.info("Send SIGUSR1 to capture a profile of the next polling cycles")
+        return True
+
+    @property
+    def capturing(self) -> bool:
+        return self._profile is not None
+
+    def begin_cycle(self) -> None:
+        """Начало цикла: запуск профилировщика, если захват запрошен"""
+        if self._pending <= 0 or self._profile is not None:
+            return
+        # Модули профилирования нужны только при захвате
+        import cProfile
+        import tracemalloc
+
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+            self._started_tracemalloc = True
+        self._profile = cProfile.Profile()
+        self._timing = True
+        self._profile.enable()
+        logger.info(f"Profiling capture started, {self._pending} cycles left")
+
+    def end_cycle(self) -> None:
+        """Конец цикла: запись замеров в лог и профиля на диск"""
+        profile = self._profile
+        if profile is not None:
+            profile.disable()
+        spans = self.take_spans() if self._timing else {}
+        if spans:
+            logger.info(f"Cycle spans: {spans}")
+        if profile is None:
+            return
+
+        self._profile = None
+        self._pending -= 1
+        self._captures += 1
+        try:
+            self._dump(profile, spans)
+        except Exception as e:
+            logger.error(f"Error saving profile: {str(e)}")
+        if self._pending <= 0:
+            self._pending = 0
+            if self._started_tracemalloc:
+                import tracemalloc
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+            logger.info("Profiling capture finished")
+        self._timing = self.spans_enabled
+
+    def _dump(self, profile: "cProfile.Profile", spans: Dict[str, Dict[str, float]]) -> None:
+        """Запись .prof для pstats/snakeviz и текстовой сводки рядом"""
+        import pstats
+        import tracemalloc
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        stem = self.output_dir / f"{time.strftime('%Y%m%d-%H%M%S')}-cycle{self._captures}"
+        profile.dump_stats(str(stem.with_suffix(".prof")))
+
+        report = io.StringIO()
+        report.write(f"Spans: {spans}\n\n")
+        pstats.Stats(profile, stream=report).sort_stats("cumulative").print_stats(40)
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            report.write(f"\nMemory: current {current / 1024:.0f} KiB, peak {peak / 1024:.0f} KiB\n")
+            for stat in tracemalloc.take_snapshot().statistics("lineno")[:25]:
+                report.write(f"{stat}\n")
+        with open(stem.with_suffix(".txt"), 'w', encoding='utf-8') as f:
+            f.write(report.getvalue())
+        logger.info(f"Profile saved to {stem}.prof")
+
+
+PROFILER = Profiler()
@@ -0,0 +1,46 @@
+from typing import Any, Callable, Dict, Optional
+
+from src.utils.lru_cache import LRUCache
+
+DEFAULT_RENDER_CACHE_SIZE = 2048
+
+
+class RenderCache(LRUCache):
+    """LRU-кэш отрисованных сообщений по отпечатку содержимого"""
+
+    def __init__(self, maxsize: int = DEFAULT_RENDER_CACHE_SIZE):
+        super().__init__(maxsize)
+        # Счетчики текущего цикла опроса
+        self.cycle_hits = 0
+        self.cycle_misses = 0
+
+    def get_or_render(self, fingerprint: str,
+                      render: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """Готовое сообщение из кэша или отрисовка и сохранение нового"""
+        found, cached = self._lookup(fingerprint)
+        if found:
+            self.cycle_hits += 1
+            return dict(cached)
+
+        self.cycle_misses += 1
+        rendered = render()
+        if rendered is not None:
+            self._store(fingerprint, rendered)
+            return dict(rendered)
+        return None
+
+    def clear(self) -> None:
+        """Очистка кэша и счетчиков"""
+        super().clear()
+        self.cycle_hits = self.cycle_misses = 0
+
+    def take_cycle_stats(self) -> Dict[str, int]:
+        """Сэкономленная за цикл работа; счетчики цикла обнуляются"""
+        stats = {
+            "rendered": self.cycle_misses,
+            "reused": self.cycle_hits,
+            "size": len(self._cache),
+            "evictions": self.evictions
+        }
+        self.cycle_hits = self.cycle_misses = 0
+        return stats
@@ -0,0 +1,195 @@
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Компактизация запускается, когда мусорных записей в журнале больше этого числа
+COMPACT_MIN_GARBAGE = 1000
+
+
+def _format_record(order_id: str, expires_at: Optional[float]) -> str:
+    if expires_at is None:
+        return f"{order_id}\n"
+    return f"{order_id}\t{expires_at:.0f}\n"
+
+
+def _parse_record(line: str) -> Tuple[str, Optional[float]]:
+    order_id, _, expires_at = line.partition("\t")
+    try:
+        return order_id, float(expires_at) if expires_at else None
+    except ValueError:
+        return order_id, None
+
+
+class SentOrdersJournal:
+    """Журнал отправленных заказов: дозапись с fsync и фоновая компактизация
+
+    Строка журнала: ID заказа и, через табуляцию, момент истечения записи (epoch).
+    """
+
+    def __init__(self, file_path: str = "data/sent_orders.log",
+                 legacy_path: str = "data/sent_orders.json"):
+        self.file = Path(file_path)
+        self.legacy_file = Path(legacy_path)
+        self._lock = threading.Lock()
+        self._handle = None
+        self._records = 0
+        # Записей в журнале сразу после последней компактизации
+        self._compacted = 0
+        # Записи, сделанные во время компактизации, дописываются в новый файл
+        self._pending: Optional[List[str]] = None
+        self._compactor: Optional[threading.Thread] = None
+
+    def load(self) -> Dict[str, Optional[float]]:
+        """Воспроизведение журнала при старте: ID -> момент истечения"""
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        sent_orders: Dict[str, Optional[float]] = {}
+
+        try:
+            if self.file.exists():
+                with open(self.file, 'r', encoding='utf-8') as f:
+                    content = f.read()
+                lines = content.split("\n")
+                torn = bool(content) and not content.endswith("\n")
+                # Последняя строка без перевода строки могла оборваться при сбое
+                if torn:
+                    lines = lines[:-1]
+                lines = [line for line in lines if line]
+                sent_orders.update(_parse_record(line) for line in lines)
+                self._records = len(lines)
+                if torn:
+                    self._rewrite(sent_orders)
+            elif self.legacy_file.exists():
+                sent_orders = dict.fromkeys(self._load_legacy())
+                self._rewrite(sent_orders)
+                logger.info(f"Migrated {len(sent_orders)} sent orders from {self.legacy_file}")
+        except Exception as e:
+            logger.error(f"Error loading sent orders journal: {str(e)}")
+
+        return sent_orders
+
+    def _load_legacy(self) -> Set[str]:
+        """Чтение старого формата {id: 1}"""
+        with open(self.legacy_file, 'r', encoding='utf-8') as f:
+            content = f.read()
+        if not content.strip():
+            return set()
+        return set(json.loads(content).keys())
+
+    def lookup(self, order_id: str) -> Tuple[bool, Optional[float]]:
+        """Поиск последней записи заказа в журнале: (найдена, момент истечения)"""
+        try:
+            with open(self.file, 'r', encoding='utf-8') as f:
+                content = "\n" + f.read()
+        except FileNotFoundError:
+            return False, None
+        except Exception as e:
+            logger.error(f"Error reading sent orders journal: {str(e)}")
+            return False, None
+        position = max(content.rfind(f"\n{order_id}\t"), content.rfind(f"\n{order_id}\n"))
+        if position < 0:
+            return False, None
+        end = content.find("\n", position + 1)
+        return True, _parse_record(content[position + 1:end if end >= 0 else None])[1]
+
+    def _open(self):
+        if self._handle is None:
+            self._handle = open(self.file, 'a', encoding='utf-8')
+        return self._handle
+
+    def append(self, order_id: str, expires_at: Optional[float] = None) -> bool:
+        """Дозапись ID отправленного заказа с немедленным сбросом на диск"""
+        record = _format_record(order_id, expires_at)
+        try:
+            with self._lock:
+                handle = self._open()
+                handle.write(record)
+                handle.flush()
+                os.fsync(handle.fileno())
+                self._records += 1
+                if self._pending is not None:
+                    self._pending.append(record)
+            return True
+        except Exception as e:
+            logger.error(f"Error appending to sent orders journal: {str(e)}")
+            return False
+
+    def maybe_compact(self, live_orders) -> None:
+        """Фоновая компактизация, если в журнале накопилось много лишних записей
+
+        live_orders -- отображение или хранилище с методом items(): ID -> момент истечения.
+        Хранилище может быть меньше журнала (вытесненные заказы), поэтому в журнале
+        остаются все записи с непрошедшим сроком.
+        """
+        if self._records - max(len(live_orders), self._compacted) < COMPACT_MIN_GARBAGE:
+            return
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        # Снимок делается в вызывающем потоке, фоновый поток работает с копией;
+        # записи, добавленные после снимка, копятся в _pending до замены файла
+        with self._lock:
+            self._pending = []
+            snapshot = dict(live_orders.items())
+        self._compactor = threading.Thread(target=self._compact, args=(snapshot,),
+                                           name="journal-compactor", daemon=True)
+        self._compactor.start()
+
+    def _compact(self, live_orders: Dict[str, Optional[float]]) -> None:
+        """Перезапись журнала только с актуальными ID"""
+        try:
+            self._rewrite(self._live_records(live_orders))
+        except Exception as e:
+            logger.error(f"Error compacting sent orders journal: {str(e)}")
+        finally:
+            with self._lock:
+                self._pending = None
+
+    def _live_records(self, live_orders: Dict[str, Optional[float]]) -> Dict[str, Optional[float]]:
+        """Записи журнала с непрошедшим сроком; сроки из хранилища имеют приоритет"""
+        records: Dict[str, Optional[float]] = {}
+        if self.file.exists():
+            with open(self.file, 'r', encoding='utf-8') as f:
+                lines = f.read().split("\n")
+            # Последняя строка может быть недописана, она есть и в _pending
+            records.update(_parse_record(line) for line in lines[:-1] if line)
+        records.update(live_orders)
+        now = time.time()
+        return {order_id: expires_at for order_id, expires_at in records.items()
+                if expires_at is not None and expires_at > now}
+
+    def _rewrite(self, orders: Dict[str, Optional[float]]) -> None:
+        """Запись во временный файл и атомарная замена журнала"""
+        tmp_file = self.file.with_suffix(self.file.suffix + ".tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.writelines(_format_record(order_id, expires_at)
+                         for order_id, expires_at in orders.items())
+            f.flush()
+
+            with self._lock:
+                pending = self._pending or []
+                f.writelines(pending)
+                f.flush()
+                os.fsync(f.fileno())
+                os.replace(tmp_file, self.file)
+                if self._handle is not None:
+                    self._handle.close()
+                    self._handle = None
+                self._records = self._compacted = len(orders) + len(pending)
+                if self._pending is not None:
+                    self._pending = []
+
+        logger.info(f"Sent orders journal compacted to {self._records} records")
+
+    def close(self) -> None:
+        """Закрытие журнала"""
+        if self._compactor is not None:
+            self._compactor.join()
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
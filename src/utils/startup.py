@@ -0,0 +1,177 @@
+import logging
+import os
+import sys
+import threading
+import time
+from importlib.abc import MetaPathFinder
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def process_uptime() -> Optional[float]:
+    """Время с запуска процесса по /proc (Linux) или None"""
+    try:
+        with open("/proc/self/stat", "r") as f:
+            # Имя процесса в скобках может содержать пробелы
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime", "r") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class _TimedLoader:
+    """Загрузчик-обертка: замер создания и выполнения модуля"""
+
+    def __init__(self, loader: Any, name: str, profiler: "ImportProfiler"):
+        self._loader = loader
+        self._name = name
+        self._profiler = profiler
+
+    def create_module(self, spec: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return self._loader.create_module(spec)
+        finally:
+            self._profiler._add(self._name, time.perf_counter() - started)
+
+    def exec_module(self, module: Any) -> None:
+        # Модуль получает исходный загрузчик: обертка видна только на время импорта
+        module.__loader__ = self._loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self._loader
+        self._profiler._run(self._name, self._loader, module)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._loader, name)
+
+
+class ImportProfiler(MetaPathFinder):
+    """Время импорта модулей с диска (аналог python -X importtime) внутри процесса"""
+
+    def __init__(self):
+        # Модуль -> [собственное время, время с вложенными импортами]
+        self.timings: Dict[str, List[float]] = {}
+        self._local = threading.local()
+
+    def install(self) -> None:
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self) -> None:
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname: str, path: Any, target: Any = None) -> Any:
+        if getattr(self._local, "finding", False):
+            return None
+        self._local.finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._local.finding = False
+        # Встроенные и замороженные модули не замеряются
+        if spec.loader is None or not spec.has_location or not hasattr(spec.loader, "exec_module"):
+            return spec
+        spec.loader = _TimedLoader(spec.loader, fullname, self)
+        return spec
+
+    def _stack(self) -> List[float]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _add(self, name: str, elapsed: float, nested: float = 0.0) -> None:
+        """Учет времени модуля; родительский импорт получает его как вложенное"""
+        own, total = self.timings.get(name, (0.0, 0.0))
+        self.timings[name] = [own + elapsed - nested, total + elapsed]
+        stack = self._stack()
+        if stack:
+            stack[-1] += elapsed
+
+    def _run(self, name: str, loader: Any, module: Any) -> None:
+        stack = self._stack()
+        stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            loader.exec_module(module)
+        finally:
+            elapsed = time.perf_counter() - started
+            nested = stack.pop()
+            self._add(name, elapsed, nested=nested)
+
+    def by_package(self) -> List[Tuple[str, float]]:
+        """Собственное время импорта, сгруппированное по пакету верхнего уровня"""
+        packages: Dict[str, float] = {}
+        for name, (own, _) in self.timings.items():
+            package = name.split(".", 1)[0]
+            if package == "src":
+                package = ".".join(name.split(".")[:2])
+            packages[package] = packages.get(package, 0.0) + own
+        return sorted(packages.items(), key=lambda item: item[1], reverse=True)
+
+
+class StartupProfile:
+    """Отчет о запуске: этапы от старта процесса и разбивка времени импорта
+
+    Включается параметром --startup-profile; до включения mark() ничего не делает.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._origin = time.perf_counter()
+        self._marks: List[Tuple[str, float]] = []
+        self._imports: Optional[ImportProfiler] = None
+
+    def enable(self) -> None:
+        """Начало замера; отсчет ведется от запуска процесса, если он известен"""
+        uptime = process_uptime()
+        self._origin = time.perf_counter() - (uptime or 0.0)
+        self._imports = ImportProfiler()
+        self._imports.install()
+        self.enabled = True
+        self.mark("startup profile enabled")
+
+    def mark(self, name: str) -> None:
+        """Отметка этапа; повторная отметка с тем же именем не учитывается"""
+        if not self.enabled or any(mark == name for mark, _ in self._marks):
+            return
+        self._marks.append((name, time.perf_counter() - self._origin))
+
+    def finish(self, top: int = 15) -> None:
+        """Запись отчета в лог и отключение замеров"""
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._imports.uninstall()
+        logger.info(self.report(top))
+
+    def report(self, top: int = 15) -> str:
+        lines = ["Startup profile (ms since process start):"]
+        lines.extend(f"  {name:<28} {moment * 1000:8.1f}" for name, moment in self._marks)
+        if self._imports is None:
+            return "\n".join(lines)
+        timings = self._imports.timings
+        lines.append(f"Imports: {len(timings)} modules, "
+                     f"{sum(own for own, _ in timings.values()) * 1000:.1f} ms")
+        lines.append("  by package (self time):")
+        lines.extend(f"    {package:<26} {own * 1000:8.1f}"
+                     for package, own in self._imports.by_package()[:top])
+        lines.append("  slowest modules (self / cumulative):")
+        slowest = sorted(timings.items(), key=lambda item: item[1][0], reverse=True)[:top]
+        lines.extend(f"    {name:<40} {own * 1000:8.1f} {total * 1000:8.1f}"
+                     for name, (own, total) in slowest)
+        return "\n".join(lines)
+
+
+STARTUP = StartupProfile()
@@ -0,0 +1,127 @@
+import json
+import logging
+import os
+import uuid
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from src.utils.filter_index import FilterIndex, OrderFeatures, OrderFilter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class Subscription:
+    """Подписка диспетчера: чат для личных сообщений и условия отбора заказов"""
+
+    id: str
+    chat_id: str
+    conditions: Dict[str, Any] = field(default_factory=dict)
+
+
+class SubscriptionStore:
+    """Подписки с индексами по городам, типам кузова и диапазонам веса и объема
+
+    Условия - те же ключи, что у правил маршрутизации: from, to, cities, body_types,
+    weight_min/max, volume_min/max, price_min/max. Файл перечитывается при изменении,
+    так что подписки можно править без перезапуска.
+    """
+
+    def __init__(self, file_path: str = "data/subscriptions.json"):
+        self.file = Path(file_path)
+        self.index = FilterIndex()
+        self._subscriptions: Dict[str, Subscription] = {}
+        # Номер фильтра в индексе <-> ID подписки
+        self._by_filter: Dict[int, str] = {}
+        self._filter_ids: Dict[str, int] = {}
+        self._mtime: Optional[float] = None
+
+    def load(self) -> None:
+        """Загрузка подписок из файла"""
+        self.index = FilterIndex()
+        self._subscriptions.clear()
+        self._by_filter.clear()
+        self._filter_ids.clear()
+        try:
+            if not self.file.exists():
+                return
+            self._mtime = self.file.stat().st_mtime
+            with open(self.file, 'r', encoding='utf-8') as f:
+                content = f.read()
+            if not content.strip():
+                return
+            for entry in json.loads(content):
+                self._index(Subscription(**entry))
+            logger.info(f"Loaded {len(self._subscriptions)} subscriptions")
+        except Exception as e:
+            logger.error(f"Error loading subscriptions: {str(e)}")
+
+    def reload_if_changed(self) -> None:
+        """Повторная загрузка, если файл изменился на диске"""
+        try:
+            mtime = self.file.stat().st_mtime if self.file.exists() else None
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self.load()
+
+    def save(self) -> bool:
+        """Атомарная запись подписок на диск"""
+        try:
+            self.file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.file.with_suffix(self.file.suffix + ".tmp")
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump([asdict(subscription) for subscription in self._subscriptions.values()],
+                          f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.file)
+            self._mtime = self.file.stat().st_mtime
+            return True
+        except Exception as e:
+            logger.error(f"Error saving subscriptions: {str(e)}")
+            return False
+
+    def _index(self, subscription: Subscription) -> None:
+        try:
+            filter_id = self.index.add(OrderFilter.from_dict(subscription.conditions))
+        except Exception as e:
+            logger.error(f"Invalid subscription {subscription.id}: {str(e)}")
+            return
+        self._subscriptions[subscription.id] = subscription
+        self._by_filter[filter_id] = subscription.id
+        self._filter_ids[subscription.id] = filter_id
+
+    def add(self, chat_id: str, conditions: Dict[str, Any]) -> str:
+        """Новая подписка; возвращает ее ID"""
+        subscription = Subscription(uuid.uuid4().hex[:12], str(chat_id), dict(conditions))
+        self._index(subscription)
+        self.save()
+        return subscription.id
+
+    def remove(self, subscription_id: str) -> bool:
+        """Удаление подписки"""
+        subscription = self._subscriptions.pop(subscription_id, None)
+        if subscription is None:
+            return False
+        filter_id = self._filter_ids.pop(subscription_id)
+        del self._by_filter[filter_id]
+        self.index.remove(filter_id)
+        self.save()
+        return True
+
+    def for_chat(self, chat_id: str) -> List[Subscription]:
+        """Подписки одного чата"""
+        return [subscription for subscription in self._subscriptions.values()
+                if subscription.chat_id == str(chat_id)]
+
+    def match(self, features: OrderFeatures) -> Set[str]:
+        """Чаты подписчиков, условиям которых соответствует заказ"""
+        if not self._subscriptions:
+            return set()
+        return {self._subscriptions[self._by_filter[filter_id]].chat_id
+                for filter_id in self.index.match(features)}
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
@@ -0,0 +1,71 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Optional
+
+# Одни и те же строки дат (окна погрузки, updatedAt) повторяются из опроса в опрос
+TIMESTAMP_CACHE_SIZE = 16384
+
+NO_TIMEZONE = "часовой пояс не указан"
+
+
+@dataclass(frozen=True, slots=True)
+class Timestamp:
+    """Разобранная дата API: момент времени, смещение от UTC и строки для вывода"""
+
+    instant: datetime
+    utc_offset: Optional[timedelta]
+    display: str
+    timezone: str
+
+    @property
+    def utc(self) -> datetime:
+        """Момент времени в наивном UTC (наивная дата считается уже UTC)"""
+        if self.utc_offset is None:
+            return self.instant
+        return self.instant.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def format_utc_offset(offset: Optional[timedelta]) -> str:
+    """Смещение от UTC в виде UTC, UTC+05 или UTC-03:30"""
+    if offset is None:
+        return NO_TIMEZONE
+    if not offset:
+        return "UTC"
+    sign = "+" if offset > timedelta(0) else "-"
+    hours, remainder = divmod(abs(int(offset.total_seconds())), 3600)
+    minutes = remainder // 60
+    return f"UTC{sign}{hours:02d}" + (f":{minutes:02d}" if minutes else "")
+
+
+@lru_cache(maxsize=TIMESTAMP_CACHE_SIZE)
+def _parse(value: str) -> Optional[Timestamp]:
+    try:
+        instant = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    offset = instant.utcoffset()
+    return Timestamp(
+        instant=instant,
+        utc_offset=offset,
+        display=instant.strftime("%d.%m.%Y %H:%M"),
+        timezone=format_utc_offset(offset)
+    )
+
+
+def parse_timestamp(value: Any) -> Optional[Timestamp]:
+    """Разбор ISO-строки даты API с кэшированием; None, если даты нет или она некорректна"""
+    if not value or not isinstance(value, str) or value == "N/A":
+        return None
+    return _parse(value)
+
+
+def parse_datetime(value: Any) -> Optional[datetime]:
+    """Разбор ISO-строки даты API ("...Z" или со смещением); None, если даты нет"""
+    timestamp = parse_timestamp(value)
+    return timestamp.instant if timestamp is not None else None
+
+
+def timestamp_cache_info():
+    """Статистика кэша разобранных дат"""
+    return _parse.cache_info()
@@ -0,0 +1,93 @@
+from typing import Optional
+
+import pytest
+
+from src.utils.filter_index import FilterIndex, OrderFeatures, OrderFilter, normalize_city
+
+
+def features(cities=(), origin: Optional[str] = None, destination: Optional[str] = None,
+             body_types=(), weight: Optional[float] = None, volume: Optional[float] = None,
+             price: Optional[float] = None) -> OrderFeatures:
+    return OrderFeatures(
+        cities=frozenset(normalize_city(city) for city in cities),
+        origin=normalize_city(origin) if origin else None,
+        destination=normalize_city(destination) if destination else None,
+        body_types=frozenset(body_types),
+        weight=weight,
+        volume=volume,
+        price=price,
+    )
+
+
+def index_of(*filters: dict) -> FilterIndex:
+    index = FilterIndex()
+    for data in filters:
+        index.add(OrderFilter.from_dict(data))
+    return index
+
+
+@pytest.mark.parametrize("weight, matched", [
+    (999, []),
+    (1000, [0]),
+    (1500, [0]),
+    (2000, [0, 1]),
+    (2500, [1]),
+    (3000, [1]),
+    (3001, []),
+])
+def test_range_bounds_are_inclusive(weight, matched):
+    index = index_of({"weight_min": 1000, "weight_max": 2000},
+                     {"weight_min": 2000, "weight_max": 3000})
+    assert index.match(features(weight=weight)) == matched
+
+
+def test_open_ranges():
+    index = index_of({"price_max": 50000}, {"price_min": 50000})
+    assert index.match(features(price=0)) == [0]
+    assert index.match(features(price=50000)) == [0, 1]
+    assert index.match(features(price=10 ** 9)) == [1]
+
+
+def test_unknown_value_matches_only_filters_without_bounds():
+    index = index_of({"weight_max": 20000}, {})
+    assert index.match(features(weight=None)) == [1]
+
+
+def test_empty_conditions_are_wildcards():
+    index = index_of({}, {"cities": ["Москва"]}, {"body_types": ["Реф"]})
+    assert index.match(features(cities=["Тверь"], body_types=["curtainsider"])) == [0]
+    assert index.match(features(cities=["Москва"], body_types=["refrigerator"])) == [0, 1, 2]
+
+
+def test_conditions_of_one_filter_are_intersected():
+    index = index_of({"from": ["Москва"], "to": ["Тверь"], "weight_max": 10000})
+    assert index.match(features(origin="Москва", destination="Тверь", weight=5000)) == [0]
+    assert index.match(features(origin="Тверь", destination="Москва", weight=5000)) == []
+    assert index.match(features(origin="Москва", destination="Тверь", weight=10001)) == []
+
+
+def test_city_names_are_normalized():
+    index = index_of({"cities": ["москва"]})
+    assert index.match(features(cities=["Москва"])) == [0]
+
+
+def test_remove_drops_filter():
+    index = index_of({"cities": ["Москва"]}, {})
+    index.remove(0)
+    assert len(index) == 1
+    assert index.match(features(cities=["Москва"])) == [1]
+    # Повторное удаление ничего не меняет
+    index.remove(0)
+    assert len(index) == 1
+
+
+def test_removed_id_is_reused_without_old_conditions():
+    index = index_of({"cities": ["Москва"], "weight_max": 1000}, {"cities": ["Тверь"]})
+    index.match(features(cities=["Москва"], weight=500))
+    index.remove(0)
+    reused = index.add(OrderFilter.from_dict({"cities": ["Казань"]}))
+    assert reused == 0
+    assert index.match(features(cities=["Москва"], weight=500)) == []
+    assert index.match(features(cities=["Казань"], weight=5000)) == [0]
+    assert index.match(features(cities=["Тверь"])) == [1]
+    assert index.add(OrderFilter()) == 2
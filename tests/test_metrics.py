@@ -0,0 +1,23 @@
+from src.utils.metrics import Gauge
+
+
+def test_gauge_function_is_replaced_per_source():
+    gauge = Gauge("queue_depth", "Items waiting in internal queues", labels=("queue",))
+    gauge.set_function(lambda: {("outbox",): 3}, source="outbox")
+    gauge.set_function(lambda: {("raw",): 1, ("send",): 2}, source="pipeline")
+    # Новый конвейер заменяет функцию прежнего, а не добавляется к ней
+    gauge.set_function(lambda: {("raw",): 5, ("send",): 0}, source="pipeline")
+
+    assert gauge.render().splitlines()[2:] == [
+        'queue_depth{queue="outbox"} 3',
+        'queue_depth{queue="raw"} 5',
+        'queue_depth{queue="send"} 0',
+    ]
+
+
+def test_gauge_without_labels_keeps_latest_function():
+    gauge = Gauge("dedup_orders", "Orders in the sent orders dedup store")
+    gauge.set_function(lambda: 10)
+    gauge.set_function(lambda: 20)
+
+    assert gauge.render().splitlines()[2:] == ["dedup_orders 20"]
@@ -0,0 +1,148 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from telegram.error import Forbidden
+
+from src.core.monitor import MagistraliMonitor
+from src.core.pipeline import OrderPipeline
+from src.models.order import Order
+
+EXTRA_CHANNEL = "@magistrali_ural"
+
+
+def order_data(order_id: str) -> dict:
+    end = (datetime.now(timezone.utc) + timedelta(hours=2)).isoformat().replace("+00:00", "Z")
+    return {
+        "id": order_id,
+        "status": "onMatch",
+        "customer": {"customerName": "ООО Ромашка"},
+        "auction": {"timeLeft": "2 ч.", "currency": "RUB", "endDate": {"time": end}},
+        "matcher": {"winnerExecutor": None, "matcherStatus": "active"},
+        "createdAt": {"time": "2026-10-17T10:00:00Z"},
+        "updatedAt": {"time": "2026-10-17T11:00:00Z"},
+        "dimensions": {"weight": 20000, "volume": 82},
+        "bodyType": ["refrigerator"],
+        "distribution": {"amount": 150000},
+        "shipments": [{
+            "npShipment": {"npGeoAddress": {"address": "г. Екатеринбург, ул. Фронтовых бригад 18"},
+                           "period": {"from": {"time": "2026-10-18T08:00:00+05:00"}}},
+            "npUnshipment": {"npGeoAddress": {"address": "Московская обл., г. Балашиха"},
+                             "period": {"from": {"time": "2026-10-20T08:00:00+03:00"}}}
+        }]
+    }
+
+
+class FakeEnvironment:
+    """Монитор с подмененными API и Telegram: отправка в failing завершается ошибкой"""
+
+    def __init__(self, tmp_path, monkeypatch, digest_threshold: int = 0):
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "config.json").write_text(json.dumps({
+            "STATIC_TOKEN": "token",
+            "TELEGRAM_BOT_TOKEN": "1:token",
+            "TELEGRAM_CHANNEL_ID": "main",
+            "OUTBOX_ENABLED": False,
+            "METRICS_ENABLED": False,
+            "DIGEST_THRESHOLD": digest_threshold,
+            "ROUTING_RULES": [{"channel": EXTRA_CHANNEL, "cities": ["Екатеринбург"]}]
+        }), encoding="utf-8")
+        self.monitor = MagistraliMonitor()
+        self.orders = [order_data("ord-1"), order_data("ord-2")]
+        self.failing = {EXTRA_CHANNEL}
+        self.sent = []
+        self.polls = 0
+        self.commits = []
+        self._polled = False
+
+        client = self.monitor.api_client
+        client.get_active_orders = lambda: list(self._poll())
+        client.iter_active_orders = self._poll
+        client.commit_watermark = self._commit
+        self.monitor.telegram_service.dispatcher._send = self._send
+
+    def _poll(self):
+        self.polls += 1
+        self._polled = True
+        return iter([Order.from_dict(data) for data in self.orders])
+
+    def _commit(self) -> None:
+        # Как и настоящая отметка, подтверждается только то, что было получено опросом
+        if self._polled:
+            self.commits.append(self.polls)
+            self._polled = False
+
+    async def _send(self, chat_id: str, message_data: dict) -> None:
+        if chat_id in self.failing:
+            raise Forbidden("bot was kicked from the channel chat")
+        self.sent.append((chat_id, message_data["order_id"]))
+        message_data["message_id"] = len(self.sent)
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    return FakeEnvironment(tmp_path, monkeypatch)
+
+
+def test_order_with_failed_copy_is_not_marked_sent(env):
+    assert env.monitor.process_orders()
+
+    assert sorted(env.sent) == [("main", "ord-1"), ("main", "ord-2")]
+    assert "ord-1" not in env.monitor.sent_orders
+    assert env.monitor.is_delivered("ord-1", None)
+    assert not env.monitor.is_delivered("ord-1", EXTRA_CHANNEL)
+    assert env.commits == []
+
+
+def test_failed_copy_is_retried_only_for_its_chat(env):
+    env.monitor.process_orders()
+    env.failing.clear()
+    env.sent.clear()
+
+    env.monitor.process_orders()
+
+    assert sorted(env.sent) == [(EXTRA_CHANNEL, "ord-1"), (EXTRA_CHANNEL, "ord-2")]
+    assert "ord-1" in env.monitor.sent_orders
+    assert env.commits == [2]
+
+    env.sent.clear()
+    env.monitor.process_orders()
+    assert env.sent == []
+
+
+def test_failed_digest_copy_is_retried_only_for_its_chat(tmp_path, monkeypatch):
+    env = FakeEnvironment(tmp_path, monkeypatch, digest_threshold=1)
+    env.monitor.process_orders()
+
+    assert env.sent == [("main", "digest-ord-1")]
+    assert "ord-1" not in env.monitor.sent_orders
+    assert env.commits == []
+
+    env.failing.clear()
+    env.sent.clear()
+    env.monitor.process_orders()
+
+    assert env.sent == [(EXTRA_CHANNEL, "digest-ord-1")]
+    assert {"ord-1", "ord-2"} <= set(env.monitor.sent_orders)
+    assert env.commits == [2]
+
+
+def test_pipeline_holds_watermark_until_failed_copy_is_delivered(env):
+    monitor = env.monitor
+    monitor.scheduler.next_delay = lambda: 0.2
+    fake_send = env._send
+
+    async def send(chat_id: str, message_data: dict) -> None:
+        # Канал недоступен только во время первого опроса
+        if env.polls > 1:
+            env.failing.clear()
+        await fake_send(chat_id, message_data)
+
+    monitor.telegram_service.dispatcher._send = send
+    monitor.telegram_service.loop.run_until_complete(OrderPipeline(monitor).run(max_cycles=3))
+
+    assert sorted(env.sent) == sorted([("main", "ord-1"), ("main", "ord-2"),
+                                       (EXTRA_CHANNEL, "ord-1"), (EXTRA_CHANNEL, "ord-2")])
+    assert {"ord-1", "ord-2"} <= set(monitor.sent_orders)
+    # Отметка первого опроса не подтверждается, пока копии не доставлены при повторе
+    assert env.commits == [2]
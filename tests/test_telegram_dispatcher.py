@@ -0,0 +1,27 @@
+import asyncio
+
+from src.services.telegram_dispatcher import TelegramDispatcher
+
+
+def test_chat_over_its_limit_does_not_block_other_chats():
+    sent = []
+
+    async def send(chat_id, message_data):
+        sent.append((chat_id, message_data["order_id"]))
+
+    async def scenario():
+        # Один слот на всех и одно сообщение в минуту на чат
+        dispatcher = TelegramDispatcher(send, max_concurrency=1, global_rate=1000,
+                                        chat_rate_per_min=1, dry_run=True)
+        burst = [asyncio.create_task(dispatcher.send("busy", {"order_id": f"busy-{i}", "text": "x"}))
+                 for i in range(3)]
+        await asyncio.sleep(0)
+        other = await asyncio.wait_for(dispatcher.send("other", {"order_id": "other", "text": "x"}),
+                                       timeout=1)
+        for task in burst:
+            task.cancel()
+        await asyncio.gather(*burst, return_exceptions=True)
+        return other
+
+    assert asyncio.run(scenario())
+    assert sent == [("busy", "busy-0"), ("other", "other")]